@@ -1,23 +1,51 @@
 import streamlit as st
+from backend import metrics
 from backend.database import create_db
-from frontend import home, dashboard, analysis, alerts, admin_panel
+from backend.sentiment import warm_up
+import importlib
 import os
+import threading
 import time
 from datetime import timedelta
 
 # ─────────────────────────────────────────────────────
-# 1) Ensure your SQLite tables exist
-# ─────────────────────────────────────────────────────
-create_db()
-
-# ─────────────────────────────────────────────────────
-# 2) Streamlit Page Configuration
+# 1) Streamlit Page Configuration
 # ─────────────────────────────────────────────────────
 st.set_page_config(
     page_title="Social Media Sentiment Health Analysis",
     layout="centered",
 )
 
+# ─────────────────────────────────────────────────────
+# 2) Ensure your SQLite tables exist and warm the sentiment analyzer
+# ─────────────────────────────────────────────────────
+# Streamlit re-executes this script on every interaction; cache_resource
+# makes the startup work run once per server process. The analyzer warms
+# in the background so it never delays the login page (a transformer
+# engine takes seconds to load); the first analysis waits for it if needed.
+@st.cache_resource(show_spinner=False)
+def startup():
+    create_db()
+    threading.Thread(target=warm_up, name="sentiment-warm-up", daemon=True).start()
+    metrics.start_exporter("app")
+
+
+startup()
+
+# Pages are imported on their first visit, so the login page doesn't pay
+# for pandas or matplotlib. Later reruns find them in sys.modules.
+PAGES = {
+    "Home": "home",
+    "Dashboard": "dashboard",
+    "Analyze": "analysis",
+    "Alerts": "alerts",
+}
+
+
+def load_page(module):
+    """ Import frontend.<module> (once per process) and return it. """
+    return importlib.import_module(f"frontend.{module}")
+
 # ─────────────────────────────────────────────────────
 # 3) Load custom CSS (if available)
 # ─────────────────────────────────────────────────────
@@ -70,12 +98,12 @@ def main():
 
     # ✅ Redirect to home if not logged in
     if not st.session_state.logged_in_user and not st.session_state.admin_logged_in:
-        home.app()
+        load_page("home").app()
         return
 
     # ✅ Admin Panel Mode
     if st.session_state.admin_logged_in:
-        admin_panel.app()
+        load_page("admin_panel").app()
         return
 
     # ✅ User Mode: Sidebar + Navigation
@@ -83,22 +111,14 @@ def main():
     if os.path.exists(logo_path):
         st.sidebar.image(logo_path, use_container_width=True)
 
-    menu = ["Home", "Dashboard", "Analyze", "Alerts"]
-    choice = st.sidebar.selectbox("Navigation", menu)
+    choice = st.sidebar.selectbox("Navigation", list(PAGES))
 
     # Update last activity timestamp when a user interacts
     if choice:
         st.session_state["last_activity"] = time.time()
 
     # Navigate to selected page
-    if choice == "Home":
-        home.app()
-    elif choice == "Dashboard":
-        dashboard.app()
-    elif choice == "Analyze":
-        analysis.app()
-    elif choice == "Alerts":
-        alerts.app()
+    load_page(PAGES[choice]).app()
 
     # ✅ Sidebar Logout Button
     with st.sidebar:
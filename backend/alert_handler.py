@@ -1,10 +1,216 @@
-# Simple alert storage (in-memory)
-_alerts = []
+"""
+Alert store: alerts persisted in the app database's alerts table, with a
+bounded in-memory ring buffer of the most recent ones.
 
-def add_alert(message):
-    """Add a new alert message to the in-memory storage."""
-    _alerts.append({"message": message})
+Alert ids only grow, so an id works as a cursor: poll(cursor) returns the
+alerts written after it, oldest first, plus the cursor to pass next time.
+The ring buffer is topped up from SQLite with an indexed `id > last seen`
+range scan, so alerts written by other processes (the worker, another
+Streamlit server) show up too. Polls whose cursor falls inside the buffer
+are answered from memory. Older cursors, and the per-user and per-post
+lookups, go to the table's indexes (migration 11).
 
-def get_alerts():
-    """Retrieve all stored alert messages."""
-    return _alerts
+The buffer only tracks new rows. Edits to an alert's comment are read
+back from SQLite by for_posts(), not from the buffer.
+
+    store = get_store()
+    sub = store.subscribe(username="ann@example.com")
+    ...
+    for alert in sub.poll():
+        ...
+"""
+import datetime
+import os
+import threading
+import time
+from collections import deque
+
+from backend.connection import APP_DB, get_connection, retry_on_busy
+
+RING_SIZE = int(os.environ.get("ALERT_RING_SIZE", 1000))
+POLL_LIMIT = 100
+
+ALERT_COLUMNS = "id, post_id, username, admin_username, comment, timestamp"
+
+
+def _as_dict(row):
+    return {key: row[key] for key in row.keys()}
+
+
+class AlertStore:
+    """ Alerts in one app database, with the newest RING_SIZE kept in memory. """
+
+    def __init__(self, db_path=APP_DB, ring_size=RING_SIZE):
+        self.db_path = db_path
+        self._ring = deque(maxlen=ring_size)
+        self._lock = threading.Lock()
+        # Every alert with id > _floor is in the ring (or hasn't been read yet).
+        self._floor = None
+        self._last_id = 0
+        self.counters = {"ring_hits": 0, "db_reads": 0}
+
+    # --- writes ---
+
+    def add(self, post_id, comment, admin_username="admin", timestamp=None):
+        """ Store an alert for post_id and return its id. """
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        alert_id = self._insert(post_id, comment, admin_username, timestamp)
+        self.refresh()   # outside the retried unit: a busy read must not re-insert
+        return alert_id
+
+    @retry_on_busy
+    def _insert(self, post_id, comment, admin_username, timestamp):
+        conn = get_connection(self.db_path)
+        with conn:
+            return conn.execute(
+                "INSERT INTO alerts (post_id, admin_username, comment, timestamp) VALUES (?, ?, ?, ?)",
+                (post_id, admin_username, comment, timestamp)
+            ).lastrowid
+
+    @retry_on_busy
+    def update_comment(self, post_id, comment, timestamp=None):
+        """ Replace the comment on a post's alerts. """
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute("UPDATE alerts SET comment = ?, timestamp = ? WHERE post_id = ?",
+                         (comment, timestamp, post_id))
+
+    # --- ring buffer ---
+
+    def refresh(self):
+        """ Pull alerts written since the last refresh into the ring buffer. """
+        with self._lock:
+            conn = get_connection(self.db_path)
+            if self._floor is None:
+                # First use: seed with the last ring_size ids.
+                newest = conn.execute("SELECT MAX(id) FROM alerts").fetchone()[0] or 0
+                self._floor = self._last_id = max(0, newest - self._ring.maxlen)
+            rows = conn.execute(f"SELECT {ALERT_COLUMNS} FROM alerts WHERE id > ? ORDER BY id",
+                                (self._last_id,)).fetchall()
+            for row in rows:
+                if len(self._ring) == self._ring.maxlen:
+                    self._floor = self._ring[0]["id"]
+                self._ring.append(_as_dict(row))
+            if rows:
+                self._last_id = rows[-1]["id"]
+            return len(rows)
+
+    def latest_id(self):
+        """ Cursor that skips every alert written so far. """
+        self.refresh()
+        return self._last_id
+
+    def recent(self, limit=20):
+        """ Newest alerts first, from memory. """
+        self.refresh()
+        with self._lock:
+            return list(self._ring)[-limit:][::-1]
+
+    # --- reads ---
+
+    def poll(self, cursor=0, username=None, post_id=None, limit=POLL_LIMIT):
+        """ Return (alerts after cursor oldest first, next cursor), optionally for one user/post. """
+        self.refresh()
+        with self._lock:
+            if self._floor is not None and cursor >= self._floor:
+                self.counters["ring_hits"] += 1
+                alerts = [a for a in self._ring
+                          if a["id"] > cursor
+                          and (username is None or a["username"] == username)
+                          and (post_id is None or a["post_id"] == post_id)][:limit]
+                return alerts, self._next_cursor(alerts, cursor, limit)
+        self.counters["db_reads"] += 1
+        where, params = ["id > ?"], [cursor]
+        if username is not None:
+            where.append("username = ?")
+            params.append(username)
+        if post_id is not None:
+            where.append("post_id = ?")
+            params.append(post_id)
+        rows = get_connection(self.db_path).execute(
+            f"SELECT {ALERT_COLUMNS} FROM alerts WHERE {' AND '.join(where)} ORDER BY id LIMIT ?",
+            params + [limit]
+        ).fetchall()
+        alerts = [_as_dict(row) for row in rows]
+        return alerts, self._next_cursor(alerts, cursor, limit)
+
+    def _next_cursor(self, alerts, cursor, limit):
+        # A short page means nothing else matched up to what we have read,
+        # so the cursor can skip ahead past non-matching alerts.
+        if alerts and len(alerts) == limit:
+            return alerts[-1]["id"]
+        return max(cursor, self._last_id, alerts[-1]["id"] if alerts else 0)
+
+    def for_user(self, username, limit=POLL_LIMIT):
+        """ A user's newest alerts first. """
+        rows = get_connection(self.db_path).execute(
+            f"SELECT {ALERT_COLUMNS} FROM alerts WHERE username = ? ORDER BY id DESC LIMIT ?",
+            (username, limit)
+        ).fetchall()
+        return [_as_dict(row) for row in rows]
+
+    def for_posts(self, post_ids):
+        """ Return {post_id: latest alert} for the given posts. """
+        post_ids = list(post_ids)
+        found = {}
+        conn = get_connection(self.db_path)
+        for i in range(0, len(post_ids), 400):
+            chunk = post_ids[i:i + 400]
+            rows = conn.execute(
+                f"SELECT {ALERT_COLUMNS} FROM alerts WHERE post_id IN ({', '.join('?' * len(chunk))}) ORDER BY id",
+                chunk
+            ).fetchall()
+            found.update((row["post_id"], _as_dict(row)) for row in rows)
+        return found
+
+    def subscribe(self, username=None, post_id=None, cursor=None):
+        """ A Subscription that starts after cursor (default: after everything so far). """
+        return Subscription(self, username, post_id, self.latest_id() if cursor is None else cursor)
+
+
+class Subscription:
+    """ Remembers a cursor so each poll() returns only alerts not seen before. """
+
+    def __init__(self, store, username, post_id, cursor):
+        self.store = store
+        self.username = username
+        self.post_id = post_id
+        self.cursor = cursor
+
+    def poll(self, limit=POLL_LIMIT):
+        alerts, self.cursor = self.store.poll(self.cursor, self.username, self.post_id, limit)
+        return alerts
+
+    def wait(self, timeout, interval=1.0):
+        """ Poll until something arrives or timeout seconds pass. """
+        deadline = time.monotonic() + timeout
+        while True:
+            alerts = self.poll()
+            if alerts or time.monotonic() >= deadline:
+                return alerts
+            time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_path=APP_DB):
+    """ The process-wide store for db_path. """
+    key = os.path.abspath(db_path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(key, AlertStore(db_path))
+    return store
+
+
+def add_alert(message, post_id=None, admin_username="system"):
+    """ Add an alert to the default store. """
+    return get_store().add(post_id, message, admin_username)
+
+
+def get_alerts(limit=20):
+    """ The newest alerts in the default store. """
+    return get_store().recent(limit)
@@ -10,7 +10,9 @@ def login_user(username, password):
 
 def register_user(username, email, password):
     # Attempt to create a new user using the database function
-    if database.create_user(username, email, password):
-        st.success("Registration successful!")
+    try:
+        database.create_user(username, email, password)
+    except database.UserExistsError as e:
+        st.error(str(e))
     else:
-        st.error("User already exists")
+        st.success("Registration successful!")
@@ -0,0 +1,95 @@
+"""
+Automatic review of flagged posts, run by the worker (backend/worker.py).
+"""
+from datetime import datetime
+
+from backend import database, engines
+from backend.connection import APP_DB, USERS_DB
+
+# ------------------------
+# Dynamic comment generator
+# ------------------------
+
+def generate_dynamic_comment(post_text: str) -> str:
+    engine = engines.get_engine()
+    scored = engine.sentences(post_text or "")
+    if scored:
+        min_score, worst = min(scored, key=lambda x: x[0])
+        if min_score <= engine.config["severe_comment_threshold"]:
+            return (f"I noticed this part of your post was quite negative: \"{worst}\". "
+                    "I understand this might come from frustration—would you consider reframing it with specific examples or a constructive solution? "
+                    "This will help others understand your perspective and foster a more positive dialogue.")
+        elif min_score <= engine.config["mild_comment_threshold"]:
+            return (f"Your post segment \"{worst}\" carries a somewhat negative tone. "
+                    "You might enhance it by adding supportive comments or actionable suggestions. "
+                    "For instance, sharing a small positive outcome or an improvement idea can balance the message.")
+        else:
+            return ("Thanks for sharing your thoughts! To make your post even more engaging, "
+                    "consider elaborating with examples or helpful resources. "
+                    "This context will make your feedback more impactful for readers.")
+    return ("Thanks for posting! If you’d like feedback, try adding more details or clarifying your main points. "
+            "The more context you provide, the better we (and other readers) can understand your perspective.")
+
+# ------------------------
+# Incremental auto-review
+# ------------------------
+
+WATERMARK = "auto_review"
+BATCH_SIZE = 200
+
+def review_email_html(post_id, user, text, conf, comment):
+    return f"""
+    <html><body style="font-family:Arial,sans-serif;padding:20px;">
+      <h2 style="color:#4a90e2;">Your Post Needs Review</h2>
+      <p>Hi <strong>{user}</strong>,</p>
+      <p>We detected a negative tone (confidence {conf:.2f}) in your post:</p>
+      <blockquote style="background:#eee;padding:10px;border-left:4px solid #4a90e2;">
+        {text}
+      </blockquote>
+      <p><strong>Feedback:</strong><br>{comment}</p>
+      <p><a href="https://your-app-url.com/posts/{post_id}/edit"
+            style="color:#4a90e2;">Edit your post</a> and we’ll re-check.</p>
+      <p style="font-size:12px;color:#555;">— Support Team</p>
+    </body></html>
+    """
+
+def auto_process_flagged(db_path=APP_DB, users_db=USERS_DB, keep_going=None):
+    """
+    Review the negative posts written since the last run: generate a dynamic
+    comment, record an alert (which marks the post reviewed) and queue an email.
+
+    Progress is a persisted high-watermark on user_posts.id, so a run reads
+    only new posts however long the history is. Posts whose author has no
+    account, and legacy posts with no content, are passed over and stay in
+    the manual review queue. keep_going()
+    is checked between batches so a worker that loses its lease stops early.
+    Returns the number of alerts written.
+    """
+    written = 0
+    last = database.get_watermark(WATERMARK, db_path)
+    high = database.latest_post_id(db_path)
+    while last < high and (keep_going is None or keep_going()):
+        # 1) next batch of new negatives, joined to their authors' emails
+        posts = database.get_flagged_after(last, high, BATCH_SIZE, db_path, users_db)
+        upto = posts[-1]["id"] if len(posts) == BATCH_SIZE else high
+
+        # 2) dynamic comments
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        outgoing = [
+            (p, p["email"], generate_dynamic_comment(p["post_content"]))
+            for p in posts if p["email"] and p["post_content"]
+        ]
+
+        # 3) alerts, queued emails and watermark in one transaction
+        #    (the alert trigger marks posts reviewed; the outbox sender mails them)
+        database.save_alerts(
+            [(p["id"], "system", comment, now) for p, _, comment in outgoing],
+            watermark=(WATERMARK, upto),
+            mail=[(email, "[Action Required] Please Review Your Post",
+                   review_email_html(p["id"], p["username"], p["post_content"], p["confidence"] or 0.0, comment))
+                  for p, email, comment in outgoing],
+            db_path=db_path
+        )
+        written += len(outgoing)
+        last = upto
+    return written
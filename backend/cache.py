@@ -0,0 +1,287 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from backend.connection import get_connection
+
+# ------------------------
+# Sentiment result cache
+# ------------------------
+# Scores are keyed by a hash of the normalized post text plus the engine name
+# and version, so reposts and copy-paste chains are scored once. Lookups go
+# through a bounded in-process LRU, then a persistent SQLite table, and only
+# then to the engine. Concurrent misses for the same key wait on the first
+# caller instead of scoring the text again.
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+
+CACHE_SIZE = int(os.environ.get("SENTIMENT_CACHE_SIZE", 10000))
+CACHE_DB_PATH = os.environ.get(
+    "SENTIMENT_CACHE_DB", os.path.join(BASE_DIR, "data", "sentiment_cache.db"))
+CACHE_DB_ROWS = int(os.environ.get("SENTIMENT_CACHE_ROWS", 1000000))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """ Canonical form used for hashing: NFC, trimmed, whitespace collapsed. """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def cache_key(engine, text):
+    raw = f"{engine.name}\0{engine.version}\0{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """ A computation in progress that other callers can wait on. """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SentimentCache:
+    """ Two-tier (LRU + SQLite) cache of engine results with request collapsing. """
+
+    def __init__(self, max_entries=CACHE_SIZE, db_path=CACHE_DB_PATH, max_rows=CACHE_DB_ROWS):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.max_rows = max_rows
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._inserts_since_trim = 0
+        self.counters = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0, "collapsed": 0,
+            "memory_evictions": 0, "disk_evictions": 0,
+        }
+        if db_path:
+            self._init_disk()
+
+    # --- Disk tier ---
+
+    def _conn(self):
+        return get_connection(self.db_path)
+
+    def _init_disk(self):
+        conn = self._conn()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sentiment_cache (
+                key TEXT PRIMARY KEY,
+                sentiment TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                polarity REAL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_used ON sentiment_cache(last_used)")
+        conn.commit()
+
+    def _disk_get(self, keys):
+        if not self.db_path or not keys:
+            return {}
+        conn = self._conn()
+        found = {}
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for key, sentiment, confidence, polarity in conn.execute(
+                    f"SELECT key, sentiment, confidence, polarity FROM sentiment_cache WHERE key IN ({marks})",
+                    chunk):
+                found[key] = {"sentiment": sentiment, "confidence": confidence, "polarity": polarity}
+        if found:
+            conn.executemany("UPDATE sentiment_cache SET last_used = ? WHERE key = ?",
+                             [(time.time(), key) for key in found])
+            conn.commit()
+        return found
+
+    def _disk_put(self, items):
+        if not self.db_path or not items:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO sentiment_cache (key, sentiment, confidence, polarity, last_used) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(key, r["sentiment"], r["confidence"], r.get("polarity"), now) for key, r in items])
+        conn.commit()
+        with self._lock:
+            self._inserts_since_trim += len(items)
+            trim = self._inserts_since_trim >= 1000
+            if trim:
+                self._inserts_since_trim = 0
+        if trim:
+            self.trim_disk()
+
+    def trim_disk(self):
+        """ Evict least recently used rows beyond max_rows. """
+        conn = self._conn()
+        excess = conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0] - self.max_rows
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM sentiment_cache WHERE key IN "
+                "(SELECT key FROM sentiment_cache ORDER BY last_used LIMIT ?)", (excess,))
+            conn.commit()
+            with self._lock:
+                self.counters["disk_evictions"] += excess
+
+    # --- Memory tier ---
+
+    def _memory_get(self, key):
+        result = self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+        return result
+
+    def _memory_put(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters["memory_evictions"] += 1
+
+    # --- Public API ---
+
+    def get_or_score(self, engine, text):
+        """ Return the cached result for text, scoring it with engine on a miss. """
+        key = cache_key(engine, text)
+        with self._lock:
+            result = self._memory_get(key)
+            if result is not None:
+                self.counters["memory_hits"] += 1
+                return dict(result)
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.counters["collapsed"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.result)
+
+        try:
+            result = self._disk_get([key]).get(key)
+            if result is not None:
+                counter = "disk_hits"
+            else:
+                counter = "misses"
+                result = engine.score(text)
+                self._disk_put([(key, result)])
+            with self._lock:
+                self.counters[counter] += 1
+                self._memory_put(key, result)
+            flight.result = result
+            return dict(result)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def get_or_score_many(self, engine, texts):
+        """ Batch variant: one disk lookup and one score_batch() call for all misses.
+
+        Misses go through the same in-flight table as get_or_score(): keys
+        another caller is already computing are waited on, not rescored, and
+        other callers wait on the keys this batch computes.
+        """
+        keys = [cache_key(engine, text) for text in texts]
+        results, waiting, flights = {}, {}, {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                result = self._memory_get(key)
+                if result is not None:
+                    self.counters["memory_hits"] += 1
+                    results[key] = result
+                elif key in self._inflight:
+                    self.counters["collapsed"] += 1
+                    waiting[key] = self._inflight[key]
+                else:
+                    flights[key] = self._inflight[key] = _Flight()
+
+        # Finish this batch's own keys before waiting on anyone else's, so
+        # two batches waiting on each other can't deadlock.
+        try:
+            pending = list(flights)
+            found = self._disk_get(pending)
+            missing = [k for k in pending if k not in found]
+            if missing:
+                text_for = dict(zip(keys, texts))
+                scored = engine.score_batch([text_for[k] for k in missing])
+                found.update(zip(missing, scored))
+                self._disk_put(list(zip(missing, scored)))
+            with self._lock:
+                self.counters["disk_hits"] += len(pending) - len(missing)
+                self.counters["misses"] += len(missing)
+                for key in pending:
+                    self._memory_put(key, found[key])
+            for key, flight in flights.items():
+                flight.result = found[key]
+        except Exception as e:
+            for flight in flights.values():
+                flight.error = e
+            raise
+        finally:
+            with self._lock:
+                for key in flights:
+                    del self._inflight[key]
+            for flight in flights.values():
+                flight.done.set()
+        results.update(found)
+
+        for key, flight in waiting.items():
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            results[key] = flight.result
+        return [dict(results[key]) for key in keys]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            for name in self.counters:
+                self.counters[name] = 0
+        if self.db_path:
+            conn = self._conn()
+            conn.execute("DELETE FROM sentiment_cache")
+            conn.commit()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """ Return the process-wide sentiment cache. """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SentimentCache()
+    return _cache
+
+
+def cache_stats():
+    return get_cache().stats()
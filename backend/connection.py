@@ -0,0 +1,169 @@
+import functools
+import os
+import random
+import sqlite3
+import threading
+import time
+import weakref
+
+# ------------------------
+# Connection manager
+# ------------------------
+# Every thread gets one long-lived connection per database file. Streamlit
+# runs each session in its own thread, so a page rerun reuses the connection
+# (and its statement cache) instead of paying sqlite3.connect() and pragma
+# setup on every query. When a thread goes away its connections return to an
+# idle pool and are handed to the next thread that needs them.
+#
+# Callers must not close these connections; use close_connections() instead.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))   # project root
+
+# ------------------------
+# Database locations
+# ------------------------
+# Posts, alerts and everything derived from them live in the app database;
+# accounts live in the users database. Both resolve against the project
+# root rather than the working directory, so the pages, the worker and the
+# CLIs all open the same files. The environment can point them elsewhere.
+APP_DB = os.environ.get("APP_DB_PATH", os.path.join(BASE_DIR, "data", "app_database.db"))
+USERS_DB = os.environ.get("USERS_DB_PATH", os.path.join(BASE_DIR, "users.db"))
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",     # 256 MiB
+    "PRAGMA cache_size=-65536",       # 64 MiB
+    "PRAGMA temp_store=MEMORY",
+)
+BUSY_TIMEOUT = 5.0          # seconds SQLite itself waits on a lock
+STATEMENT_CACHE_SIZE = 256  # prepared statements kept per connection
+BUSY_RETRIES = 5
+
+_local = threading.local()
+_idle = {}
+_idle_lock = threading.Lock()
+
+
+def _count_commit(statement):
+    # Trace callback of every pooled connection. Counting this thread's
+    # commits lets retry_on_busy see a unit that committed before failing.
+    if statement == "COMMIT":
+        _local.commits = getattr(_local, "commits", 0) + 1
+
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    conn.row_factory = sqlite3.Row  # To return rows as dictionaries
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    conn.set_trace_callback(_count_commit)
+    return conn
+
+
+def _release(path, conn):
+    """ Return a finished thread's connection to the idle pool. """
+    try:
+        conn.rollback()
+    except sqlite3.Error:
+        return
+    with _idle_lock:
+        _idle.setdefault(path, []).append(conn)
+
+
+def get_connection(db_path, attach=None):
+    """ Return this thread's pooled connection to db_path.
+
+    attach maps schema names to other database files to ATTACH on the
+    connection, e.g. {"users": USERS_DB}, so one statement can join
+    tables from both (users.users). Attachments stay with the connection.
+    """
+    path = os.path.abspath(db_path)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        with _idle_lock:
+            idle = _idle.get(path)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            conn = _connect(path)
+        conns[path] = conn
+        weakref.finalize(threading.current_thread(), _release, path, conn)
+    if attach:
+        _attach(conn, attach)
+    return conn
+
+
+def _attach(conn, attach):
+    attached = {row[1]: row[2] for row in conn.execute("PRAGMA database_list")}
+    for schema, db_path in attach.items():
+        path = os.path.abspath(db_path)
+        if attached.get(schema) == path:
+            continue
+        if schema in attached:
+            conn.execute(f"DETACH DATABASE {schema}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+
+
+def close_connections():
+    """ Close every pooled connection (current thread and idle pool). """
+    for conn in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
+    with _idle_lock:
+        for conns in _idle.values():
+            for conn in conns:
+                conn.close()
+        _idle.clear()
+
+
+def _forget_after_fork():
+    # A forked child must never reuse the parent's SQLite handles.
+    global _idle_lock
+    _local.conns = {}
+    _idle.clear()
+    _idle_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_after_fork)
+
+
+def is_busy_error(error):
+    message = str(error).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+def retry_on_busy(fn):
+    """ Retry a unit of work with jittered exponential backoff on SQLITE_BUSY.
+
+    The wrapped function must be safe to rerun from the start: any open
+    transaction is rolled back before the next attempt. That means at most
+    one commit, at the end. An attempt that committed on a pooled
+    connection before hitting SQLITE_BUSY is not retried; it raises
+    RuntimeError, because rerunning it would repeat the committed work.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        delay = 0.05
+        for attempt in range(BUSY_RETRIES + 1):
+            commits = getattr(_local, "commits", 0)
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if attempt == BUSY_RETRIES or not is_busy_error(e):
+                    raise
+                for conn in getattr(_local, "conns", {}).values():
+                    if conn.in_transaction:
+                        conn.rollback()
+                if getattr(_local, "commits", 0) != commits:
+                    raise RuntimeError(f"{fn.__qualname__} committed before SQLITE_BUSY; "
+                                       "retrying would repeat that work") from e
+                time.sleep(delay + random.uniform(0, delay))
+                delay *= 2
+    return wrapper
@@ -0,0 +1,83 @@
+"""
+Trigger-maintained sentiment counters.
+
+The counters table holds, per scope and sentiment, the number of rows and
+the sum of their confidence. Triggers on user_posts and analysis (see
+migration 5 in backend/migrations.py) keep it current inside the writing
+transaction, so stats are a primary-key lookup instead of COUNT(*) scans.
+
+Scopes:
+    'global'          all user_posts
+    'user:<name>'     user_posts of one username
+    'analysis'        the analysis table
+Sentiment '*' is the total for a scope; ('global', '#users') counts the
+distinct usernames that have at least one post.
+
+    python -m backend.counters --rebuild [--db PATH]
+"""
+import argparse
+
+from backend.connection import APP_DB, get_connection
+
+SENTIMENTS = ("positive", "negative", "neutral")
+ALL = "*"
+USERS = "#users"
+
+
+def user_scope(username):
+    return f"user:{username}"
+
+
+def rebuild(conn):
+    """ Recompute every counter from the base tables (run inside a transaction). """
+    conn.execute("DELETE FROM counters")
+    for scope_expr, table in (("'global'", "user_posts"), ("'user:' || username", "user_posts"),
+                              ("'analysis'", "analysis")):
+        conn.execute(f'''
+            INSERT INTO counters (scope, sentiment, posts, confidence_sum)
+            SELECT {scope_expr}, COALESCE(sentiment, ''), COUNT(*), TOTAL(confidence)
+              FROM {table} GROUP BY 1, 2
+        ''')
+        conn.execute(f'''
+            INSERT INTO counters (scope, sentiment, posts, confidence_sum)
+            SELECT {scope_expr}, '{ALL}', COUNT(*), TOTAL(confidence)
+              FROM {table} GROUP BY 1
+        ''')
+    conn.execute(f'''
+        INSERT INTO counters (scope, sentiment, posts, confidence_sum)
+        SELECT 'global', '{USERS}', COUNT(DISTINCT username), 0 FROM user_posts
+    ''')
+    for scope in ("global", "analysis"):
+        conn.execute(
+            "INSERT OR IGNORE INTO counters (scope, sentiment, posts, confidence_sum) VALUES (?, ?, 0, 0)",
+            (scope, ALL))
+
+
+def read_scope(conn, scope):
+    """ Return {sentiment: (posts, confidence_sum)} for one scope. """
+    return {
+        sentiment: (posts, confidence_sum)
+        for sentiment, posts, confidence_sum in conn.execute(
+            "SELECT sentiment, posts, confidence_sum FROM counters WHERE scope = ?", (scope,))
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the sentiment counters table.")
+    parser.add_argument("--db", default=APP_DB)
+    parser.add_argument("--rebuild", action="store_true", help="recompute counters from user_posts/analysis")
+    args = parser.parse_args(argv)
+
+    from backend import migrations
+    migrations.migrate_app_db(args.db)
+    conn = get_connection(args.db)
+    if args.rebuild:
+        with conn:
+            rebuild(conn)
+        print("Counters rebuilt.")
+    for scope in ("global", "analysis"):
+        print(scope, read_scope(conn, scope))
+
+
+if __name__ == "__main__":
+    main()
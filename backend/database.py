@@ -1,245 +1,255 @@
-import sqlite3
+import base64
+import binascii
 import datetime
+import hmac
+import itertools
+import json
+import sqlite3
 from hashlib import sha256
 
+from backend import counters, keywords, metrics, migrations
+from backend.connection import APP_DB, USERS_DB, get_connection, retry_on_busy
+
 # ------------------------
 # Database connection setup
 # ------------------------
 
-def get_db_connection(db_name="app_database.db"):
-    """ Establish and return a database connection. """
-    conn = sqlite3.connect(db_name, check_same_thread=False)
-    conn.row_factory = sqlite3.Row  # To return rows as dictionaries
-    return conn
+def get_db_connection(db_name=APP_DB):
+    """ Return this thread's pooled connection (see backend/connection.py).
+
+    The connection is shared, so callers commit but never close it.
+    """
+    return get_connection(db_name)
+
+
+def get_joined_connection(db_path=APP_DB, users_db=USERS_DB):
+    """ This thread's app connection with the users database attached as `users`.
+
+    Questions that cross the two stores (email -> posts -> alerts) become one
+    SQL join against users.users instead of a lookup on each connection.
+    """
+    return get_connection(db_path, attach={"users": users_db})
 
 # ------------------------
-# Database Initialization (Create Tables if not exist)
+# Database Initialization (schema migrations)
 # ------------------------
 
 def create_db():
-    """ Create tables if they do not exist. """
-    # Users database
-    conn_users = get_db_connection("users.db")
-    cursor_users = conn_users.cursor()
-    cursor_users.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            username TEXT NOT NULL,
-            email TEXT NOT NULL,
-            password TEXT NOT NULL
-        )
-    ''')
-    conn_users.commit()
-    conn_users.close()
-
-    # App database
-conn_app = get_db_connection("app_database.db")
-cursor_app = conn_app.cursor()
-
-# Create user_posts table
-cursor_app.execute('''
-    CREATE TABLE IF NOT EXISTS user_posts (
-        id INTEGER PRIMARY KEY,
-        username TEXT NOT NULL,
-        post_content TEXT,
-        sentiment TEXT,
-        confidence REAL,
-        timestamp TEXT,
-        reviewed INTEGER DEFAULT 0
-    )
-''')
-
-# Create analysis table
-cursor_app.execute('''
-    CREATE TABLE IF NOT EXISTS analysis (
-        id INTEGER PRIMARY KEY,
-        data_type TEXT,
-        sentiment TEXT,
-        confidence REAL,
-        timestamp TEXT
-    )
-''')
-
-# Create alerts table
-cursor_app.execute('''
-    CREATE TABLE IF NOT EXISTS alerts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        post_id INTEGER,
-        admin_username TEXT,
-        comment TEXT,
-        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY(post_id) REFERENCES user_posts(id) ON DELETE CASCADE
-    )
-''')
-
-# Commit changes and close connection
-conn_app.commit()
-conn_app.close()
+    """ Bring both databases up to the current schema (see backend/migrations.py). """
+    migrations.migrate_users_db(USERS_DB)
+    migrations.migrate_app_db(APP_DB)
 
 
 # ------------------------
 # User Management
 # ------------------------
 
-def create_user(username, email, password):
-    """ Create a new user with hashed password. """
-    if user_exists(username) or email_exists(email):
-        return False
-    hashed_pw = sha256(password.encode()).hexdigest()
-    conn = get_db_connection("users.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT INTO users (username, email, password) VALUES (?, ?, ?)",
-        (username, email, hashed_pw)
-    )
-    conn.commit()
-    conn.close()
-    return True
+class UserExistsError(ValueError):
+    """ A username or email is already registered; .field says which. """
 
+    def __init__(self, field, value):
+        self.field, self.value = field, value
+        what = "Username" if field == "username" else "Email"
+        super().__init__(f"{what} {value!r} is already registered.")
 
-def login_user(email, password):
-    """ Authenticate user by email and password. """
-    hashed_pw = sha256(password.encode()).hexdigest()
-    conn = get_db_connection("users.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM users WHERE email=? AND password=?",
-        (email, hashed_pw)
-    )
-    user = cursor.fetchone()
-    conn.close()
-    return user
 
-# Inside backend/database.py
+def _hash_password(password):
+    return sha256(password.encode()).hexdigest()
 
-def update_user(user_id, new_username, new_email):
-    base_dir = os.path.dirname(os.path.dirname(__file__))
-    db_path = os.path.join(base_dir, "data", "app_database.db")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE users SET username = ?, email = ? WHERE id = ?
-    """, (new_username, new_email, user_id))
-    conn.commit()
-    conn.close()
 
+def _conflict(error, username, email):
+    """ Map a UNIQUE violation on users to a UserExistsError (else None). """
+    message = str(error)
+    if "users.username" in message:
+        return UserExistsError("username", username)
+    if "users.email" in message:
+        return UserExistsError("email", email)
+    return None
 
-def get_flagged_analyses(username):
-    BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-    DB_PATH = os.path.join(BASE_DIR, "data", "app_database.db")
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Query to fetch alerts for the logged-in user
-    cursor.execute('''
-        SELECT a.timestamp, a.sentiment, a.confidence, a.data_type, a.post_content
-        FROM alerts a
-        INNER JOIN user_posts up ON a.post_id = up.id
-        WHERE a.admin_username = ? OR up.username = ?
-        ORDER BY a.timestamp DESC
-    ''', (username, username))
-    
-    alerts = cursor.fetchall()
-    conn.close()
-
-    # Format the result into a list of dictionaries
-    formatted_alerts = [
-        {"timestamp": alert[0], "sentiment": alert[1], "confidence": alert[2], "data_type": alert[3], "post_content": alert[4]}
-        for alert in alerts
-    ]
-    
-    return formatted_alerts
+
+@retry_on_busy
+def create_user(username, email, password, db_path=USERS_DB):
+    """ Create a new user with hashed password.
+
+    One INSERT; the unique indexes on username and email (users migration
+    6) reject duplicates atomically, even for concurrent signups. Raises
+    UserExistsError naming the field that is taken.
+    """
+    conn = get_db_connection(db_path)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO users (username, email, password, created_at) VALUES (?, ?, ?, ?)",
+                (username, email, _hash_password(password), datetime.datetime.now().isoformat())
+            )
+    except sqlite3.IntegrityError as e:
+        raise _conflict(e, username, email) or e
+    return True
+
+
+CREATE_USERS_BATCH = 10000
+
+
+@retry_on_busy
+def _insert_users(rows, on_conflict, db_path):
+    conn = get_db_connection(db_path)
+    verb = "INSERT" if on_conflict == "error" else "INSERT OR IGNORE"
+    try:
+        with conn:
+            return conn.executemany(
+                f"{verb} INTO users (username, email, password, created_at) VALUES (?, ?, ?, ?)", rows
+            ).rowcount
+    except sqlite3.IntegrityError as e:
+        # The batch was rolled back; report the first row that clashes, with
+        # an account or with an earlier row of the same batch.
+        seen = {"username": set(), "email": set()}
+        for username, email, *_ in rows:
+            for field, value in (("username", username), ("email", email)):
+                if value in seen[field] or conn.execute(
+                        f"SELECT 1 FROM users WHERE {field} = ?", (value,)).fetchone():
+                    raise UserExistsError(field, value) from e
+                seen[field].add(value)
+        raise
+
+
+def create_users(users, on_conflict="skip", batch_size=CREATE_USERS_BATCH, db_path=USERS_DB):
+    """ Register many (username, email, password) accounts, e.g. a partner's user list.
+
+    users may be any iterable (a generator streams; only one batch is held
+    in memory). Each batch of batch_size is one transaction. With
+    on_conflict="skip", accounts whose username or email is taken are left
+    out; with "error", the first clash raises UserExistsError and rolls back
+    its batch (earlier batches stay committed). Returns the number created.
+    """
+    if on_conflict not in ("skip", "error"):
+        raise ValueError(f"on_conflict must be 'skip' or 'error', not {on_conflict!r}")
+    created = 0
+    users = iter(users)
+    while True:
+        batch = list(itertools.islice(users, batch_size))
+        if not batch:
+            return created
+        now = datetime.datetime.now().isoformat()
+        created += _insert_users([(username, email, _hash_password(password), now)
+                                  for username, email, password in batch], on_conflict, db_path)
+
+
+def login_user(email, password, db_path=USERS_DB):
+    """ Authenticate user by email and password.
+
+    One lookup through the unique email index; the stored hash is compared
+    in constant time. Returns the users row, or None.
+    """
+    user = get_db_connection(db_path).execute(
+        "SELECT * FROM users WHERE email = ?", (email,)).fetchone()
+    if user is None or not hmac.compare_digest(user["password"], _hash_password(password)):
+        return None
+    return user
 
 
 def user_exists(username):
     """ Check if a username exists in the database. """
-    conn = get_db_connection("users.db")
+    conn = get_db_connection(USERS_DB)
     cursor = conn.cursor()
     cursor.execute(
         "SELECT id FROM users WHERE username=?",
         (username,)
     )
     exists = cursor.fetchone()
-    conn.close()
     return exists is not None
 
 
 def email_exists(email):
     """ Check if an email already exists in the database. """
-    conn = get_db_connection("users.db")
+    conn = get_db_connection(USERS_DB)
     cursor = conn.cursor()
     cursor.execute(
         "SELECT id FROM users WHERE email=?",
         (email,)
     )
     exists = cursor.fetchone()
-    conn.close()
     return exists is not None
 
 
 def get_all_users():
     """ Get all users in the database. """
-    conn = get_db_connection("users.db")
+    conn = get_db_connection(USERS_DB)
     cursor = conn.cursor()
     cursor.execute(
-        "SELECT id, username, email FROM users"
+        "SELECT id, username, email FROM users ORDER BY username"
     )
     rows = cursor.fetchall()
-    conn.close()
     return rows
 
-# ------------------------
-# User-specific Analysis
-# ------------------------
-
-def get_user_analysis(user_email):
-    """Return sentiment counts for the given user email."""
-    # 1) Find username by email
-    conn_u = get_db_connection("users.db")
-    cur_u = conn_u.cursor()
-    cur_u.execute(
-        "SELECT username FROM users WHERE email = ?",
-        (user_email,)
-    )
-    row = cur_u.fetchone()
-    conn_u.close()
-    if not row:
-        return None
-    username = row["username"]
-
-    
-
-    # 2) Count posts by sentiment
-    conn = get_db_connection("app_database.db")
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT COUNT(*) FROM user_posts WHERE username = ?",
-        (username,)
-    )
-    total = cur.fetchone()[0]
-    stats = {"total": total}
-
-    for sentiment in ("positive", "negative", "neutral"):
-        cur.execute(
-            "SELECT COUNT(*) FROM user_posts WHERE username = ? AND sentiment = ?",
-            (username, sentiment)
-        )
-        stats[sentiment] = cur.fetchone()[0]
-    conn.close()
-    return stats
 
+def count_users():
+    """ Number of registered users. """
+    conn = get_db_connection(USERS_DB)
+    return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+USER_SEARCH_PAGE = 20
+USER_SEARCH_MAX_COUNT = 10000   # totals above this are reported as this
+
+
+def _like_prefix(query):
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+def search_users(query="", limit=USER_SEARCH_PAGE, cursor=None, db_path=USERS_DB):
+    """ Return (rows, next_cursor, total) for users matching query, in id order.
+
+    Three or more characters match anywhere in the username or email,
+    case-insensitively, through the users_fts trigram index. One or two
+    characters match a username or email prefix through the NOCASE indexes,
+    and an empty query lists everyone. `cursor` is the next_cursor of the
+    previous page (the last id on it); None starts from the beginning.
+    Search totals stop counting at USER_SEARCH_MAX_COUNT, so a query that
+    matches most users doesn't have to visit all of them.
+    """
+    conn = get_db_connection(db_path)
+    query = (query or "").strip()
+    after = int(cursor or 0)
+    if len(query) >= 3:
+        match = '"' + query.replace('"', '""') + '"'
+        rows = conn.execute(
+            '''SELECT u.id, u.username, u.email
+                 FROM users_fts JOIN users AS u ON u.id = users_fts.rowid
+                WHERE users_fts MATCH ? AND users_fts.rowid > ?
+                ORDER BY users_fts.rowid LIMIT ?''', (match, after, limit + 1)).fetchall()
+        total = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM users_fts WHERE users_fts MATCH ? LIMIT ?)",
+            (match, USER_SEARCH_MAX_COUNT)).fetchone()[0]
+    elif query:
+        prefix = _like_prefix(query)
+        rows = conn.execute(
+            '''SELECT id, username, email FROM users
+                WHERE (username LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\') AND id > ?
+                ORDER BY id LIMIT ?''', (prefix, prefix, after, limit + 1)).fetchall()
+        total = conn.execute(
+            '''SELECT COUNT(*) FROM (SELECT 1 FROM users
+                WHERE username LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\' LIMIT ?)''',
+            (prefix, prefix, USER_SEARCH_MAX_COUNT)).fetchone()[0]
+    else:
+        rows = conn.execute("SELECT id, username, email FROM users WHERE id > ? ORDER BY id LIMIT ?",
+                            (after, limit + 1)).fetchall()
+        total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    next_cursor = rows[limit - 1]["id"] if len(rows) > limit else None
+    return rows[:limit], next_cursor, total
+
+@retry_on_busy
 def delete_user(user_id):
     """ Delete a user by their ID. """
-    conn = get_db_connection("users.db")
+    conn = get_db_connection(USERS_DB)
     cursor = conn.cursor()
     cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
     conn.commit()
-    conn.close()
 
+@retry_on_busy
 def update_user(user_id, username=None, email=None, password=None):
     """ Update user details (username, email, or password). """
-    conn = get_db_connection("users.db")
+    conn = get_db_connection(USERS_DB)
     cursor = conn.cursor()
 
     # Prepare the update query
@@ -255,7 +265,7 @@ def update_user(user_id, username=None, email=None, password=None):
         params.append(email)
     
     if password:
-        hashed_pw = sha256(password.encode()).hexdigest()
+        hashed_pw = _hash_password(password)
         update_fields.append("password = ?")
         params.append(hashed_pw)
     
@@ -264,41 +274,48 @@ def update_user(user_id, username=None, email=None, password=None):
         set_clause = ", ".join(update_fields)
         query = f"UPDATE users SET {set_clause} WHERE id = ?"
         params.append(user_id)
-        cursor.execute(query, tuple(params))
+        try:
+            cursor.execute(query, tuple(params))
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            raise _conflict(e, username, email) or e
         conn.commit()
     
-    conn.close()
 
 
 # ------------------------
 # Post and Analysis
 # ------------------------
 
+@retry_on_busy
 def save_user_post(username, post_content, sentiment, confidence):
-    """ Save user posts with sentiment analysis. """
-    timestamp = datetime.datetime.now().isoformat()
-    conn = get_db_connection("app_database.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        '''INSERT INTO user_posts (username, post_content, sentiment, confidence, timestamp)
-           VALUES (?, ?, ?, ?, ?)''',
-        (username, post_content, sentiment, confidence, timestamp)
-    )
-    conn.commit()
+    """ Save user posts with sentiment analysis.
 
-    cursor.execute(
-        '''INSERT INTO analysis (data_type, sentiment, confidence, timestamp)
-           VALUES (?, ?, ?, ?)''',
-        ("post", sentiment, confidence, timestamp)
-    )
-    conn.commit()
-    conn.close()
+    The post, its keyword hits and its analysis row are one transaction, so
+    a retry after SQLITE_BUSY never stores the post twice.
+    """
+    timestamp = datetime.datetime.now().isoformat()
+    hits = keywords.match(post_content)
+    conn = get_db_connection(APP_DB)
+    with conn:
+        post_id = conn.execute(
+            '''INSERT INTO user_posts (username, post_content, sentiment, confidence, timestamp)
+               VALUES (?, ?, ?, ?, ?)''',
+            (username, post_content, sentiment, confidence, timestamp)
+        ).lastrowid
+        keywords.record_hits(conn, post_id, hits)
+        conn.execute(
+            '''INSERT INTO analysis (data_type, sentiment, confidence, timestamp)
+               VALUES (?, ?, ?, ?)''',
+            ("post", sentiment, confidence, timestamp)
+        )
 
 
+@retry_on_busy
 def save_analysis_result(data_type, sentiment, confidence):
     """ Save generic sentiment analysis results. """
     timestamp = datetime.datetime.now().isoformat()
-    conn = get_db_connection("app_database.db")
+    conn = get_db_connection(APP_DB)
     cursor = conn.cursor()
     cursor.execute(
         '''INSERT INTO analysis (data_type, sentiment, confidence, timestamp)
@@ -306,229 +323,317 @@ def save_analysis_result(data_type, sentiment, confidence):
         (data_type, sentiment, confidence, timestamp)
     )
     conn.commit()
-    conn.close()
 
-def get_user_analysis(user_email):
-    """Return sentiment counts for the given user email."""
+# ------------------------
+# User-specific Analysis
+# ------------------------
+
+def get_user_analysis(user_email, db_path=APP_DB, users_db=USERS_DB):
+    """Return sentiment counts and average confidence for the given user email."""
     try:
-        # 1) Find username by email
-        conn_u = get_db_connection("users.db")
-        cur_u = conn_u.cursor()
-        cur_u.execute(
-            "SELECT username FROM users WHERE email = ?",
+        # The account (email index) and its trigger-maintained counters in
+        # one join. Posts are stored under either the username or the email,
+        # so both 'user:<key>' scopes (one primary-key range each) are summed.
+        rows = get_joined_connection(db_path, users_db).execute(
+            '''SELECT c.sentiment, SUM(c.posts) AS posts, SUM(c.confidence_sum) AS confidence_sum
+                 FROM users.users AS u
+                 LEFT JOIN counters AS c ON c.scope IN ('user:' || u.username, 'user:' || u.email)
+                WHERE u.email = ?
+                GROUP BY c.sentiment''',
             (user_email,)
-        )
-        row = cur_u.fetchone()
-        conn_u.close()
-        
-        if not row:
+        ).fetchall()
+
+        if not rows:
             print(f"User with email {user_email} not found.")
             return None
-        username = row["username"]
-
-        # 2) Count posts by sentiment
-        conn = get_db_connection("app_database.db")
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT COUNT(*) FROM user_posts WHERE username = ?",
-            (username,)
-        )
-        total = cur.fetchone()[0]
-        stats = {"total": total}
-
-        for sentiment in ("positive", "negative", "neutral"):
-            cur.execute(
-                "SELECT COUNT(*) FROM user_posts WHERE username = ? AND sentiment = ?",
-                (username, sentiment)
-            )
-            stats[sentiment] = cur.fetchone()[0]
-        conn.close()
-
-        print(f"Sentiment Data for {user_email} ({username}): {stats}")
+        scope = {row["sentiment"]: (row["posts"], row["confidence_sum"])
+                 for row in rows if row["sentiment"] is not None}
+
+        stats = {"total": scope.get(counters.ALL, (0, 0))[0]}
+        for sentiment in counters.SENTIMENTS:
+            count, confidence_sum = scope.get(sentiment, (0, 0))
+            stats[sentiment] = count
+            stats[f"{sentiment}_confidence"] = confidence_sum / count if count else 0
         return stats
 
     except Exception as e:
         print(f"Error getting user analysis for {user_email}: {e}")
         return None
 
-def get_user_analysis(user_email):
-    """Return sentiment counts and average confidence for the given user email."""
-    try:
-        # 1) Find username by email
-        conn_u = get_db_connection("users.db")
-        cur_u = conn_u.cursor()
-        cur_u.execute(
-            "SELECT username FROM users WHERE email = ?",
-            (user_email,)
-        )
-        row = cur_u.fetchone()
-        conn_u.close()
 
-        if not row:
-            print(f"User with email {user_email} not found.")
-            return None
-        username = row["username"]
+def get_analysis_stats():
+    """ Get overall sentiment analysis stats from the counters table. """
+    conn = get_db_connection(APP_DB)
+    scope = counters.read_scope(conn, "analysis")
+    return {
+        "total_analyzed": scope.get(counters.ALL, (0, 0))[0],
+        "positive_count": scope.get("positive", (0, 0))[0],
+        "negative_count": scope.get("negative", (0, 0))[0],
+        "neutral_count": scope.get("neutral", (0, 0))[0]
+    }
 
-        # 2) Count posts by sentiment and average confidence
-        conn = get_db_connection("app_database.db")
-        cur = conn.cursor()
 
-        # Get total posts for the user
-        cur.execute(
-            "SELECT COUNT(*) FROM user_posts WHERE username = ?",
-            (username,)
-        )
-        total = cur.fetchone()[0]
+# ------------------------
+# Keyset-paginated listings
+# ------------------------
+# Pages are ordered newest first by (timestamp, id) and continue from an
+# opaque cursor token instead of an OFFSET, so every page is one indexed
+# range read however deep the reader goes, and nothing holds more than a
+# page of rows in memory.
 
-        # Initialize the confidence values
-        positive_confidence = 0.0
-        negative_confidence = 0.0
-        neutral_confidence = 0.0
+POST_COLUMNS = ("id", "username", "post_content", "image_name", "sentiment",
+                "confidence", "timestamp", "reviewed")
+LISTING_COLUMNS = ("id", "username", "post_content", "sentiment", "confidence", "timestamp")
+PAGE_SIZE = 50
 
-        # Initialize the sentiment count
-        sentiment_counts = {"positive": 0, "negative": 0, "neutral": 0}
 
-        for sentiment in ("positive", "negative", "neutral"):
-            # Count the posts for each sentiment
-            cur.execute(
-                "SELECT COUNT(*), AVG(confidence) FROM user_posts WHERE username = ? AND sentiment = ?",
-                (username, sentiment)
-            )
-            count, avg_confidence = cur.fetchone()
-            sentiment_counts[sentiment] = count
-
-            # Add the confidence to the respective variable
-            if sentiment == "positive":
-                positive_confidence = avg_confidence or 0
-            elif sentiment == "negative":
-                negative_confidence = avg_confidence or 0
-            elif sentiment == "neutral":
-                neutral_confidence = avg_confidence or 0
-
-        conn.close()
-
-        stats = {
-            "total": total,
-            "positive": sentiment_counts["positive"],
-            "negative": sentiment_counts["negative"],
-            "neutral": sentiment_counts["neutral"],
-            "positive_confidence": positive_confidence,
-            "negative_confidence": negative_confidence,
-            "neutral_confidence": neutral_confidence
-        }
+def encode_cursor(timestamp, row_id):
+    """ Turn the sort key of the last row on a page into a cursor token. """
+    return base64.urlsafe_b64encode(json.dumps([timestamp, row_id]).encode()).decode()
 
-        return stats
 
-    except Exception as e:
-        print(f"Error getting user analysis for {user_email}: {e}")
-        return None
-
-
-def get_analysis_stats():
-    """ Get overall sentiment analysis stats. """
-    conn = get_db_connection("app_database.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM analysis")
-    total = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM analysis WHERE sentiment='positive'")
-    positive = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM analysis WHERE sentiment='negative'")
-    negative = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM analysis WHERE sentiment='neutral'")
-    neutral = cursor.fetchone()[0]
-    conn.close()
-    return {
-        "total_analyzed": total,
-        "positive_count": positive,
-        "negative_count": negative,
-        "neutral_count": neutral
-    }
+def decode_cursor(token):
+    """ Inverse of encode_cursor(); raises ValueError on a malformed token. """
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+    return timestamp, int(row_id)
+
+
+def _keyset_page(conn, select, where, params, key, page_size, cursor):
+    """ Run one page of `select` ordered by key=(timestamp expr, id expr) DESC.
+
+    Rows with a NULL timestamp sort after every dated row and are paged by
+    id alone, so a listing never skips them.
+    """
+    ts_col, id_col = key
+    ts_name, id_name = (col.split(".")[-1] for col in key)
+
+    def fetch(extra, extra_params, order, limit):
+        clauses = list(where) + extra
+        sql = select + (" WHERE " + " AND ".join(clauses) if clauses else "")
+        return conn.execute(f"{sql} ORDER BY {order} LIMIT ?",
+                            [*params, *extra_params, limit]).fetchall()
+
+    limit = page_size + 1
+    last_ts, last_id = decode_cursor(cursor) if cursor else (None, None)
+    if last_id is not None and last_ts is None:
+        rows = []
+    elif last_id is None:
+        rows = fetch([], [], f"{ts_col} DESC, {id_col} DESC", limit)
+    else:
+        rows = fetch([f"({ts_col}, {id_col}) < (?, ?)"], [last_ts, last_id],
+                     f"{ts_col} DESC, {id_col} DESC", limit)
+    if len(rows) < limit and last_id is not None:
+        # Dated rows are exhausted; continue into the undated tail.
+        tail = [f"{ts_col} IS NULL"] + ([f"{id_col} < ?"] if last_ts is None else [])
+        rows += fetch(tail, [last_id] if last_ts is None else [], f"{id_col} DESC", limit - len(rows))
+
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(rows[-1][ts_name], rows[-1][id_name])
+
+
+def _post_filters(username, sentiment, reviewed):
+    # sentiment and reviewed are inlined when they are known literals so the
+    # planner can match the partial review-queue index (migration 4).
+    where, params = [], []
+    if username is not None:
+        where.append("username = ?")
+        params.append(username)
+    if sentiment in counters.SENTIMENTS:
+        where.append(f"sentiment = '{sentiment}'")
+    elif sentiment is not None:
+        where.append("sentiment = ?")
+        params.append(sentiment)
+    if reviewed is not None:
+        where.append(f"reviewed = {int(bool(reviewed))}")
+    return where, params
+
+
+def list_posts(username=None, sentiment=None, reviewed=None, columns=LISTING_COLUMNS,
+               page_size=PAGE_SIZE, cursor=None, db_path=APP_DB):
+    """ Return (rows, next_cursor) for one page of user_posts, newest first.
+
+    Only `columns` (a subset of POST_COLUMNS) are selected; id and timestamp
+    are always included because the cursor is built from them. Pass
+    next_cursor back in to get the following page; it is None on the last.
+    """
+    unknown = set(columns) - set(POST_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown user_posts column(s): {', '.join(sorted(unknown))}")
+    selected = list(dict.fromkeys(["id", "timestamp", *columns]))
+    where, params = _post_filters(username, sentiment, reviewed)
+    conn = get_db_connection(db_path)
+    return _keyset_page(conn, f"SELECT {', '.join(selected)} FROM user_posts", where, params,
+                        ("timestamp", "id"), page_size, cursor)
+
+
+def iter_posts(username=None, sentiment=None, reviewed=None, columns=LISTING_COLUMNS,
+               page_size=500, cursor=None, db_path=APP_DB):
+    """ Yield user_posts rows newest first, fetching one page at a time. """
+    while True:
+        rows, cursor = list_posts(username, sentiment, reviewed, columns, page_size, cursor, db_path)
+        yield from rows
+        if cursor is None:
+            return
+
+
+def count_posts(username=None, sentiment=None, reviewed=None, db_path=APP_DB):
+    """ Count user_posts matching the same filters as list_posts(). """
+    where, params = _post_filters(username, sentiment, reviewed)
+    sql = "SELECT COUNT(*) FROM user_posts" + (" WHERE " + " AND ".join(where) if where else "")
+    return get_db_connection(db_path).execute(sql, params).fetchone()[0]
+
+
+def list_reviewed_posts(username, page_size=PAGE_SIZE, cursor=None, db_path=APP_DB):
+    """ Return (rows, next_cursor) of a user's posts with admin feedback, newest review first. """
+    conn = get_db_connection(db_path)
+    select = '''SELECT up.id AS post_id, up.timestamp AS flagged_at, up.post_content, up.image_name,
+                        up.sentiment, up.confidence, a.admin_username, a.comment AS admin_comment,
+                        a.timestamp AS timestamp, a.id AS id
+                   FROM user_posts AS up JOIN alerts AS a ON up.id = a.post_id'''
+    return _keyset_page(conn, select, ["up.username = ?"], [username],
+                        ("a.timestamp", "a.id"), page_size, cursor)
 
 
 def get_flagged_analyses():
-    """ Retrieve negative posts flagged for review. """
-    conn = get_db_connection("app_database.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT id, username, post_content, sentiment, confidence, timestamp
-        FROM user_posts
-        WHERE sentiment = 'negative'
-        ORDER BY timestamp DESC
-        """
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    return [
-        {"id": r["id"], "username": r["username"], "post_content": r["post_content"],
-         "sentiment": r["sentiment"], "confidence": r["confidence"], "timestamp": r["timestamp"]}
-        for r in rows
-    ]
+    """ Yield negative posts flagged for review, newest first. """
+    return iter_posts(sentiment="negative")
 
 
 def get_all_analyses():
-    """ Retrieve all posts with their sentiments. """
-    conn = get_db_connection("app_database.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT id, username, post_content, sentiment, confidence, timestamp
-        FROM user_posts
-        ORDER BY timestamp DESC
-        """
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    return [
-        {"id": r["id"], "username": r["username"], "post_content": r["post_content"],
-         "sentiment": r["sentiment"], "confidence": r["confidence"], "timestamp": r["timestamp"]}
-        for r in rows
-    ]
+    """ Yield all posts with their sentiments, newest first. """
+    return iter_posts()
 
 
+@retry_on_busy
 def mark_as_reviewed(flag_id):
     """ Mark a flagged post as reviewed. """
-    conn = get_db_connection("app_database.db")
+    conn = get_db_connection(APP_DB)
     cursor = conn.cursor()
     cursor.execute(
         "UPDATE user_posts SET reviewed = 1 WHERE id = ?",
         (flag_id,)
     )
     conn.commit()
-    conn.close()
 
 
 def get_all_posts():
-    """ Get all user posts. """
-    conn = get_db_connection("app_database.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM user_posts ORDER BY timestamp DESC")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    """ Yield every user post, newest first. """
+    return iter_posts(columns=POST_COLUMNS)
+
+# ------------------------
+# Keyword risk
+# ------------------------
+
+def list_high_risk_posts(limit=10, db_path=APP_DB):
+    """ Unreviewed posts with keyword hits, highest risk_score first. """
+    conn = get_db_connection(db_path)
+    return conn.execute(
+        '''SELECT id, username, post_content, sentiment, risk_score, timestamp FROM user_posts
+           WHERE reviewed = 0 AND risk_score > 0
+           ORDER BY risk_score DESC LIMIT ?''',
+        (limit,)
+    ).fetchall()
+
+
+def get_keyword_hits(post_ids, db_path=APP_DB):
+    """ Return {post_id: [(keyword, hits), ...]} for the given posts, heaviest first. """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return {}
+    conn = get_db_connection(db_path)
+    found = {}
+    for i in range(0, len(post_ids), 500):
+        chunk = post_ids[i:i + 500]
+        for post_id, keyword, hits in conn.execute(
+                f'''SELECT post_id, keyword, hits FROM post_keyword_hits
+                    WHERE post_id IN ({", ".join("?" * len(chunk))})
+                    ORDER BY post_id, weight DESC''', chunk):
+            found.setdefault(post_id, []).append((keyword, hits))
+    return found
+
+# ------------------------
+# Incremental review
+# ------------------------
+# The auto-reviewer remembers the last user_posts.id it has handled in the
+# watermarks table, so each run reads only posts written since the previous one.
+
+def get_watermark(name, db_path=APP_DB):
+    """ Return the stored watermark `name`, or 0 if it was never set. """
+    row = get_db_connection(db_path).execute(
+        "SELECT value FROM watermarks WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def latest_post_id(db_path=APP_DB):
+    """ Highest user_posts.id written so far (0 for an empty table). """
+    return get_db_connection(db_path).execute("SELECT MAX(id) FROM user_posts").fetchone()[0] or 0
+
+
+def get_flagged_after(after_id, up_to_id, limit, db_path=APP_DB, users_db=USERS_DB):
+    """ Unreviewed negative posts with after_id < id <= up_to_id, oldest first.
+
+    Each row carries its author's email, or None if the author has no
+    account. Posts store either the username or the email, so both are
+    looked up, each through its index on the attached users database.
+    """
+    conn = get_joined_connection(db_path, users_db)
+    return conn.execute(
+        '''SELECT up.id, up.username, up.post_content, up.confidence,
+                  COALESCE((SELECT email FROM users.users WHERE email = up.username),
+                           (SELECT email FROM users.users WHERE username = up.username)) AS email
+             FROM user_posts AS up
+            WHERE up.id > ? AND up.id <= ? AND up.sentiment = 'negative' AND up.reviewed = 0
+            ORDER BY up.id LIMIT ?''',
+        (after_id, up_to_id, limit)
+    ).fetchall()
+
+
+@retry_on_busy
+def save_alerts(alerts, watermark=None, mail=(), db_path=APP_DB):
+    """ Insert (post_id, admin_username, comment, timestamp) alert rows in one transaction.
+
+    (to_addr, subject, html_body) rows in `mail` are queued in the outbox and
+    watermark=(name, value) is advanced in the same transaction, so a crash
+    never records progress without the alerts and their notifications.
+    """
+    from backend import outbox   # smtplib and email.mime stay off the login page's imports
+    conn = get_db_connection(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO alerts (post_id, admin_username, comment, timestamp) VALUES (?, ?, ?, ?)",
+            alerts
+        )
+        for to_addr, subject, html_body in mail:
+            outbox.enqueue(to_addr, subject, html_body, conn=conn)
+        if watermark:
+            conn.execute(
+                '''INSERT INTO watermarks (name, value, updated_at) VALUES (?, ?, ?)
+                   ON CONFLICT(name) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at''',
+                (*watermark, datetime.datetime.now().isoformat())
+            )
 
 # ------------------------
 # System Statistics
 # ------------------------
 
 def get_system_stats():
-    """ Retrieve overall system stats. """
-    conn = get_db_connection("app_database.db")
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM user_posts")
-    total_posts = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(*) FROM user_posts WHERE sentiment = 'negative'")
-    negative_posts = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(DISTINCT username) FROM user_posts")
-    total_users = cursor.fetchone()[0]
-    conn.close()
+    """ Retrieve overall system stats from the counters table. """
+    conn = get_db_connection(APP_DB)
+    scope = counters.read_scope(conn, "global")
     return {
-        "total_posts": total_posts,
-        "negative_posts": negative_posts,
-        "total_users": total_users
+        "total_posts": scope.get(counters.ALL, (0, 0))[0],
+        "negative_posts": scope.get("negative", (0, 0))[0],
+        "total_users": scope.get(counters.USERS, (0, 0))[0]
     }
 
 # ------------------------
-# Initialize database on import
+# Instrumentation and initialization on import
 # ------------------------
+metrics.instrument_module(globals(), "database", exclude=(
+    "get_db_connection", "get_joined_connection", "encode_cursor", "decode_cursor"))
 create_db()
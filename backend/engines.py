@@ -0,0 +1,215 @@
+import os
+import re
+import threading
+from importlib import metadata
+
+from backend import metrics
+
+# ------------------------
+# Engine configuration
+# ------------------------
+# Every engine maps a polarity in [-1, 1] onto positive/negative/neutral using
+# its own thresholds. VADER's compound score and TextBlob's polarity are on
+# the same scale but are calibrated differently, hence the separate defaults.
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+
+# The comment thresholds are the sentence polarities at or below which
+# auto-review calls a sentence "quite" / "somewhat" negative. Each engine
+# has its own scale: VADER's compound score reaches -0.5 on a single mildly
+# negative word, where TextBlob stays nearer zero.
+ENGINE_CONFIG = {
+    "vader": {"positive_threshold": 0.05, "negative_threshold": -0.05,
+              "severe_comment_threshold": -0.7, "mild_comment_threshold": -0.3},
+    "textblob": {"positive_threshold": 0.1, "negative_threshold": -0.1,
+                 "severe_comment_threshold": -0.5, "mild_comment_threshold": -0.2},
+    # Local sequence-classification model, see backend/transformer.py
+    "transformer": {
+        "model_dir": os.environ.get(
+            "SENTIMENT_MODEL_DIR", os.path.join(BASE_DIR, "data", "models", "sentiment")),
+        "positive_threshold": 0.05,
+        "negative_threshold": -0.05,
+        "severe_comment_threshold": -0.8,
+        "mild_comment_threshold": -0.4,
+        "max_batch_size": 32,
+        "max_wait_ms": 5,
+        "max_length": 256,
+    },
+}
+
+# Engine used when callers don't ask for one explicitly.
+DEFAULT_ENGINE = os.environ.get("SENTIMENT_ENGINE", "vader")
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+class SentimentEngine:
+    """ Common interface for sentiment backends.
+
+    Subclasses implement load() and polarity(). Heavy imports belong in
+    load(), which the registry calls once, so selecting one engine never
+    imports the libraries of the others.
+    """
+    name = None
+    # Distribution whose version is part of the cache tag
+    package = None
+    # Options that don't change scores, so are left out of the cache tag
+    UNSCORED = ("severe_comment_threshold", "mild_comment_threshold")
+    # Entry points timed as engine.<name>.<method> (backend/metrics.py)
+    TIMED = ("score", "score_batch", "sentences")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for method in SentimentEngine.TIMED:
+            fn = getattr(cls, method)
+            if hasattr(fn, "metric_name"):   # inherited from a timed engine
+                fn = fn.__wrapped__
+            setattr(cls, method, metrics.timed(f"engine.{cls.name}.{method}")(fn))
+
+    def __init__(self, **config):
+        self.config = {**ENGINE_CONFIG.get(self.name, {}), **config}
+
+    def load(self):
+        pass
+
+    @property
+    def version(self):
+        """ Identify the engine build and thresholds, so cached scores can't go stale. """
+        if getattr(self, "_version", None) is None:
+            try:
+                lib = metadata.version(self.package) if self.package else "0"
+            except metadata.PackageNotFoundError:
+                lib = "0"
+            options = ",".join(f"{k}={v}" for k, v in sorted(self.config.items())
+                               if k not in self.UNSCORED)
+            self._version = f"{lib};{options}"
+        return self._version
+
+    def polarity(self, text):
+        raise NotImplementedError
+
+    def sentences(self, text):
+        """ Return (polarity, sentence) pairs for each sentence in text. """
+        parts = [s for s in _SENTENCE_SPLIT.split(text.strip()) if s]
+        return [(self.polarity(s), s) for s in parts]
+
+    def label(self, polarity):
+        if polarity >= self.config["positive_threshold"]:
+            sentiment = "positive"
+        elif polarity <= self.config["negative_threshold"]:
+            sentiment = "negative"
+        else:
+            sentiment = "neutral"
+        # Confidence level as the absolute value of the polarity
+        return {"sentiment": sentiment, "confidence": round(abs(polarity), 2),
+                "polarity": polarity}
+
+    def score(self, text):
+        return self.label(self.polarity(text))
+
+    def score_batch(self, texts):
+        return [self.label(self.polarity(text)) for text in texts]
+
+    def warm_up(self):
+        self.score("warm up")
+
+
+class VaderEngine(SentimentEngine):
+    name = "vader"
+    package = "vaderSentiment"
+
+    def load(self):
+        # Building the analyzer parses the whole VADER lexicon; it is only
+        # read afterwards, so one instance is shared by all threads.
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        self.analyzer = SentimentIntensityAnalyzer()
+
+    def polarity(self, text):
+        return self.analyzer.polarity_scores(text)["compound"]
+
+    def score_batch(self, texts):
+        polarity_scores = self.analyzer.polarity_scores
+        return [self.label(polarity_scores(text)["compound"]) for text in texts]
+
+
+class TextBlobEngine(SentimentEngine):
+    name = "textblob"
+    package = "textblob"
+
+    def load(self):
+        from textblob import TextBlob
+        self._blob = TextBlob
+
+    def polarity(self, text):
+        return self._blob(text).sentiment.polarity
+
+    def sentences(self, text):
+        return [(s.sentiment.polarity, str(s)) for s in self._blob(text).sentences]
+
+
+# ------------------------
+# Registry
+# ------------------------
+
+def _transformer_engine():
+    # Imported on demand so torch is only loaded when this engine is selected.
+    from backend.transformer import create_engine
+    return create_engine()
+
+
+_factories = {
+    "vader": VaderEngine,
+    "textblob": TextBlobEngine,
+    "transformer": _transformer_engine,
+}
+_instances = {}
+# Names whose factory fell back to another engine (e.g. "transformer" without
+# a model -> "vader"), so the fallback is shared, never stored under them.
+_aliases = {}
+_lock = threading.Lock()
+
+
+def register_engine(name, factory):
+    """ Register an engine factory (usually a SentimentEngine subclass). """
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+        _aliases.pop(name, None)
+
+
+def available_engines():
+    return sorted(_factories)
+
+
+def configure_engine(name, **options):
+    """ Override configuration for an engine; it is rebuilt on next use. """
+    if name not in _factories:
+        raise ValueError(f"Unknown sentiment engine: {name}")
+    with _lock:
+        ENGINE_CONFIG[name] = {**ENGINE_CONFIG.get(name, {}), **options}
+        _instances.pop(name, None)
+        _aliases.pop(name, None)
+
+
+def get_engine(name=None):
+    """ Return the shared, loaded instance of an engine (default engine if None). """
+    name = name or DEFAULT_ENGINE
+    name = _aliases.get(name, name)
+    engine = _instances.get(name)
+    if engine is not None:
+        return engine
+    with _lock:
+        name = _aliases.get(name, name)
+        engine = _instances.get(name)
+        if engine is None:
+            if name not in _factories:
+                raise ValueError(f"Unknown sentiment engine: {name}")
+            engine = _factories[name]()
+            if engine.name != name and engine.name in _factories:
+                # The factory fell back to another registered engine.
+                _aliases[name] = name = engine.name
+                if name in _instances:
+                    return _instances[name]
+            engine.load()
+            _instances[name] = engine
+    return engine
@@ -0,0 +1,219 @@
+"""
+Bulk-ingest posts from a CSV or JSONL file into user_posts and analysis.
+
+The file is streamed in chunks of lines, chunks are scored in a process
+pool, and results are written with executemany() in large transactions.
+The byte offset reached is committed in the same transaction as the rows,
+so an interrupted run resumes exactly where the last commit ended.
+
+CSV files need a header row and one record per line. Recognised columns
+(JSONL keys) are username/user/email, post_content/text/content and an
+optional ISO timestamp. Records without a username or content, and JSONL
+lines that are not a JSON object, are skipped and counted rather than
+aborting the run.
+
+    python -m backend.ingest posts.jsonl --workers 4
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from backend import keywords, migrations
+from backend.connection import APP_DB, get_connection
+
+DEFAULT_DB = APP_DB
+
+USERNAME_FIELDS = ("username", "user", "email")
+CONTENT_FIELDS = ("post_content", "text", "content")
+
+
+# ------------------------
+# Reading
+# ------------------------
+
+def _pick(record, fields):
+    for field in fields:
+        value = record.get(field)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _json_records(lines):
+    # A malformed line or a non-object value becomes None, so it is counted as skipped.
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record if isinstance(record, dict) else None
+
+
+def _parse(fmt, lines, header):
+    """ Return (rows, skipped) for one chunk of lines. """
+    if fmt == "jsonl":
+        records = _json_records(lines)
+    else:
+        records = csv.DictReader(io.StringIO("".join(lines)), fieldnames=header)
+    rows, skipped = [], 0
+    for record in records:
+        username = _pick(record, USERNAME_FIELDS) if record else None
+        content = _pick(record, CONTENT_FIELDS) if record else None
+        if username is None or content is None:
+            skipped += 1
+            continue
+        rows.append((str(username), str(content), record.get("timestamp")))
+    return rows, skipped
+
+
+def read_chunks(path, fmt, start_offset=0, chunk_lines=5000):
+    """ Yield (end_offset, lines, header) chunks from start_offset onwards. """
+    with open(path, "rb") as f:
+        header = None
+        if fmt == "csv":
+            header = next(csv.reader([f.readline().decode("utf-8-sig")]))
+            start_offset = max(start_offset, f.tell())
+        f.seek(start_offset)
+        while True:
+            lines = []
+            for _ in range(chunk_lines):
+                line = f.readline()
+                if not line:
+                    break
+                lines.append(line.decode("utf-8"))
+            if not lines:
+                return
+            yield f.tell(), lines, header
+
+
+# ------------------------
+# Scoring (runs in worker processes)
+# ------------------------
+
+def _init_worker(engine):
+    from backend import sentiment
+    sentiment.warm_up(engine)
+
+
+def score_chunk(fmt, lines, header, engine):
+    """ Return (rows, keyword hits per row, records skipped) for one chunk. """
+    from backend import keywords, sentiment
+    rows, skipped = _parse(fmt, lines, header)
+    results = sentiment.analyze_many([content for _, content, _ in rows], engine=engine)
+    now = datetime.datetime.now().isoformat()
+    scored = [
+        (username, content, r["sentiment"], r["confidence"], timestamp or now)
+        for (username, content, timestamp), r in zip(rows, results)
+    ]
+    return scored, [keywords.match(content) for _, content, _ in rows], skipped
+
+
+# ------------------------
+# Writing
+# ------------------------
+
+def get_checkpoint(conn, source):
+    row = conn.execute(
+        "SELECT byte_offset, rows FROM ingest_checkpoints WHERE source = ?", (source,)).fetchone()
+    return row if row else (0, 0)
+
+
+def write_batch(conn, source, rows, end_offset, total_rows, hits=()):
+    """ Insert scored rows (and their keyword hits) and advance the checkpoint in one transaction. """
+    with conn:
+        conn.executemany(
+            '''INSERT INTO user_posts (username, post_content, sentiment, confidence, timestamp)
+               VALUES (?, ?, ?, ?, ?)''', rows)
+        # One writer inside one transaction, so the batch got consecutive ids.
+        first_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0] - len(rows) + 1
+        for offset, post_hits in enumerate(hits):
+            keywords.record_hits(conn, first_id + offset, post_hits)
+        conn.executemany(
+            '''INSERT INTO analysis (data_type, sentiment, confidence, timestamp)
+               VALUES ('post', ?, ?, ?)''', [(s, c, ts) for _, _, s, c, ts in rows])
+        conn.execute(
+            '''INSERT OR REPLACE INTO ingest_checkpoints (source, byte_offset, rows, updated_at)
+               VALUES (?, ?, ?, ?)''',
+            (source, end_offset, total_rows, datetime.datetime.now().isoformat()))
+
+
+def ingest(path, db_path=DEFAULT_DB, fmt=None, workers=None, chunk_lines=5000,
+           start_offset=None, engine=None, restart=False, report_every=10):
+    """ Stream path into the database and return (rows, seconds).
+
+    Unusable records are skipped; each chunk that had some is reported
+    with the byte offset it ends at, and the total at the end.
+    """
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    source = os.path.abspath(path)
+    migrations.migrate_app_db(db_path)
+    conn = get_connection(db_path)
+
+    offset, total = (0, 0) if restart else get_checkpoint(conn, source)
+    if start_offset is not None:
+        offset = start_offset
+    if offset:
+        print(f"Resuming {path} from byte {offset} ({total} rows already ingested)")
+
+    workers = workers or os.cpu_count() or 1
+    ingested = skipped = 0
+    started = time.perf_counter()
+    in_flight = deque()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(engine,)) as pool:
+        def drain_one():
+            nonlocal total, ingested, skipped
+            end_offset, future = in_flight.popleft()
+            rows, hits, bad = future.result()
+            if bad:
+                print(f"Skipped {bad} unusable records in the chunk ending at byte {end_offset}")
+                skipped += bad
+            total += len(rows)
+            ingested += len(rows)
+            write_batch(conn, source, rows, end_offset, total, hits)
+
+        for n, (end_offset, lines, header) in enumerate(
+                read_chunks(path, fmt, offset, chunk_lines), start=1):
+            # Keep a bounded window of chunks in flight, so memory stays flat
+            # and commits happen in file order.
+            in_flight.append((end_offset, pool.submit(score_chunk, fmt, lines, header, engine)))
+            if len(in_flight) >= workers * 2:
+                drain_one()
+            if n % report_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{ingested} rows, {ingested / elapsed:,.0f} rows/sec, byte {end_offset}")
+        while in_flight:
+            drain_one()
+
+    elapsed = time.perf_counter() - started
+    print(f"Ingested {ingested} rows in {elapsed:.1f}s ({ingested / (elapsed or 1):,.0f} rows/sec)")
+    if skipped:
+        print(f"Skipped {skipped} records that were not JSON objects or had no username or content")
+    return ingested, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-ingest posts from CSV/JSONL.")
+    parser.add_argument("path")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--chunk-lines", type=int, default=5000)
+    parser.add_argument("--offset", type=int, help="start at this byte offset instead of the checkpoint")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    parser.add_argument("--engine", help="sentiment engine (default: SENTIMENT_ENGINE)")
+    args = parser.parse_args(argv)
+    ingest(args.path, db_path=args.db, fmt=args.format, workers=args.workers,
+           chunk_lines=args.chunk_lines, start_offset=args.offset, engine=args.engine,
+           restart=args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Mental-health keyword detection with an Aho-Corasick automaton.
+
+The phrases in data/mental_health_keywords.txt are compiled once into a
+trie with failure links, so finding every phrase in a post is one pass
+over its characters however many phrases there are. The matcher checks
+the file's mtime every few seconds and recompiles when it changes.
+
+Hits are stored per post in post_keyword_hits, and their weighted sum in
+user_posts.risk_score ranks the admin review queue (migration 10).
+
+    python -m backend.keywords --text "I feel hopeless"
+    python -m backend.keywords --rescan [--db PATH]   # after editing the list
+"""
+import argparse
+import os
+import threading
+import time
+from collections import Counter, deque
+
+from backend.connection import APP_DB, get_connection
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+KEYWORDS_PATH = os.environ.get(
+    "MENTAL_HEALTH_KEYWORDS", os.path.join(BASE_DIR, "data", "mental_health_keywords.txt"))
+RELOAD_CHECK_SECONDS = 2.0
+
+
+def normalize(text):
+    """ Lower-case, straighten apostrophes and collapse whitespace. """
+    return " ".join((text or "").lower().replace("’", "'").split())
+
+
+def parse_keywords(lines):
+    """ Return {phrase: weight} from 'phrase [| weight]' lines; '#' starts a comment. """
+    weights = {}
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        phrase, _, weight = line.partition("|")
+        phrase = normalize(phrase)
+        if phrase:
+            weights[phrase] = float(weight) if weight.strip() else 1.0
+    return weights
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+class Automaton:
+    """ Aho-Corasick automaton over a fixed list of phrases. """
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+        # Per phrase: length, and whether its first/last char needs a word boundary.
+        self.spans = [(len(p), _is_word_char(p[0]), _is_word_char(p[-1])) for p in self.phrases]
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for ch in phrase:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = nxt
+            self.out[state] += (index,)
+
+        # Breadth-first: a node's failure link is the longest proper suffix
+        # of its path that is also a path in the trie.
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def find(self, text):
+        """ Yield (start, phrase index) for every whole-word occurrence in normalized text. """
+        goto, fail, out, spans = self.goto, self.fail, self.out, self.spans
+        last = len(text) - 1
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                after_word = end < last and _is_word_char(text[end + 1])
+                for index in out[state]:
+                    length, word_start, word_end = spans[index]
+                    start = end - length + 1
+                    if word_end and after_word:
+                        continue
+                    if word_start and start and _is_word_char(text[start - 1]):
+                        continue
+                    yield start, index
+
+
+class KeywordMatcher:
+    """ Keyword list from a file, recompiled when the file changes. """
+
+    def __init__(self, path=KEYWORDS_PATH, check_interval=RELOAD_CHECK_SECONDS):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked = 0.0
+        self.weights = {}
+        self.automaton = Automaton([])
+        self.reload_if_changed(force=True)
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def reload_if_changed(self, force=False):
+        """ Recompile if the file changed since the last load; return True if it did. """
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return False
+        with self._lock:
+            self._checked = now
+            stamp = self._file_stamp()
+            if stamp == self._stamp and not force:
+                return False
+            lines = []
+            if stamp is not None:
+                with open(self.path, encoding="utf-8") as f:
+                    lines = f.readlines()
+            weights = parse_keywords(lines)
+            # Swap both together; readers take one reference and use it.
+            self.weights, self.automaton = weights, Automaton(weights)
+            self._stamp = stamp
+            return True
+
+    def match(self, text):
+        """ Return {phrase: count} for the keywords in text. """
+        self.reload_if_changed()
+        automaton = self.automaton
+        return dict(Counter(automaton.phrases[i] for _, i in automaton.find(normalize(text))))
+
+    def score(self, hits):
+        weights = self.weights
+        return sum(weights.get(phrase, 1.0) * count for phrase, count in hits.items())
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher():
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                _matcher = KeywordMatcher()
+    return _matcher
+
+
+def match(text):
+    return get_matcher().match(text)
+
+
+def record_hits(conn, post_id, hits):
+    """ Store one post's hits and risk score on conn (the caller commits). """
+    if not hits:
+        return
+    matcher = get_matcher()
+    conn.executemany(
+        "INSERT OR REPLACE INTO post_keyword_hits (post_id, keyword, hits, weight) VALUES (?, ?, ?, ?)",
+        [(post_id, phrase, count, matcher.weights.get(phrase, 1.0)) for phrase, count in hits.items()]
+    )
+    conn.execute("UPDATE user_posts SET risk_score = ? WHERE id = ?", (matcher.score(hits), post_id))
+
+
+def rescan(conn, batch_size=5000):
+    """ Recompute hits and risk scores for every post (run inside a transaction). """
+    matcher = get_matcher()
+    matcher.reload_if_changed(force=True)
+    conn.execute("DELETE FROM post_keyword_hits")
+    conn.execute("UPDATE user_posts SET risk_score = 0 WHERE risk_score != 0")
+    last_id, scanned = 0, 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, post_content FROM user_posts WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size)).fetchall()
+        if not rows:
+            return scanned
+        for post_id, content in rows:
+            record_hits(conn, post_id, matcher.match(content))
+        last_id = rows[-1][0]
+        scanned += len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Match or rescan mental-health keywords.")
+    parser.add_argument("--db", default=APP_DB)
+    parser.add_argument("--text", help="print the hits for this text")
+    parser.add_argument("--rescan", action="store_true", help="recompute hits for every stored post")
+    args = parser.parse_args(argv)
+
+    matcher = get_matcher()
+    print(f"{len(matcher.weights)} keywords from {matcher.path}")
+    if args.text is not None:
+        hits = matcher.match(args.text)
+        print(hits, "score:", matcher.score(hits))
+    if args.rescan:
+        from backend import migrations
+        migrations.migrate_app_db(args.db)
+        conn = get_connection(args.db)
+        with conn:
+            print(f"Rescanned {rescan(conn)} posts.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Lease-based leader election stored in SQLite.
+
+A lease is a row in the leases table naming its holder and when it
+expires. acquire() takes the lease if it is free, expired or already ours
+and pushes the expiry ttl seconds out, so the holder heartbeats by calling
+it again well before then. If the holder dies, the next contender to call
+acquire() after the expiry takes over. Times are epoch seconds, so
+contenders on different hosts need roughly synchronised clocks.
+"""
+import os
+import socket
+import time
+import uuid
+
+from backend.connection import get_connection, retry_on_busy
+
+DEFAULT_TTL = 30.0
+
+
+def default_holder():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderLock:
+    """ One named lease; `held` reflects the outcome of the last acquire(). """
+
+    def __init__(self, name, db_path, ttl=DEFAULT_TTL, holder=None):
+        self.name = name
+        self.db_path = db_path
+        self.ttl = ttl
+        self.holder = holder or default_holder()
+        self.held = False
+
+    @retry_on_busy
+    def acquire(self):
+        """ Take or renew the lease; return True while we hold it. """
+        now = time.time()
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute(
+                '''INSERT INTO leases (name, holder, acquired_at, heartbeat_at, expires_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(name) DO UPDATE SET
+                       holder = excluded.holder,
+                       acquired_at = CASE WHEN leases.holder = excluded.holder
+                                          THEN leases.acquired_at ELSE excluded.acquired_at END,
+                       heartbeat_at = excluded.heartbeat_at,
+                       expires_at = excluded.expires_at
+                   WHERE leases.holder = excluded.holder OR leases.expires_at < excluded.heartbeat_at''',
+                (self.name, self.holder, now, now, now + self.ttl)
+            )
+            self.held = conn.execute("SELECT changes()").fetchone()[0] == 1
+        return self.held
+
+    @retry_on_busy
+    def release(self):
+        """ Give the lease up early so a standby can take over immediately. """
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (self.name, self.holder))
+        self.held = False
+
+
+def current(name, db_path):
+    """ Return the live lease row for `name`, or None if nobody holds it. """
+    row = get_connection(db_path).execute(
+        "SELECT holder, acquired_at, heartbeat_at, expires_at FROM leases WHERE name = ?", (name,)
+    ).fetchone()
+    return row if row and row["expires_at"] >= time.time() else None
@@ -0,0 +1,337 @@
+"""
+Call counts, error counts and latency histograms for the hot paths.
+
+    @metrics.timed("outbox.connect")
+    def connect(self): ...
+
+    with metrics.timer(f"worker.{name}"):
+        fn()
+
+Every backend/database.py function, sentiment engine call, worker job,
+SMTP send and chart draw is timed under a dotted name ("database.
+save_user_post", "engine.vader.score", ...). Latencies go into fixed
+buckets like a Prometheus histogram, so recording is a bisect and three
+increments and memory does not grow with traffic.
+
+Recording is off unless METRICS_ENABLED=1 or enable() is called; while
+off, a timed call costs one flag check. Each process keeps its own
+numbers. start_exporter() writes them every METRICS_EXPORT_INTERVAL
+seconds to METRICS_DIR/sentiment_<process>.prom in the Prometheus text
+format, for the node exporter's textfile collector; the admin
+Performance page shows the running process and reads the other files.
+"""
+import bisect
+import functools
+import inspect
+import os
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
+
+METRICS_DIR = os.environ.get("METRICS_DIR", os.path.join(BASE_DIR, "data", "metrics"))
+METRICS_EXPORT_INTERVAL = float(os.environ.get("METRICS_EXPORT_INTERVAL", 15))
+PREFIX = "sentiment_app"
+
+# Upper bounds in seconds, from a cached lookup to a stuck SMTP server.
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = os.environ.get("METRICS_ENABLED", "0") == "1"
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    """ Turn recording on or off for this process. """
+    global _enabled
+    _enabled = bool(on)
+
+
+# ------------------------
+# Histograms
+# ------------------------
+
+class Histogram:
+    """ Count, errors, total time and per-bucket counts of one name. """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)   # the last one is +Inf
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        i = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.calls += 1
+            self.errors += error
+            self.seconds += seconds
+            self.buckets[i] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors, "seconds": self.seconds,
+                    "buckets": list(self.buckets)}
+
+
+def quantile(buckets, q):
+    """ Estimate the q-quantile in seconds from bucket counts, like histogram_quantile(). """
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(buckets):
+        if seen + count >= rank and count:
+            if i == len(BUCKETS):
+                return BUCKETS[-1]   # above the last bound: all we know is its lower edge
+            lower = BUCKETS[i - 1] if i else 0.0
+            return lower + (BUCKETS[i] - lower) * (rank - seen) / count
+        seen += count
+    return BUCKETS[-1]
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(name):
+    """ Return the histogram for name, creating it on first use. """
+    h = _histograms.get(name)
+    if h is None:
+        with _histograms_lock:
+            h = _histograms.setdefault(name, Histogram())
+    return h
+
+
+def reset():
+    with _histograms_lock:
+        _histograms.clear()
+
+
+# ------------------------
+# Timing
+# ------------------------
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        histogram(self.name).observe(time.perf_counter() - self.start,
+                                     exc_type is not None and issubclass(exc_type, Exception))
+        return False
+
+
+_OFF = nullcontext()
+
+
+def timer(name):
+    """ Context manager that times its block under name (a no-op while disabled). """
+    return _Timer(name) if _enabled else _OFF
+
+
+def _timed_iteration(name, gen, elapsed):
+    """ Re-yield gen, recording the time spent producing its items (not consuming them). """
+    error = False
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(gen)
+            except StopIteration:
+                return
+            except Exception:
+                error = True
+                raise
+            finally:
+                elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        gen.close()
+        histogram(name).observe(elapsed, error)
+
+
+def timed(name):
+    """ Decorator that times every call under name; calls that raise count as errors.
+
+    A call that returns a generator is recorded when the generator is
+    exhausted or closed, with the time spent producing its items, so
+    streaming readers are measured by their queries rather than by how
+    long it took to create the generator.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                histogram(name).observe(time.perf_counter() - start, True)
+                raise
+            if inspect.isgenerator(result):
+                return _timed_iteration(name, result, time.perf_counter() - start)
+            histogram(name).observe(time.perf_counter() - start)
+            return result
+        wrapper.metric_name = name
+        return wrapper
+    return decorate
+
+
+def instrument_module(namespace, prefix, exclude=()):
+    """ Wrap every public function defined in a module with timed(f"{prefix}.{name}").
+
+    Call it with globals() at the end of the module, so its own calls and
+    every importer get the wrapped functions. Names in exclude (trivial
+    helpers called inside the timed functions) are left alone.
+    """
+    module = namespace["__name__"]
+    for name, fn in list(namespace.items()):
+        if (inspect.isfunction(fn) and fn.__module__ == module and not name.startswith("_")
+                and name not in exclude):
+            namespace[name] = timed(f"{prefix}.{name}")(fn)
+
+
+# ------------------------
+# Reporting
+# ------------------------
+
+def snapshot():
+    """ Return {name: {"calls", "errors", "seconds", "buckets"}} for this process. """
+    with _histograms_lock:
+        items = list(_histograms.items())
+    return {name: h.snapshot() for name, h in sorted(items)}
+
+
+def summary(snap):
+    """ Table rows (one per name) with mean and p50/p95/p99 in ms, slowest total first. """
+    rows = []
+    for name, s in snap.items():
+        rows.append({
+            "name": name,
+            "calls": s["calls"],
+            "errors": s["errors"],
+            "total_s": round(s["seconds"], 3),
+            "mean_ms": round(s["seconds"] / s["calls"] * 1000, 3) if s["calls"] else 0.0,
+            **{f"p{q}_ms": round(quantile(s["buckets"], q / 100) * 1000, 3) for q in (50, 95, 99)},
+        })
+    return sorted(rows, key=lambda row: -row["total_s"])
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(snap, process):
+    """ Render a snapshot in the Prometheus text exposition format. """
+    lines = [f"# HELP {PREFIX}_calls_total Calls to an instrumented function.",
+             f"# TYPE {PREFIX}_calls_total counter"]
+    labels = {name: f'name="{_label(name)}",process="{_label(process)}"' for name in snap}
+    lines += [f"{PREFIX}_calls_total{{{labels[name]}}} {s['calls']}" for name, s in snap.items()]
+    lines += [f"# HELP {PREFIX}_errors_total Calls that raised an exception.",
+              f"# TYPE {PREFIX}_errors_total counter"]
+    lines += [f"{PREFIX}_errors_total{{{labels[name]}}} {s['errors']}" for name, s in snap.items()]
+    lines += [f"# HELP {PREFIX}_latency_seconds Time spent per call.",
+              f"# TYPE {PREFIX}_latency_seconds histogram"]
+    for name, s in snap.items():
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), s["buckets"]):
+            cumulative += count
+            lines.append(f'{PREFIX}_latency_seconds_bucket{{{labels[name]},le="{bound}"}} {cumulative}')
+        lines.append(f"{PREFIX}_latency_seconds_sum{{{labels[name]}}} {s['seconds']!r}")
+        lines.append(f"{PREFIX}_latency_seconds_count{{{labels[name]}}} {s['calls']}")
+    return "\n".join(lines) + "\n"
+
+
+_SAMPLE = re.compile(r'^(\w+)\{name="((?:[^"\\]|\\.)*)",process="(?:[^"\\]|\\.)*"(?:,le="([^"]+)")?\} (\S+)$')
+
+
+def from_prometheus(text):
+    """ Parse to_prometheus() output back into a snapshot. """
+    snap = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if not match:
+            continue
+        metric, name, le, value = match.groups()
+        name = name.replace('\\"', '"').replace("\\n", "\n").replace("\\\\", "\\")
+        s = snap.setdefault(name, {"calls": 0, "errors": 0, "seconds": 0.0,
+                                   "buckets": [0] * (len(BUCKETS) + 1)})
+        if metric == f"{PREFIX}_calls_total":
+            s["calls"] = int(value)
+        elif metric == f"{PREFIX}_errors_total":
+            s["errors"] = int(value)
+        elif metric == f"{PREFIX}_latency_seconds_sum":
+            s["seconds"] = float(value)
+        elif metric == f"{PREFIX}_latency_seconds_bucket":
+            i = len(BUCKETS) if le == "+Inf" else BUCKETS.index(float(le))
+            s["buckets"][i] = int(value)
+    for s in snap.values():   # cumulative -> per bucket
+        s["buckets"] = [count - (s["buckets"][i - 1] if i else 0) for i, count in enumerate(s["buckets"])]
+    return snap
+
+
+def textfile_path(process, directory=METRICS_DIR):
+    return os.path.join(directory, f"sentiment_{process}.prom")
+
+
+def write_textfile(process, directory=METRICS_DIR):
+    """ Write this process's metrics for the textfile collector; return the path.
+
+    The file is replaced atomically, so a scrape never sees half of it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = textfile_path(process, directory)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(to_prometheus(snapshot(), process))
+    os.replace(tmp, path)
+    return path
+
+
+def read_textfiles(directory=METRICS_DIR):
+    """ Return {process: (modified, snapshot)} for every textfile in directory. """
+    found = {}
+    if not os.path.isdir(directory):
+        return found
+    for entry in sorted(os.listdir(directory)):
+        if entry.startswith("sentiment_") and entry.endswith(".prom"):
+            path = os.path.join(directory, entry)
+            with open(path, encoding="utf-8") as f:
+                found[entry[len("sentiment_"):-len(".prom")]] = (os.path.getmtime(path), from_prometheus(f.read()))
+    return found
+
+
+_exporters = {}
+
+
+def start_exporter(process, interval=METRICS_EXPORT_INTERVAL, directory=METRICS_DIR):
+    """ Write the textfile every interval seconds while recording is on (once per process). """
+    def run():
+        while True:
+            time.sleep(interval)
+            if _enabled:
+                try:
+                    write_textfile(process, directory)
+                except OSError as e:
+                    print(f"[metrics] could not write {textfile_path(process, directory)}: {e}")
+
+    with _histograms_lock:
+        if process not in _exporters:
+            _exporters[process] = threading.Thread(target=run, name=f"metrics-{process}", daemon=True)
+            _exporters[process].start()
+    return _exporters[process]
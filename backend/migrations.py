@@ -0,0 +1,418 @@
+"""
+Versioned schema migrations for the app and users databases.
+
+Each database records the migrations it has applied in a schema_version
+table. migrate_app_db()/migrate_users_db() apply whatever is missing inside
+one IMMEDIATE transaction, and remember per process which files are
+current, so calling them on every import or page rerun costs nothing.
+
+    python -m backend.migrations [--app PATH] [--users PATH]
+"""
+import argparse
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+
+from backend import counters, page_cache, post_search, rollups
+from backend.connection import APP_DB, USERS_DB, get_connection
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Migration steps
+# ------------------------
+# A step is either a list of SQL statements or a callable taking the
+# connection. Never edit a released step; append a new one instead.
+
+
+def _add_missing_columns(table, columns):
+    """ Build a step that adds columns older copies of a table don't have. """
+    def step(conn):
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, decl in columns:
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+    return step
+
+
+def _counter_delta(row, sign, scopes):
+    """ Upsert adding sign * row into the counters for each scope expression. """
+    values = ",\n".join(
+        f"({scope}, {sentiment}, {sign}, {sign} * COALESCE({row}.confidence, 0))"
+        for scope in scopes for sentiment in (f"COALESCE({row}.sentiment, '')", "'*'"))
+    return f'''INSERT INTO counters (scope, sentiment, posts, confidence_sum) VALUES
+               {values}
+               ON CONFLICT(scope, sentiment) DO UPDATE SET
+                   posts = posts + excluded.posts,
+                   confidence_sum = confidence_sum + excluded.confidence_sum;'''
+
+
+def _user_count_delta(row, sign):
+    """ Adjust the distinct-user counter when a user's first post arrives or last post goes. """
+    threshold = 1 if sign > 0 else 0
+    return f'''UPDATE counters SET posts = posts + ({sign})
+               WHERE scope = 'global' AND sentiment = '{counters.USERS}'
+                 AND (SELECT posts FROM counters
+                       WHERE scope = 'user:' || {row}.username AND sentiment = '*') = {threshold};'''
+
+
+def _create_counters(conn):
+    post_scopes = ("'global'", "'user:' || {row}.username")
+
+    def post_delta(row, sign):
+        scopes = [s.format(row=row) for s in post_scopes]
+        return _counter_delta(row, sign, scopes) + "\n" + _user_count_delta(row, sign)
+
+    conn.execute('''CREATE TABLE IF NOT EXISTS counters (
+                        scope TEXT NOT NULL,
+                        sentiment TEXT NOT NULL,
+                        posts INTEGER NOT NULL DEFAULT 0,
+                        confidence_sum REAL NOT NULL DEFAULT 0,
+                        PRIMARY KEY (scope, sentiment)
+                    ) WITHOUT ROWID''')
+    triggers = {
+        "trg_user_posts_count_insert": ("AFTER INSERT ON user_posts", post_delta("NEW", 1)),
+        "trg_user_posts_count_delete": ("AFTER DELETE ON user_posts", post_delta("OLD", -1)),
+        "trg_user_posts_count_update": (
+            "AFTER UPDATE OF username, sentiment, confidence ON user_posts",
+            post_delta("OLD", -1) + "\n" + post_delta("NEW", 1)),
+        "trg_analysis_count_insert": ("AFTER INSERT ON analysis",
+                                      _counter_delta("NEW", 1, ["'analysis'"])),
+        "trg_analysis_count_delete": ("AFTER DELETE ON analysis",
+                                      _counter_delta("OLD", -1, ["'analysis'"])),
+    }
+    for name, (event, body) in triggers.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event}\nBEGIN\n{body}\nEND")
+    counters.rebuild(conn)
+
+
+def _create_post_rollups(conn):
+    rollups.create_triggers(conn, "posts", update_columns=("sentiment", "timestamp"))
+    rollups.create_triggers(conn, "alerts", update_columns=("timestamp",))
+    rollups.rebuild(conn, ("posts", "alerts"))
+
+
+def _version_triggers(*tables):
+    """ Build a step that versions tables for backend/page_cache.py. """
+    def step(conn):
+        for table in tables:
+            page_cache.create_version_triggers(conn, table)
+    return step
+
+
+def _create_user_search(conn):
+    # Trigram FTS over username/email for substring search, kept in step
+    # with users by the standard external-content triggers.
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+                        username, email, content='users', content_rowid='id', tokenize='trigram'
+                    )''')
+    new_row = "INSERT INTO users_fts (rowid, username, email) VALUES (NEW.id, NEW.username, NEW.email);"
+    old_row = ("INSERT INTO users_fts (users_fts, rowid, username, email) "
+               "VALUES ('delete', OLD.id, OLD.username, OLD.email);")
+    for name, event, body in (("trg_users_fts_insert", "AFTER INSERT", new_row),
+                              ("trg_users_fts_delete", "AFTER DELETE", old_row),
+                              ("trg_users_fts_update", "AFTER UPDATE OF username, email", old_row + new_row)):
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} ON users BEGIN {body} END")
+    conn.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+    # Queries shorter than a trigram fall back to case-insensitive prefix ranges.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_username_nocase ON users(username COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_email_nocase ON users(email COLLATE NOCASE)")
+
+
+def _unique_user_keys(conn):
+    # The old check-then-insert signup could let two accounts share a
+    # username or email. The lowest id keeps the value unchanged. Later
+    # copies are listed in user_key_conflicts with their original value and
+    # the account that kept it, then get "~<id>" appended to the clashing
+    # column (nothing is deleted) so the unique indexes can be built. An
+    # operator resolves each conflict, e.g. by merging or re-mailing.
+    conn.execute('''CREATE TABLE IF NOT EXISTS user_key_conflicts (
+                        user_id INTEGER NOT NULL,
+                        field TEXT NOT NULL,
+                        original_value TEXT NOT NULL,
+                        kept_by INTEGER NOT NULL,
+                        detected_at TEXT NOT NULL,
+                        PRIMARY KEY (user_id, field)
+                    )''')
+    now = datetime.datetime.now().isoformat()
+    conflicts = 0
+    for column in ("username", "email"):
+        conflicts += conn.execute(f'''INSERT OR IGNORE INTO user_key_conflicts
+                                          (user_id, field, original_value, kept_by, detected_at)
+                                      SELECT u.id, '{column}', u.{column}, k.kept_by, ?
+                                        FROM users AS u
+                                        JOIN (SELECT {column} AS value, MIN(id) AS kept_by FROM users
+                                               GROUP BY {column} HAVING COUNT(*) > 1) AS k
+                                          ON u.{column} = k.value AND u.id <> k.kept_by''', (now,)).rowcount
+        conn.execute(f'''UPDATE users SET {column} = {column} || '~' || id
+                          WHERE id NOT IN (SELECT MIN(id) FROM users GROUP BY {column})''')
+        conn.execute(f"DROP INDEX IF EXISTS idx_users_{column}")
+        conn.execute(f"CREATE UNIQUE INDEX idx_users_{column} ON users({column})")
+    if conflicts:
+        logger.warning("%d duplicate usernames/emails were renamed to \"<value>~<id>\"; "
+                       "resolve them from the user_key_conflicts table", conflicts)
+
+
+def _create_post_search(conn):
+    post_search.create_index(conn)
+    post_search.rebuild(conn)
+
+
+def _create_signup_rollups(conn):
+    _add_missing_columns("users", [("created_at", "TEXT")])(conn)
+    rollups.create_triggers(conn, "signups")
+    rollups.rebuild(conn, ("signups",))
+
+
+APP_MIGRATIONS = [
+    (1, "base tables", [
+        '''CREATE TABLE IF NOT EXISTS user_posts (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               username TEXT NOT NULL,
+               post_content TEXT,
+               image_name TEXT,
+               sentiment TEXT,
+               confidence REAL,
+               timestamp TEXT,
+               reviewed INTEGER DEFAULT 0
+           )''',
+        '''CREATE TABLE IF NOT EXISTS analysis (
+               id INTEGER PRIMARY KEY,
+               data_type TEXT,
+               sentiment TEXT,
+               confidence REAL,
+               timestamp TEXT
+           )''',
+        '''CREATE TABLE IF NOT EXISTS alerts (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               post_id INTEGER,
+               admin_username TEXT,
+               comment TEXT,
+               timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY(post_id) REFERENCES user_posts(id) ON DELETE CASCADE
+           )''',
+        '''CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+               source TEXT PRIMARY KEY,
+               byte_offset INTEGER NOT NULL,
+               rows INTEGER NOT NULL,
+               updated_at TEXT
+           )''',
+    ]),
+    # Databases created by the old frontend/backend DDL each lack one of these.
+    (2, "reconcile user_posts columns", _add_missing_columns(
+        "user_posts", [("image_name", "TEXT"), ("reviewed", "INTEGER DEFAULT 0")])),
+    (3, "hot-path indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_user_posts_username_ts ON user_posts(username, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_user_posts_sentiment_ts ON user_posts(sentiment, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_user_posts_ts ON user_posts(timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_post_id ON alerts(post_id)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts(timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_analysis_sentiment ON analysis(sentiment)",
+    ]),
+    # user_posts.reviewed mirrors "has an alert", so the review queue can be
+    # read from a small partial index instead of an anti-join over alerts.
+    (4, "unreviewed negatives index", [
+        "UPDATE user_posts SET reviewed = 1 WHERE id IN (SELECT post_id FROM alerts)",
+        '''CREATE TRIGGER IF NOT EXISTS trg_alerts_mark_reviewed AFTER INSERT ON alerts
+           BEGIN
+               UPDATE user_posts SET reviewed = 1 WHERE id = NEW.post_id AND reviewed = 0;
+           END''',
+        '''CREATE INDEX IF NOT EXISTS idx_user_posts_unreviewed_negative
+               ON user_posts(sentiment, reviewed) WHERE sentiment = 'negative' AND reviewed = 0''',
+    ]),
+    # Trigger-maintained counters (backend/counters.py), backfilled from existing rows.
+    (5, "sentiment counters", _create_counters),
+    # Hourly/daily rollups for the admin dashboard (backend/rollups.py).
+    (6, "post and alert rollups", _create_post_rollups),
+    # Named high-watermarks for incremental jobs such as the auto-reviewer.
+    (7, "watermarks", [
+        '''CREATE TABLE IF NOT EXISTS watermarks (
+               name TEXT PRIMARY KEY,
+               value INTEGER NOT NULL,
+               updated_at TEXT
+           )''',
+    ]),
+    # Outbound mail queue drained by backend/outbox.py.
+    (8, "outbox", [
+        '''CREATE TABLE IF NOT EXISTS outbox (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               to_addr TEXT NOT NULL,
+               subject TEXT NOT NULL,
+               html_body TEXT NOT NULL,
+               status TEXT NOT NULL DEFAULT 'pending',
+               attempts INTEGER NOT NULL DEFAULT 0,
+               next_attempt_at TEXT NOT NULL,
+               last_error TEXT,
+               created_at TEXT NOT NULL,
+               sent_at TEXT
+           )''',
+        "CREATE INDEX IF NOT EXISTS idx_outbox_status_due ON outbox(status, next_attempt_at)",
+    ]),
+    # Leader leases for the background worker (backend/leader.py).
+    (9, "leases", [
+        '''CREATE TABLE IF NOT EXISTS leases (
+               name TEXT PRIMARY KEY,
+               holder TEXT NOT NULL,
+               acquired_at REAL NOT NULL,
+               heartbeat_at REAL NOT NULL,
+               expires_at REAL NOT NULL
+           )''',
+    ]),
+    # Keyword hits per post and the weighted risk score (backend/keywords.py).
+    (10, "keyword hits", [
+        '''CREATE TABLE IF NOT EXISTS post_keyword_hits (
+               post_id INTEGER NOT NULL,
+               keyword TEXT NOT NULL,
+               hits INTEGER NOT NULL,
+               weight REAL NOT NULL,
+               PRIMARY KEY (post_id, keyword)
+           ) WITHOUT ROWID''',
+        "CREATE INDEX IF NOT EXISTS idx_post_keyword_hits_keyword ON post_keyword_hits(keyword)",
+        "ALTER TABLE user_posts ADD COLUMN risk_score REAL NOT NULL DEFAULT 0",
+        '''CREATE INDEX IF NOT EXISTS idx_user_posts_unreviewed_risk
+               ON user_posts(risk_score) WHERE reviewed = 0 AND risk_score > 0''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_user_posts_hits_delete AFTER DELETE ON user_posts
+           BEGIN
+               DELETE FROM post_keyword_hits WHERE post_id = OLD.id;
+           END''',
+    ]),
+    # The alert store (backend/alert_handler.py) polls by id per user and per
+    # post; the post's username is copied onto the alert when it is written.
+    (11, "alert store", [
+        "ALTER TABLE alerts ADD COLUMN username TEXT",
+        "UPDATE alerts SET username = (SELECT username FROM user_posts WHERE user_posts.id = alerts.post_id)",
+        '''CREATE TRIGGER IF NOT EXISTS trg_alerts_username AFTER INSERT ON alerts
+               WHEN NEW.username IS NULL AND NEW.post_id IS NOT NULL
+           BEGIN
+               UPDATE alerts SET username = (SELECT username FROM user_posts WHERE id = NEW.post_id)
+                WHERE id = NEW.id;
+           END''',
+        "CREATE INDEX IF NOT EXISTS idx_alerts_username_id ON alerts(username, id)",
+        "CREATE INDEX IF NOT EXISTS idx_alerts_post_id_id ON alerts(post_id, id)",
+        "DROP INDEX IF EXISTS idx_alerts_post_id",
+    ]),
+    # Per-table change counters that invalidate cached page data.
+    (12, "data versions", _version_triggers("user_posts", "alerts")),
+    # Full-text index over post_content for the admin search page (backend/post_search.py).
+    (13, "post search", _create_post_search),
+    # data/seed_data.py resumes by chunk number, which used to be stored in
+    # ingest_checkpoints.byte_offset; existing seed runs move over here.
+    (14, "seed checkpoints", [
+        '''CREATE TABLE IF NOT EXISTS seed_checkpoints (
+               run TEXT PRIMARY KEY,
+               chunks INTEGER NOT NULL,
+               rows INTEGER NOT NULL,
+               updated_at TEXT
+           )''',
+        '''INSERT OR REPLACE INTO seed_checkpoints (run, chunks, rows, updated_at)
+           SELECT source, byte_offset, rows, updated_at FROM ingest_checkpoints
+            WHERE 'seed_data:' = substr(source, 1, 10)''',
+        "DELETE FROM ingest_checkpoints WHERE substr(source, 1, 10) = 'seed_data:'",
+    ]),
+]
+
+USERS_MIGRATIONS = [
+    (1, "base tables", [
+        '''CREATE TABLE IF NOT EXISTS users (
+               id INTEGER PRIMARY KEY,
+               username TEXT NOT NULL,
+               email TEXT NOT NULL,
+               password TEXT NOT NULL
+           )''',
+    ]),
+    (2, "user lookup indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)",
+        "CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)",
+    ]),
+    # Signup time, feeding the daily signups rollup. Older users stay NULL.
+    (3, "signup rollups", _create_signup_rollups),
+    (4, "data versions", _version_triggers("users")),
+    (5, "user search", _create_user_search),
+    # Registration is a single INSERT that these indexes make atomic.
+    (6, "unique usernames and emails", _unique_user_keys),
+]
+
+
+# ------------------------
+# Runner
+# ------------------------
+
+_current = set()
+_lock = threading.Lock()
+
+
+def latest_version(migrations):
+    return migrations[-1][0]
+
+
+def schema_version(conn):
+    try:
+        return conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+
+
+def migrate(db_path, migrations):
+    """ Apply pending migrations to db_path; return the number applied. """
+    key = (os.path.abspath(db_path), latest_version(migrations))
+    if key in _current:
+        return 0
+    with _lock:
+        if key in _current:
+            return 0
+        conn = get_connection(db_path)
+        if schema_version(conn) >= latest_version(migrations):
+            _current.add(key)
+            return 0
+
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute('''CREATE TABLE IF NOT EXISTS schema_version (
+                                version INTEGER PRIMARY KEY,
+                                name TEXT NOT NULL,
+                                applied_at TEXT NOT NULL
+                            )''')
+            # Re-read inside the write lock: another process may have migrated.
+            current = schema_version(conn)
+            applied = 0
+            for version, name, step in migrations:
+                if version <= current:
+                    continue
+                if callable(step):
+                    step(conn)
+                else:
+                    for statement in step:
+                        conn.execute(statement)
+                conn.execute("INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                             (version, name, datetime.datetime.now().isoformat()))
+                applied += 1
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        _current.add(key)
+        return applied
+
+
+def migrate_app_db(db_path):
+    return migrate(db_path, APP_MIGRATIONS)
+
+
+def migrate_users_db(db_path):
+    return migrate(db_path, USERS_MIGRATIONS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply schema migrations.")
+    parser.add_argument("--app", default=APP_DB)
+    parser.add_argument("--users", default=USERS_DB)
+    args = parser.parse_args(argv)
+    print(f"{args.app}: applied {migrate_app_db(args.app)} migration(s)")
+    print(f"{args.users}: applied {migrate_users_db(args.users)} migration(s)")
+
+
+if __name__ == "__main__":
+    main()
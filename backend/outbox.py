@@ -0,0 +1,258 @@
+"""
+Persistent outbound mail queue.
+
+Pages and jobs call enqueue() and return at once; a Sender drains the
+outbox table in batches. Each batch is split across at most `concurrency`
+threads and every thread sends its share over one authenticated SMTP
+session. Failures are retried with jittered exponential backoff and every
+message ends up 'sent' or 'failed' with its last error recorded.
+
+Rows being sent are leased (status 'sending' with next_attempt_at in the
+future), so a sender that dies mid-batch only delays those messages.
+
+    python -m backend.outbox [--db PATH] [--once]
+
+SMTP settings come from SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASS and
+SMTP_STARTTLS (set it to 0 for a local stand-in such as aiosmtpd).
+"""
+import argparse
+import datetime
+import os
+import random
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from backend import metrics
+from backend.connection import APP_DB, get_connection, retry_on_busy
+
+SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_USER = os.environ.get("SMTP_USER", "")
+SMTP_PASS = os.environ.get("SMTP_PASS", "")
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") != "0"
+
+BATCH_SIZE = 50
+CONCURRENCY = 4
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 30.0        # seconds before the first retry, doubled per attempt
+BACKOFF_MAX = 3600.0
+LEASE_SECONDS = 300.0      # how long a claimed batch stays reserved
+SMTP_TIMEOUT = 30.0
+
+PENDING, SENDING, SENT, FAILED = "pending", "sending", "sent", "failed"
+
+
+def _now(offset=0.0):
+    return (datetime.datetime.now() + datetime.timedelta(seconds=offset)).isoformat()
+
+
+def enqueue(to_addr, subject, html_body, conn=None, db_path=APP_DB):
+    """ Queue one message and return its id.
+
+    Pass `conn` to enqueue inside a transaction the caller already has
+    open (the caller commits); otherwise the row is committed here.
+    """
+    own = conn is None
+    conn = conn or get_connection(db_path)
+    now = _now()
+    cur = conn.execute(
+        '''INSERT INTO outbox (to_addr, subject, html_body, status, attempts, next_attempt_at, created_at)
+           VALUES (?, ?, ?, ?, 0, ?, ?)''',
+        (to_addr, subject, html_body, PENDING, now, now)
+    )
+    if own:
+        conn.commit()
+    return cur.lastrowid
+
+
+def stats(db_path=APP_DB):
+    """ Return {status: count} over the outbox. """
+    conn = get_connection(db_path)
+    counts = dict.fromkeys((PENDING, SENDING, SENT, FAILED), 0)
+    counts.update(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+    return counts
+
+
+def backoff(attempts):
+    """ Seconds to wait before retry number `attempts` (1-based), with jitter. """
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def is_permanent(error):
+    """ 5xx replies (bad recipient, rejected content) are not worth retrying. """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500 \
+        and not isinstance(error, smtplib.SMTPAuthenticationError)
+
+
+class Sender:
+    """ Drains the outbox over pooled SMTP sessions. """
+
+    def __init__(self, db_path=APP_DB, server=None, port=None, user=None, password=None,
+                 starttls=None, batch_size=BATCH_SIZE, concurrency=CONCURRENCY,
+                 max_attempts=MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.server = server or SMTP_SERVER
+        self.port = port or SMTP_PORT
+        self.user = SMTP_USER if user is None else user
+        self.password = SMTP_PASS if password is None else password
+        self.starttls = SMTP_STARTTLS if starttls is None else starttls
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self._stop = threading.Event()
+
+    # --- queue side ---
+
+    @retry_on_busy
+    def claim(self):
+        """ Lease up to batch_size due messages; return their rows. """
+        conn = get_connection(self.db_path)
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                '''SELECT id, to_addr, subject, html_body, attempts FROM outbox
+                   WHERE status IN (?, ?) AND next_attempt_at <= ?
+                   ORDER BY next_attempt_at LIMIT ?''',
+                (PENDING, SENDING, _now(), self.batch_size)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET status = ?, next_attempt_at = ? WHERE id = ?",
+                [(SENDING, _now(LEASE_SECONDS), row["id"]) for row in rows]
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return rows
+
+    @retry_on_busy
+    def record(self, results):
+        """ Store (row, error) outcomes: sent, retry later, or failed for good. """
+        sent, retry, failed = [], [], []
+        now = _now()
+        for row, error in results:
+            attempts = row["attempts"] + 1
+            if error is None:
+                sent.append((SENT, attempts, now, row["id"]))
+            elif is_permanent(error) or attempts >= self.max_attempts:
+                failed.append((FAILED, attempts, str(error)[:500], row["id"]))
+            else:
+                retry.append((PENDING, attempts, _now(backoff(attempts)), str(error)[:500], row["id"]))
+        conn = get_connection(self.db_path)
+        with conn:
+            conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, sent_at = ?, last_error = NULL WHERE id = ?", sent)
+            conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                retry)
+            conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ? WHERE id = ?", failed)
+        return len(sent), len(retry), len(failed)
+
+    # --- SMTP side ---
+
+    @metrics.timed("outbox.connect")
+    def connect(self):
+        session = smtplib.SMTP(self.server, self.port, timeout=SMTP_TIMEOUT)
+        if self.starttls:
+            session.starttls()
+        if self.user:
+            session.login(self.user, self.password)
+        return session
+
+    def message(self, row):
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = row["subject"]
+        msg["From"] = self.user or f"noreply@{self.server}"
+        msg["To"] = row["to_addr"]
+        msg.attach(MIMEText(row["html_body"], "html"))
+        return msg
+
+    def send_share(self, rows):
+        """ Send rows over one session; return [(row, error or None)]. """
+        try:
+            session = self.connect()
+        except (smtplib.SMTPException, OSError) as e:
+            return [(row, e) for row in rows]
+        results = []
+        try:
+            for i, row in enumerate(rows):
+                try:
+                    msg = self.message(row)
+                    with metrics.timer("outbox.send"):
+                        session.sendmail(msg["From"], [row["to_addr"]], msg.as_string())
+                    results.append((row, None))
+                except smtplib.SMTPServerDisconnected as e:
+                    # The session is gone; everything left waits for the next batch.
+                    results.extend((r, e) for r in rows[i:])
+                    return results
+                except (smtplib.SMTPException, OSError) as e:
+                    results.append((row, e))
+        finally:
+            try:
+                session.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        return results
+
+    def run_once(self):
+        """ Claim and send one batch; return (sent, retried, failed). """
+        rows = self.claim()
+        if not rows:
+            return 0, 0, 0
+        workers = min(self.concurrency, len(rows))
+        shares = [rows[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outbox") as pool:
+            results = [result for share in pool.map(self.send_share, shares) for result in share]
+        return self.record(results)
+
+    def run_forever(self, poll_interval=5.0):
+        """ Drain the outbox until stop() is called, sleeping when it is empty. """
+        while not self._stop.is_set():
+            try:
+                sent, retried, failed = self.run_once()
+            except Exception as e:
+                print(f"Outbox sender error: {e}")
+                sent = 0
+            if not sent and self._stop.wait(poll_interval):
+                break
+
+    def start(self, poll_interval=5.0):
+        """ Run run_forever() on a daemon thread and return the thread. """
+        thread = threading.Thread(target=self.run_forever, args=(poll_interval,),
+                                  name="outbox-sender", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send queued mail from the outbox table.")
+    parser.add_argument("--db", default=APP_DB)
+    parser.add_argument("--once", action="store_true", help="send one batch and exit")
+    parser.add_argument("--poll", type=float, default=5.0, help="seconds between polls when idle")
+    args = parser.parse_args(argv)
+
+    from backend import migrations
+    migrations.migrate_app_db(args.db)
+    sender = Sender(args.db)
+    if args.once:
+        print("sent=%d retried=%d failed=%d" % sender.run_once())
+        if metrics.enabled():
+            metrics.write_textfile("outbox")
+    else:
+        metrics.start_exporter("outbox")
+        sender.run_forever(args.poll)
+
+
+if __name__ == "__main__":
+    main()
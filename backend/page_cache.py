@@ -0,0 +1,146 @@
+"""
+Caching of page data keyed on table data versions.
+
+data_versions holds one counter per table, bumped by triggers on every
+insert, update and delete (migration 12 for the app database, 4 for
+users). A loader decorated with @cached(sources) remembers its result per
+argument tuple together with the versions of the tables it reads. A
+rerun that finds the same versions reuses the result, and checking costs
+one primary-key read per database instead of the loader's queries. Any
+write to a source table, from any process, invalidates it.
+
+    @page_cache.cached((DB_PATH, "user_posts"), (DB_PATH, "alerts"))
+    def load_summary(username): ...
+
+Results are shared across sessions, so loaders must return values the
+caller will not mutate. Per-loader hit counts are in stats().
+"""
+import functools
+import os
+import sqlite3
+import threading
+from collections import OrderedDict, defaultdict
+
+from backend.connection import get_connection
+
+PAGE_CACHE_SIZE = int(os.environ.get("PAGE_CACHE_SIZE", 2048))
+
+
+# ------------------------
+# Data versions
+# ------------------------
+
+CREATE_TABLE = '''CREATE TABLE IF NOT EXISTS data_versions (
+                      name TEXT PRIMARY KEY,
+                      version INTEGER NOT NULL DEFAULT 0
+                  ) WITHOUT ROWID'''
+
+
+def create_version_triggers(conn, table):
+    """ Create data_versions and the triggers that bump `table`'s version. """
+    conn.execute(CREATE_TABLE)
+    conn.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, 0)", (table,))
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+                         AFTER {event} ON {table}
+                         BEGIN
+                             UPDATE data_versions SET version = version + 1 WHERE name = '{table}';
+                         END''')
+
+
+def read_versions(db_path, tables):
+    """ Return {table: version} for one database; None if it has no data_versions yet. """
+    try:
+        rows = get_connection(db_path).execute(
+            f"SELECT name, version FROM data_versions WHERE name IN ({', '.join('?' * len(tables))})",
+            tuple(tables)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None
+    return dict(rows)
+
+
+# ------------------------
+# Cache
+# ------------------------
+
+class PageCache:
+    """ Bounded LRU of loader results, each stored with the versions it was read at. """
+
+    def __init__(self, max_entries=PAGE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def versions(self, sources):
+        by_db = defaultdict(list)
+        for db_path, table in sources:
+            by_db[db_path].append(table)
+        found = []
+        for db_path, tables in by_db.items():
+            versions = read_versions(db_path, tables)
+            if versions is None or len(versions) < len(tables):
+                return None
+            found.extend((db_path, t, versions[t]) for t in tables)
+        return tuple(found)
+
+    def get_or_load(self, name, key, sources, load):
+        versions = self.versions(sources)
+        if versions is not None:
+            with self._lock:
+                entry = self._entries.get((name, key))
+                if entry is not None and entry[0] == versions:
+                    self._entries.move_to_end((name, key))
+                    self._stats[name]["hits"] += 1
+                    return entry[1]
+        value = load()
+        with self._lock:
+            self._stats[name]["misses"] += 1
+            if versions is not None:
+                self._entries[(name, key)] = (versions, value)
+                self._entries.move_to_end((name, key))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def stats(self):
+        """ Return {loader: {"hits", "misses", "hit_rate"}} plus a "total" row. """
+        with self._lock:
+            rows = {name: dict(counts) for name, counts in self._stats.items()}
+        total = {"hits": sum(r["hits"] for r in rows.values()),
+                 "misses": sum(r["misses"] for r in rows.values())}
+        rows["total"] = total
+        for counts in rows.values():
+            calls = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = counts["hits"] / calls if calls else 0.0
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+
+_cache = PageCache()
+
+
+def get_cache():
+    return _cache
+
+
+def stats():
+    return _cache.stats()
+
+
+def cached(*sources):
+    """ Cache a loader until any of the (db_path, table) sources changes. """
+    def decorate(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            return _cache.get_or_load(name, key, sources, lambda: fn(*args, **kwargs))
+        return wrapper
+    return decorate
@@ -0,0 +1,179 @@
+"""
+Full-text search over user_posts.post_content for moderators.
+
+posts_fts is an FTS5 index over post_content (external content: the text
+lives only in user_posts). Triggers keep it in step with inserts, deletes
+and edits inside the writing transaction (migration 13). Words are
+stemmed (porter), so "cutting" also finds "cut".
+
+search() returns ranked (bm25) or newest-first matches with a snippet
+around the hits, filtered by sentiment, user and date range. Queries
+that match more than MAX_COUNT posts are ranked over the newest
+MAX_COUNT of them, which keeps common words fast on large tables. Snippets
+mark hits with \\x02 and \\x03; snippet_html() escapes the post text and
+turns the markers into <mark> tags.
+
+    python -m backend.post_search --rebuild [--db PATH]     # re-index everything
+    python -m backend.post_search --query "can't sleep" [--db PATH]
+"""
+import argparse
+import datetime
+import html
+import re
+import time
+
+from backend.connection import APP_DB, get_connection
+
+PAGE_SIZE = 20
+MAX_COUNT = 10000   # totals above this are reported as this
+SNIPPET_TOKENS = 16
+ORDERS = {"rank": "posts_fts.rank", "newest": "posts_fts.rowid DESC"}
+
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def create_index(conn):
+    """ Create posts_fts and the triggers that keep it current. """
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+                        post_content, content='user_posts', content_rowid='id',
+                        tokenize='porter unicode61 remove_diacritics 2'
+                    )''')
+    new_row = "INSERT INTO posts_fts (rowid, post_content) VALUES (NEW.id, NEW.post_content);"
+    old_row = ("INSERT INTO posts_fts (posts_fts, rowid, post_content) "
+               "VALUES ('delete', OLD.id, OLD.post_content);")
+    for name, event, body in (("trg_user_posts_fts_insert", "AFTER INSERT", new_row),
+                              ("trg_user_posts_fts_delete", "AFTER DELETE", old_row),
+                              ("trg_user_posts_fts_update", "AFTER UPDATE OF post_content", old_row + new_row)):
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} ON user_posts BEGIN {body} END")
+
+
+def rebuild(conn):
+    """ Re-index every post from user_posts (run inside a transaction). """
+    conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+
+
+def to_match(text):
+    """ Turn a search box string into an FTS5 query.
+
+    Words and "quoted phrases" must all appear; a trailing * makes a word
+    a prefix. Everything else is quoted, so FTS5 syntax in user input
+    can't cause a query error.
+    """
+    terms = []
+    for phrase, word in _TERM.findall(text or ""):
+        prefix = bool(word) and word.endswith("*")
+        term = (phrase or word.rstrip("*")).strip()
+        if term:
+            terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def _filters(sentiment, username, since, until):
+    where, params = [], []
+    if sentiment:
+        where.append("up.sentiment = ?")
+        params.append(sentiment)
+    if username:
+        where.append("up.username = ?")
+        params.append(username)
+    if since:
+        where.append("up.timestamp >= ?")
+        params.append(since.isoformat())
+    if until:
+        # Inclusive end date; timestamps are ISO strings with a time part.
+        where.append("up.timestamp < ?")
+        params.append((until + datetime.timedelta(days=1)).isoformat())
+    return where, params
+
+
+def search(query, sentiment=None, username=None, since=None, until=None, order="rank",
+           limit=PAGE_SIZE, offset=0, db_path=APP_DB):
+    """ Return (rows, total) of posts matching query, with a snippet per row.
+
+    since/until are datetime.date bounds (inclusive). order is "rank" (best
+    bm25 first) or "newest". total stops counting at MAX_COUNT, and when it
+    does, "rank" ranks the newest MAX_COUNT matches rather than scoring
+    every post that contains a common word.
+    """
+    match = to_match(query)
+    if not match:
+        return [], 0
+    where, params = _filters(sentiment, username, since, until)
+    where, params = ["posts_fts MATCH ?"] + where, [match] + params
+    if username:
+        # One user's posts are few: walk them and probe the index per post.
+        source = "user_posts AS up CROSS JOIN posts_fts ON posts_fts.rowid = up.id"
+    else:
+        # The index drives. A plain JOIN lets the planner walk a user_posts
+        # index for a filter instead and run the MATCH once per row.
+        source = "posts_fts CROSS JOIN user_posts AS up ON up.id = posts_fts.rowid"
+    conn = get_connection(db_path)
+    if (since or until) and not username:
+        # Bound the index walk by the ids posted in the date range. If ids
+        # are out of time order this is only looser; the timestamp filter
+        # still decides.
+        dates, date_params = _filters(None, None, since, until)
+        lo, hi = conn.execute(f"SELECT MIN(id), MAX(id) FROM user_posts AS up WHERE {' AND '.join(dates)}",
+                              date_params).fetchone()
+        if lo is None:
+            return [], 0
+        where.append("posts_fts.rowid BETWEEN ? AND ?")
+        params.extend((lo, hi))
+    total, oldest = conn.execute(
+        f'''SELECT COUNT(*), MIN(id) FROM (SELECT posts_fts.rowid AS id FROM {source}
+                                          WHERE {" AND ".join(where)}
+                                          ORDER BY posts_fts.rowid DESC LIMIT ?)''',
+        params + [MAX_COUNT]
+    ).fetchone()
+    if not total:
+        return [], 0
+    if order == "rank" and total >= MAX_COUNT:
+        where.append("posts_fts.rowid >= ?")
+        params.append(oldest)
+    rows = conn.execute(
+        f'''SELECT up.id, up.username, up.timestamp, up.sentiment, up.confidence,
+                   snippet(posts_fts, 0, char(2), char(3), '…', {SNIPPET_TOKENS}) AS snippet
+              FROM {source}
+             WHERE {" AND ".join(where)}
+             ORDER BY {ORDERS[order]} LIMIT ? OFFSET ?''',
+        params + [limit, offset]
+    ).fetchall()
+    return rows, total
+
+
+def snippet_html(snippet):
+    """ Escape a snippet for HTML and wrap its hits in <mark>. """
+    return html.escape(snippet or "").replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain or query the post search index.")
+    parser.add_argument("--db", default=APP_DB)
+    parser.add_argument("--rebuild", action="store_true", help="re-index every post")
+    parser.add_argument("--optimize", action="store_true", help="merge the index into one segment")
+    parser.add_argument("--query", help="print the top matches for this query")
+    args = parser.parse_args(argv)
+
+    from backend import migrations
+    migrations.migrate_app_db(args.db)
+    conn = get_connection(args.db)
+    if args.rebuild:
+        start = time.perf_counter()
+        with conn:
+            rebuild(conn)
+        print(f"Index rebuilt in {time.perf_counter() - start:.1f}s.")
+    if args.optimize:
+        with conn:
+            conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('optimize')")
+        print("Index optimized.")
+    if args.query:
+        start = time.perf_counter()
+        rows, total = search(args.query, db_path=args.db)
+        print(f"{total}{'+' if total >= MAX_COUNT else ''} matches in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for row in rows:
+            text = row["snippet"].replace("\x02", "[").replace("\x03", "]")
+            print(f"  #{row['id']} {row['timestamp']} {row['username']} ({row['sentiment']}): {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Check that the app's queries are answered from an index, not a table scan.
+
+Runs EXPLAIN QUERY PLAN for every query below against freshly migrated
+scratch databases and fails if any plan contains a bare "SCAN <table>".
+When a query changes in backend/ or frontend/, update it here too.
+
+list_posts() and count_posts() build their SQL from the filters they are
+given, so instead of copies they are called with every filter combination
+(and first, later and undated-tail pages) and the statements they run are
+checked.
+
+    python -m backend.query_check
+"""
+import itertools
+import os
+import sys
+import tempfile
+
+from backend import migrations
+from backend.connection import get_connection
+
+# (database, description, sql[, params]); params default to NULLs, but a
+# LIKE prefix needs a real pattern before SQLite will use an index for it.
+# "joined" is the app database with the users database attached as `users`.
+QUERIES = [
+    # backend/database.py
+    ("users", "login_user", "SELECT * FROM users WHERE email = ?"),
+    ("users", "create_users: clash lookup", "SELECT 1 FROM users WHERE username = ?"),
+    ("users", "user_exists", "SELECT id FROM users WHERE username=?"),
+    ("users", "email_exists", "SELECT id FROM users WHERE email=?"),
+    ("users", "get_all_users", "SELECT id, username, email FROM users ORDER BY username"),
+    ("users", "search_users: all", "SELECT id, username, email FROM users WHERE id > ? ORDER BY id LIMIT ?"),
+    ("users", "search_users: substring",
+     "SELECT u.id, u.username, u.email FROM users_fts JOIN users AS u ON u.id = users_fts.rowid "
+     "WHERE users_fts MATCH ? AND users_fts.rowid > ? ORDER BY users_fts.rowid LIMIT ?"),
+    ("users", "search_users: substring count",
+     "SELECT COUNT(*) FROM (SELECT 1 FROM users_fts WHERE users_fts MATCH ? LIMIT ?)"),
+    ("users", "search_users: prefix",
+     "SELECT id, username, email FROM users WHERE (username LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\') "
+     "AND id > ? ORDER BY id LIMIT ?", ("ab%", "ab%", 0, 10)),
+    ("users", "search_users: prefix count",
+     "SELECT COUNT(*) FROM (SELECT 1 FROM users WHERE username LIKE ? ESCAPE '\\' "
+     "OR email LIKE ? ESCAPE '\\' LIMIT ?)", ("ab%", "ab%", 10)),
+    ("users", "update_user", "UPDATE users SET username = ?, email = ? WHERE id = ?"),
+    ("users", "delete_user", "DELETE FROM users WHERE id = ?"),
+    ("app", "counters: read scope (get_user_analysis, get_*_stats)",
+     "SELECT sentiment, posts, confidence_sum FROM counters WHERE scope = ?"),
+    ("joined", "get_user_analysis",
+     "SELECT c.sentiment, SUM(c.posts) AS posts, SUM(c.confidence_sum) AS confidence_sum "
+     "FROM users.users AS u LEFT JOIN counters AS c "
+     "ON c.scope IN ('user:' || u.username, 'user:' || u.email) WHERE u.email = ? GROUP BY c.sentiment"),
+    ("joined", "auto_process_flagged: new negatives with author emails",
+     "SELECT up.id, up.username, up.post_content, up.confidence, "
+     "COALESCE((SELECT email FROM users.users WHERE email = up.username), "
+     "(SELECT email FROM users.users WHERE username = up.username)) AS email FROM user_posts AS up "
+     "WHERE up.id > ? AND up.id <= ? AND up.sentiment = 'negative' AND up.reviewed = 0 ORDER BY up.id LIMIT ?"),
+    ("app", "mark_as_reviewed", "UPDATE user_posts SET reviewed = 1 WHERE id = ?"),
+    ("app", "list_reviewed_posts",
+     "SELECT up.id, up.timestamp, a.comment, a.timestamp, a.id FROM user_posts AS up "
+     "JOIN alerts AS a ON up.id = a.post_id WHERE up.username = ? AND (a.timestamp, a.id) < (?, ?) "
+     "ORDER BY a.timestamp DESC, a.id DESC LIMIT ?"),
+    # frontend/admin_panel.py
+    ("app", "auto_process_flagged: watermark", "SELECT value FROM watermarks WHERE name = ?"),
+    ("app", "auto_process_flagged: latest id", "SELECT MAX(id) FROM user_posts"),
+    ("users", "show_dashboard: count_users", "SELECT COUNT(*) FROM users"),
+    ("app", "show_dashboard: daily_counts",
+     "SELECT bucket, SUM(count) FROM rollups WHERE grain = 'day' AND metric = ? "
+     "AND bucket BETWEEN ? AND ? GROUP BY bucket"),
+    ("app", "show_dashboard: average_per_bucket",
+     "SELECT SUM(count), COUNT(DISTINCT bucket) FROM rollups WHERE grain = ? AND metric = ?"),
+    ("app", "show_flagged: edit comment", "UPDATE alerts SET comment = ?, timestamp = ? WHERE post_id = ?"),
+    ("app", "show_flagged: high risk",
+     "SELECT id, username, post_content, sentiment, risk_score, timestamp FROM user_posts "
+     "WHERE reviewed = 0 AND risk_score > 0 ORDER BY risk_score DESC LIMIT ?"),
+    ("app", "show_flagged: keyword hits",
+     "SELECT post_id, keyword, hits FROM post_keyword_hits WHERE post_id IN (?, ?) ORDER BY post_id, weight DESC"),
+    # backend/alert_handler.py
+    ("app", "alert store: seed ring", "SELECT MAX(id) FROM alerts"),
+    ("app", "alert store: refresh",
+     "SELECT id, post_id, username, admin_username, comment, timestamp FROM alerts WHERE id > ? ORDER BY id"),
+    ("app", "alert store: poll by user",
+     "SELECT id, post_id, username, admin_username, comment, timestamp FROM alerts "
+     "WHERE id > ? AND username = ? ORDER BY id LIMIT ?"),
+    ("app", "alert store: poll by post",
+     "SELECT id, post_id, username, admin_username, comment, timestamp FROM alerts "
+     "WHERE id > ? AND post_id = ? ORDER BY id LIMIT ?"),
+    ("app", "alert store: for_user",
+     "SELECT id, post_id, username, admin_username, comment, timestamp FROM alerts "
+     "WHERE username = ? ORDER BY id DESC LIMIT ?"),
+    ("app", "alert store: for_posts (show_flagged)",
+     "SELECT id, post_id, username, admin_username, comment, timestamp FROM alerts "
+     "WHERE post_id IN (?, ?, ?) ORDER BY id"),
+    # backend/post_search.py (show_search)
+    ("app", "post search: count and window",
+     "SELECT COUNT(*), MIN(id) FROM (SELECT posts_fts.rowid AS id FROM posts_fts CROSS JOIN user_posts AS up "
+     "ON up.id = posts_fts.rowid WHERE posts_fts MATCH ? AND up.sentiment = ? ORDER BY posts_fts.rowid DESC LIMIT ?)"),
+    ("app", "post search: ranked, filtered",
+     "SELECT up.id, up.username, up.timestamp, snippet(posts_fts, 0, char(2), char(3), '…', 16) "
+     "FROM posts_fts CROSS JOIN user_posts AS up ON up.id = posts_fts.rowid WHERE posts_fts MATCH ? "
+     "AND up.timestamp >= ? AND up.timestamp < ? AND posts_fts.rowid >= ? ORDER BY posts_fts.rank LIMIT ? OFFSET ?"),
+    ("app", "post search: one user",
+     "SELECT up.id FROM user_posts AS up CROSS JOIN posts_fts ON posts_fts.rowid = up.id "
+     "WHERE posts_fts MATCH ? AND up.username = ? ORDER BY posts_fts.rowid DESC LIMIT ? OFFSET ?"),
+    # backend/outbox.py
+    ("app", "outbox: claim",
+     "SELECT id, to_addr, subject, html_body, attempts FROM outbox "
+     "WHERE status IN (?, ?) AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?"),
+    ("app", "outbox: stats", "SELECT status, COUNT(*) FROM outbox GROUP BY status"),
+]
+
+
+# Filter values for list_posts()/count_posts(): a known sentiment is inlined
+# as a literal, any other value is bound. `reviewed` on its own is left out:
+# it only has meaning inside a user's posts or the negative review queue,
+# and indexing it table-wide would slow every post insert for no caller.
+POST_FILTERS = {"username": (None, "ann@example.com"), "sentiment": (None, "negative", "Negative"),
+                "reviewed": (None, 0, 1)}
+
+
+def _post_filter_combinations():
+    for values in itertools.product(*POST_FILTERS.values()):
+        filters = {name: value for name, value in zip(POST_FILTERS, values) if value is not None}
+        if set(filters) != {"reviewed"}:
+            yield filters
+
+
+class _Recorder:
+    """ Connection stand-in that records the (sql, params) of each statement. """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements = {}
+
+    def execute(self, sql, params=()):
+        self.statements.setdefault(sql, tuple(params))
+        return self.conn.execute(sql, params)
+
+
+def post_queries(app_db):
+    """ Return (description, sql, params) for each statement list_posts()/count_posts() run. """
+    from backend import database
+    recorder = _Recorder(get_connection(app_db))
+    found = {}
+    original = database.get_db_connection
+    database.get_db_connection = lambda db_name=None: recorder
+    try:
+        for filters in _post_filter_combinations():
+            label = ", ".join(f"{name}={value!r}" for name, value in filters.items())
+            for name, call in (
+                    ("count_posts", lambda: database.count_posts(**filters)),
+                    ("list_posts", lambda: database.list_posts(**filters)),
+                    ("list_posts: later page", lambda: database.list_posts(
+                        cursor=database.encode_cursor("2024-01-01T00:00:00", 100), **filters)),
+                    ("list_posts: undated tail", lambda: database.list_posts(
+                        cursor=database.encode_cursor(None, 100), **filters))):
+                before = set(recorder.statements)
+                call()
+                for sql in recorder.statements.keys() - before:
+                    found[sql] = (f"{name}({label})", sql, recorder.statements[sql])
+    finally:
+        database.get_db_connection = original
+    return list(found.values())
+
+
+def _is_full_scan(line):
+    if not line.startswith("SCAN ") or " USING " in line or line == "SCAN CONSTANT ROW":
+        return False
+    if line.startswith("SCAN (subquery"):
+        return False    # the subquery's own plan lines are checked separately
+    # An FTS5 query shows as "SCAN t VIRTUAL TABLE INDEX n:<plan>"; M means MATCH.
+    _, _, index = line.partition(" VIRTUAL TABLE INDEX ")
+    return "M" not in index.partition(":")[2]
+
+
+def full_scans(conn, sql, params=None):
+    """ Return the plan lines of sql that scan a table without an index. """
+    params = (None,) * sql.count("?") if params is None else params
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    return [line for line in plan if _is_full_scan(line)]
+
+
+def check(queries=QUERIES):
+    """ Print a line per query and return the number that scan a table. """
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"app": os.path.join(tmp, "app.db"), "users": os.path.join(tmp, "users.db")}
+        migrations.migrate_app_db(paths["app"])
+        migrations.migrate_users_db(paths["users"])
+        failures = 0
+        connections = {"app": get_connection(paths["app"]), "users": get_connection(paths["users"]),
+                       "joined": get_connection(paths["app"], attach={"users": paths["users"]})}
+        checks = list(queries) + [("app", *query) for query in post_queries(paths["app"])]
+        for db, name, sql, *params in checks:
+            scans = full_scans(connections[db], sql, *params)
+            failures += bool(scans)
+            print(f"{'SCAN' if scans else 'ok  '}  {name}" + (f"  ({'; '.join(scans)})" if scans else ""))
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if check() else 0)
@@ -0,0 +1,130 @@
+"""
+Incrementally maintained time-bucketed rollups for the admin dashboard.
+
+rollups holds one row per (grain, metric, bucket, sentiment) with a count.
+Grains are 'day' (YYYY-MM-DD) and 'hour' (YYYY-MM-DD HH). Triggers keep it
+current as rows arrive (see migrations), so a chart over N days reads N
+bucket rows instead of grouping the whole table.
+
+Metrics:
+    'posts'     user_posts by timestamp and sentiment   (app database)
+    'alerts'    alerts by timestamp, sentiment ''       (app database)
+    'signups'   users by created_at, sentiment ''       (users database)
+
+    python -m backend.rollups --rebuild [--app PATH] [--users PATH]
+"""
+import argparse
+import datetime
+
+from backend.connection import APP_DB, USERS_DB, get_connection
+
+GRAINS = {"day": "%Y-%m-%d", "hour": "%Y-%m-%d %H"}
+
+CREATE_TABLE = '''CREATE TABLE IF NOT EXISTS rollups (
+                      grain TEXT NOT NULL,
+                      metric TEXT NOT NULL,
+                      bucket TEXT NOT NULL,
+                      sentiment TEXT NOT NULL,
+                      count INTEGER NOT NULL DEFAULT 0,
+                      PRIMARY KEY (grain, metric, bucket, sentiment)
+                  ) WITHOUT ROWID'''
+
+# metric -> (table, timestamp column, sentiment expression)
+SOURCES = {
+    "posts": ("user_posts", "timestamp", "COALESCE({row}.sentiment, '')"),
+    "alerts": ("alerts", "timestamp", "''"),
+    "signups": ("users", "created_at", "''"),
+}
+
+
+def _delta(metric, row, sign):
+    _, column, sentiment = SOURCES[metric]
+    values = ",\n".join(
+        f"('{grain}', '{metric}', strftime('{fmt}', {row}.{column}), {sentiment.format(row=row)}, {sign})"
+        for grain, fmt in GRAINS.items())
+    return f'''INSERT INTO rollups (grain, metric, bucket, sentiment, count) VALUES
+{values}
+ON CONFLICT(grain, metric, bucket, sentiment) DO UPDATE SET count = count + excluded.count;'''
+
+
+def create_triggers(conn, metric, update_columns=()):
+    """ Create the table and the insert/delete(/update) triggers feeding one metric. """
+    table, column, _ = SOURCES[metric]
+    conn.execute(CREATE_TABLE)
+    guard = f"WHEN strftime('%Y', {{row}}.{column}) IS NOT NULL"
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_insert AFTER INSERT ON {table}
+                     {guard.format(row="NEW")}
+                     BEGIN {_delta(metric, "NEW", 1)} END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_delete AFTER DELETE ON {table}
+                     {guard.format(row="OLD")}
+                     BEGIN {_delta(metric, "OLD", -1)} END''')
+    if update_columns:
+        # Split into two triggers so a NULL timestamp on either side is skipped.
+        columns = ", ".join(update_columns)
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_update_old
+                         AFTER UPDATE OF {columns} ON {table} {guard.format(row="OLD")}
+                         BEGIN {_delta(metric, "OLD", -1)} END''')
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_rollup_update_new
+                         AFTER UPDATE OF {columns} ON {table} {guard.format(row="NEW")}
+                         BEGIN {_delta(metric, "NEW", 1)} END''')
+
+
+def rebuild(conn, metrics):
+    """ Recompute the given metrics from their base tables (run inside a transaction). """
+    for metric in metrics:
+        table, column, sentiment = SOURCES[metric]
+        conn.execute("DELETE FROM rollups WHERE metric = ?", (metric,))
+        for grain, fmt in GRAINS.items():
+            conn.execute(f'''
+                INSERT INTO rollups (grain, metric, bucket, sentiment, count)
+                SELECT '{grain}', '{metric}', strftime('{fmt}', {column}), {sentiment.format(row=table)}, COUNT(*)
+                  FROM {table}
+                 WHERE strftime('%Y', {column}) IS NOT NULL
+                 GROUP BY 3, 4
+            ''')
+
+
+def daily_counts(conn, metric, days, sentiment=None, today=None):
+    """ Return [(date, count)] for the last `days` days (inclusive), zero-filled. """
+    today = today or datetime.date.today()
+    start = today - datetime.timedelta(days=days)
+    sql = '''SELECT bucket, SUM(count) FROM rollups
+              WHERE grain = 'day' AND metric = ? AND bucket BETWEEN ? AND ?'''
+    params = [metric, start.isoformat(), today.isoformat()]
+    if sentiment is not None:
+        sql += " AND sentiment = ?"
+        params.append(sentiment)
+    found = dict(conn.execute(sql + " GROUP BY bucket", params).fetchall())
+    dates = [start + datetime.timedelta(days=i) for i in range(days + 1)]
+    return [(d, found.get(d.isoformat(), 0)) for d in dates]
+
+
+def average_per_bucket(conn, metric, grain="day"):
+    """ Mean count per non-empty bucket across all time. """
+    row = conn.execute('''SELECT SUM(count), COUNT(DISTINCT bucket) FROM rollups
+                           WHERE grain = ? AND metric = ?''', (grain, metric)).fetchone()
+    total, buckets = row[0] or 0, row[1] or 0
+    return total / buckets if buckets else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the dashboard rollups table.")
+    parser.add_argument("--app", default=APP_DB)
+    parser.add_argument("--users", default=USERS_DB)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args(argv)
+
+    from backend import migrations
+    migrations.migrate_app_db(args.app)
+    migrations.migrate_users_db(args.users)
+    for path, metrics in ((args.app, ("posts", "alerts")), (args.users, ("signups",))):
+        conn = get_connection(path)
+        if args.rebuild:
+            with conn:
+                rebuild(conn, metrics)
+        for metric in metrics:
+            print(metric, daily_counts(conn, metric, 7))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,26 @@
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from backend import engines
+from backend.cache import get_cache
 
-def analyze_sentiment(text):
-    # Initialize the VADER sentiment intensity analyzer
-    analyzer = SentimentIntensityAnalyzer()
-    
-    # Get the sentiment score
-    sentiment_score = analyzer.polarity_scores(text)
-    
-    # Extract sentiment and confidence
-    compound_score = sentiment_score['compound']
-    
-    if compound_score >= 0.05:
-        sentiment = "positive"
-    elif compound_score <= -0.05:
-        sentiment = "negative"
-    else:
-        sentiment = "neutral"
-    
-    # Confidence level as the absolute value of the compound score
-    confidence = round(abs(compound_score), 2)
-    
-    return {"sentiment": sentiment, "confidence": confidence}
+# ------------------------
+# Sentiment scoring
+# ------------------------
+# Thin wrappers over the engine registry in backend/engines.py. Each engine
+# is built once per process and shared by Streamlit sessions and the
+# scheduler thread, so callers never pay for loading a lexicon or model.
+# Results go through the content-addressed cache in backend/cache.py, so
+# duplicate posts are only scored once.
+
+
+def warm_up(engine=None):
+    """ Load the selected engine and run one score so the first request is fast. """
+    engines.get_engine(engine).warm_up()
+
+
+def analyze_sentiment(text, engine=None):
+    """ Score a single text with the shared engine. """
+    return get_cache().get_or_score(engines.get_engine(engine), text)
+
+
+def analyze_many(texts, engine=None):
+    """ Score a list of texts in one call to the shared engine. """
+    return get_cache().get_or_score_many(engines.get_engine(engine), texts)
@@ -0,0 +1,144 @@
+import importlib.util
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from backend.engines import SentimentEngine, VaderEngine, ENGINE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# ------------------------
+# Transformer sentiment engine
+# ------------------------
+# Optional engine backed by a local sequence-classification model. The model
+# is only ever read from disk (no hub downloads). Single-post requests are
+# queued and scored together in micro-batches: a batch is sent to the model
+# as soon as it is full or the oldest request has waited max_wait_ms, so an
+# idle system still answers one post immediately.
+
+
+class MicroBatcher:
+    """ Collect single requests from many threads and run them as batches. """
+
+    def __init__(self, fn, max_batch_size=32, max_wait_ms=5):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._loop, name="sentiment-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.fn([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class TransformerEngine(SentimentEngine):
+    name = "transformer"
+    package = "transformers"
+
+    def load(self):
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        model_dir = self.config["model_dir"]
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+        self.model = AutoModelForSequenceClassification.from_pretrained(
+            model_dir, local_files_only=True)
+        self.model.eval()
+        self._weights = self._label_weights(self.model.config.id2label)
+        self.batcher = MicroBatcher(
+            self._polarity_batch,
+            max_batch_size=self.config["max_batch_size"],
+            max_wait_ms=self.config["max_wait_ms"],
+        )
+
+    @property
+    def version(self):
+        return f"{super().version};{os.path.basename(os.path.normpath(self.config['model_dir']))}"
+
+    @staticmethod
+    def _label_weights(id2label):
+        """ Map each class index to -1 (negative), 0 (neutral) or +1 (positive). """
+        labels = [str(id2label[i]).lower() for i in range(len(id2label))]
+        if any("neg" in l or "pos" in l for l in labels):
+            return [-1.0 if "neg" in l else 1.0 if "pos" in l else 0.0 for l in labels]
+        # Generic LABEL_n names: assume [negative, positive] or [negative, neutral, positive]
+        if len(labels) == 2:
+            return [-1.0, 1.0]
+        return [-1.0] + [0.0] * (len(labels) - 2) + [1.0]
+
+    def _polarity_batch(self, texts):
+        torch = self._torch
+        inputs = self.tokenizer(list(texts), padding=True, truncation=True,
+                                max_length=self.config["max_length"], return_tensors="pt")
+        with torch.inference_mode():
+            probs = torch.softmax(self.model(**inputs).logits, dim=-1)
+        weights = torch.tensor(self._weights, dtype=probs.dtype)
+        return (probs @ weights).tolist()
+
+    def polarity(self, text):
+        return self.batcher.submit(text).result()
+
+    def score_batch(self, texts):
+        # Callers that already hold a list skip the queue and batch directly.
+        size = self.config["max_batch_size"]
+        polarities = []
+        for i in range(0, len(texts), size):
+            polarities.extend(self._polarity_batch(texts[i:i + size]))
+        return [self.label(p) for p in polarities]
+
+
+def has_local_model(model_dir=None):
+    model_dir = model_dir or ENGINE_CONFIG["transformer"]["model_dir"]
+    return os.path.isfile(os.path.join(model_dir, "config.json"))
+
+
+def create_engine():
+    """ Registry factory: the transformer engine, or VADER if no model is installed.
+
+    The fallback is an engine named "vader"; the registry serves it as the
+    shared VADER instance rather than registering it as "transformer".
+    """
+    if not has_local_model():
+        logger.warning("No local transformer model found in %s; falling back to VADER.",
+                       ENGINE_CONFIG["transformer"]["model_dir"])
+        return VaderEngine()
+    if importlib.util.find_spec("transformers") is None or importlib.util.find_spec("torch") is None:
+        logger.warning("transformers/torch not installed; falling back to VADER.")
+        return VaderEngine()
+    return TransformerEngine()
@@ -0,0 +1,152 @@
+"""
+Background worker: runs the periodic jobs outside the Streamlit process.
+
+    python -m backend.worker [--app PATH] [--users PATH] [--once]
+
+Start as many workers as you like. They contend for the 'worker' lease in
+the app database (backend/leader.py) and only the holder runs jobs; the
+others stay on standby and take over within one lease TTL if the leader
+stops heartbeating. Mail is sent with the SMTP_* settings described in
+backend/outbox.py.
+"""
+import argparse
+import signal
+import sqlite3
+import threading
+
+import schedule
+
+from backend import auto_review, leader, metrics, migrations, outbox
+from backend.cache import get_cache
+from backend.connection import APP_DB, USERS_DB, get_connection
+
+LEASE_NAME = "worker"
+AUTO_REVIEW_INTERVAL = 180     # seconds
+OUTBOX_INTERVAL = 5
+MAINTENANCE_INTERVAL = 3600
+
+
+class Worker:
+
+    def __init__(self, app_db=APP_DB, users_db=USERS_DB, ttl=leader.DEFAULT_TTL, holder=None):
+        self.app_db = app_db
+        self.users_db = users_db
+        self.lock = leader.LeaderLock(LEASE_NAME, app_db, ttl, holder)
+        self.sender = outbox.Sender(app_db)
+        self.scheduler = schedule.Scheduler()
+        self.scheduler.every(AUTO_REVIEW_INTERVAL).seconds.do(self._job, "auto_review", self.auto_review)
+        self.scheduler.every(OUTBOX_INTERVAL).seconds.do(self._job, "send_mail", self.send_mail)
+        self.scheduler.every(MAINTENANCE_INTERVAL).seconds.do(self._job, "maintenance", self.maintenance)
+        self._stop = threading.Event()
+        self._promoted = False
+
+    # --- jobs ---
+
+    def auto_review(self):
+        written = auto_review.auto_process_flagged(self.app_db, self.users_db, keep_going=self._leading)
+        if written:
+            print(f"[worker] auto-reviewed {written} post(s)")
+
+    def send_mail(self):
+        # Keep draining while batches go out; stop at an empty or all-failing batch.
+        while self._leading() and self.sender.run_once()[0]:
+            pass
+
+    def maintenance(self):
+        get_cache().trim_disk()
+        for path in (self.app_db, self.users_db):
+            get_connection(path).execute("PRAGMA optimize")
+
+    def _job(self, name, fn):
+        if not self._leading():
+            return
+        try:
+            with metrics.timer(f"worker.{name}"):
+                fn()
+        except Exception as e:
+            print(f"[worker] {name} failed: {e}")
+
+    # --- leadership ---
+
+    def _leading(self):
+        return self.lock.held and not self._stop.is_set()
+
+    def _beat(self):
+        was_leader = self.lock.held
+        try:
+            self.lock.acquire()
+        except sqlite3.Error as e:
+            # Can't confirm the lease, so stop working until we can.
+            print(f"[worker] heartbeat failed: {e}")
+            self.lock.held = False
+        if self.lock.held and not was_leader:
+            print(f"[worker] {self.lock.holder} is now the leader")
+            self._promoted = True
+        elif was_leader and not self.lock.held:
+            print(f"[worker] {self.lock.holder} lost the lease")
+
+    def _heartbeat_loop(self):
+        # On its own thread so a long job can't let the lease lapse.
+        while not self._stop.wait(self.lock.ttl / 3):
+            self._beat()
+
+    def run(self):
+        """ Heartbeat and run due jobs while leader, until stop(). """
+        self._beat()
+        threading.Thread(target=self._heartbeat_loop, name="worker-heartbeat", daemon=True).start()
+        try:
+            while not self._stop.is_set():
+                if self._leading():
+                    if self._promoted:
+                        self._promoted = False
+                        self.scheduler.run_all()
+                    else:
+                        self.scheduler.run_pending()
+                self._stop.wait(1)
+        finally:
+            if self.lock.held:
+                self.lock.release()
+
+    def run_once(self):
+        """ Run every job once if the lease can be had (for cron-style use). """
+        if not self.lock.acquire():
+            print("[worker] lease held by another worker; nothing to do")
+            return False
+        try:
+            self.scheduler.run_all()
+        finally:
+            self.lock.release()
+        return True
+
+    def stop(self, *_):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the periodic background jobs.")
+    parser.add_argument("--app", default=APP_DB)
+    parser.add_argument("--users", default=USERS_DB)
+    parser.add_argument("--ttl", type=float, default=leader.DEFAULT_TTL, help="lease length in seconds")
+    parser.add_argument("--once", action="store_true", help="run every job once and exit")
+    args = parser.parse_args(argv)
+
+    migrations.migrate_app_db(args.app)
+    migrations.migrate_users_db(args.users)
+    worker = Worker(args.app, args.users, args.ttl)
+    if args.once:
+        worker.run_once()
+        if metrics.enabled():
+            metrics.write_textfile("worker")
+        return
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    metrics.start_exporter("worker")
+    try:
+        worker.run()
+    finally:
+        if metrics.enabled():
+            metrics.write_textfile("worker")
+
+
+if __name__ == "__main__":
+    main()
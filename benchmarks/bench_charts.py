@@ -0,0 +1,117 @@
+"""
+Dashboard chart rendering over many reruns: the old pyplot pattern
+(plt.subplots() per chart, never closed) versus frontend/charts.py.
+
+Each "rerun" draws the four admin-dashboard charts. The script reports
+time per rerun, live pyplot figures and resident-set growth between the
+end of the warm-up and the end of the run. It exits non-zero if the chart
+service's RSS grows by more than --max-growth-kib. tests/test_charts.py
+is the regression test; this script is for measuring:
+
+    python -m benchmarks.bench_charts --reruns 200
+    python -m benchmarks.bench_charts --reruns 2000 --skip-baseline   # check only
+    CHART_CACHE_SIZE=8 python -m benchmarks.bench_charts --skip-baseline --distinct 50   # misses
+"""
+import argparse
+import datetime
+import gc
+import os
+import resource
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+plt.rcParams["figure.max_open_warning"] = 0  # the baseline leaks on purpose
+
+from frontend import charts  # noqa: E402
+
+
+def _dashboard_data(rerun, distinct):
+    # `distinct` different datasets cycle, like different users/day ranges.
+    seed = rerun % distinct
+    today = datetime.date(2025, 1, 1)
+    dates = [today - datetime.timedelta(days=i) for i in range(10, -1, -1)]
+    return {
+        "sentiment": (("positive", "negative", "neutral"), (40 + seed, 25, 35)),
+        "helped": (dates, [i * 2 + seed for i in range(11)]),
+        "posts": (dates, [(i * 7 + seed) % 13 for i in range(11)]),
+        "signups": (dates, [(i + seed) % 4 for i in range(11)]),
+    }
+
+
+def old_rerun(data):
+    fig1, ax1 = plt.subplots(figsize=(4.2, 2.6))
+    ax1.pie(data["sentiment"][1], labels=data["sentiment"][0], autopct='%1.1f%%', startangle=140)
+    fig2, ax2 = plt.subplots(figsize=(4.2, 2.6))
+    ax2.plot(*data["helped"], marker='s')
+    fig3, ax3 = plt.subplots(figsize=(4.2, 2.5))
+    ax3.plot(*data["posts"], marker='o')
+    fig4, ax4 = plt.subplots(figsize=(4.2, 2.5))
+    ax4.bar(*data["signups"])
+    for fig in (fig1, fig2, fig3, fig4):
+        # st.pyplot() rasterised each figure and left it open
+        fig.savefig(_Sink(), format="png", dpi=charts.DPI)
+
+
+def new_rerun(data):
+    charts.render("pie", *data["sentiment"], figsize=(4.2, 2.6), startangle=140)
+    charts.render("line", *data["helped"], figsize=(4.2, 2.6), marker='s', rotate_xticks=45)
+    charts.render("line", *data["posts"], figsize=(4.2, 2.5), marker='o', rotate_xticks=45)
+    charts.render("bar", *data["signups"], figsize=(4.2, 2.5), rotate_xticks=45)
+
+
+def _rss_kib():
+    """ Current RSS on Linux; peak RSS elsewhere. """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _Sink:
+    def write(self, b):
+        return len(b)
+
+
+def _run(label, rerun_fn, reruns, distinct, warmup):
+    for i in range(warmup):
+        rerun_fn(_dashboard_data(i, distinct))
+    gc.collect()
+    base = _rss_kib()
+    start = time.perf_counter()
+    for i in range(warmup, warmup + reruns):
+        rerun_fn(_dashboard_data(i, distinct))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    growth = _rss_kib() - base
+    print(f"{label:<14} {reruns:>5} reruns  {elapsed / reruns * 1000:>8.2f} ms/rerun  "
+          f"open figures {len(plt.get_fignums()):>5}  RSS growth {growth:>10,.0f} KiB")
+    return growth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=200)
+    parser.add_argument("--distinct", type=int, default=5, help="distinct datasets cycled through")
+    parser.add_argument("--max-growth-kib", type=float, default=2048)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    warmup = args.distinct * 2
+    if not args.skip_baseline:
+        _run("pyplot", old_rerun, args.reruns, args.distinct, warmup)
+        plt.close("all")
+    growth = _run("chart service", new_rerun, args.reruns, args.distinct, warmup)
+    print(f"chart cache: {charts.cache_info()}")
+    if growth > args.max_growth_kib:
+        print(f"FAIL: chart service RSS grew {growth:,.0f} KiB (limit {args.max_growth_kib:,.0f})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
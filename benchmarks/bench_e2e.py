@@ -0,0 +1,275 @@
+"""
+End-to-end latency of the app's hot paths at several data scales.
+
+For each scale (posts; users are posts / --posts-per-user) it seeds a
+pair of databases with data.seed_data once and keeps them in --dir for
+later runs. Every run then copies them to a scratch pair, so writes made
+by one run never skew the next, and times in a fresh interpreter pointed
+at the copy (APP_DB_PATH / USERS_DB_PATH):
+
+- analyze_sentiment, per engine: unseen texts (engine + cache write) and
+  repeated texts (cache hits)
+- save_user_post, and auto_process_flagged reviewing the negatives of
+  every round of --round new posts
+- get_user_analysis and fetch_user_posts (the Analyze page's first page)
+  for random seeded users, and get_system_stats
+- load_dashboard, the queries behind the admin show_dashboard(), both
+  uncached and through the page cache
+
+Results are written as JSON (--out) with p50/p95/p99/mean latency in ms
+and throughput per benchmark, plus the commit they were measured at.
+Given --baseline, an earlier result file, it exits non-zero if any p50
+is more than --max-regression (and --min-delta-ms) slower, so it
+doubles as a regression check across commits:
+
+    python -m benchmarks.bench_e2e --scales 10k,1m --out bench.json
+    python -m benchmarks.bench_e2e --scales 10k,1m,10m --dir /data/bench --workers 8
+    python -m benchmarks.bench_e2e --scales 10k --baseline bench.json --max-regression 0.2
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))   # project root
+ENGINES = ("vader", "textblob")
+DASHBOARD_DAYS = 30
+
+
+def parse_scale(text):
+    """ "10k" -> 10000, "1m" -> 1000000, "2500" -> 2500. """
+    text = text.strip().lower()
+    factor = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * factor)
+
+
+def _percentile(samples, q):
+    """ Nearest-rank percentile of sorted samples. """
+    return samples[min(len(samples) - 1, max(0, int(round(q * len(samples))) - 1))]
+
+
+def summarize(samples, items=None, unit="calls"):
+    """ Latency summary in ms of per-call samples (seconds), with throughput in unit/s. """
+    samples = sorted(samples)
+    total = sum(samples)
+    return {
+        "calls": len(samples),
+        "p50_ms": round(_percentile(samples, 0.50) * 1000, 4),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 4),
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 4),
+        "mean_ms": round(total / len(samples) * 1000, 4),
+        "throughput": round((items if items is not None else len(samples)) / total, 1) if total else None,
+        "unit": f"{unit}/s",
+    }
+
+
+def _timed(fn, args_list):
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# ------------------------
+# Child: one scale, in a fresh interpreter
+# ------------------------
+
+def run_scale(users, repeats, round_size, seed):
+    """ Time every hot path against the databases named by APP_DB_PATH / USERS_DB_PATH. """
+    import random
+
+    from backend import auto_review, database, sentiment
+    from data import seed_data
+    from frontend import admin_panel, analysis
+
+    rng = random.Random(seed)
+    results = {}
+
+    def emails(n):
+        return [(seed_data.identity(rng.randrange(users), seed)[1],) for _ in range(n)]
+
+    for engine in ENGINES:
+        sentiment.warm_up(engine)
+        texts = [(f"{rng.choice(seed_data.LINES[s])} #{engine}{i}", engine)
+                 for i, s in enumerate(rng.choice(seed_data.SENTIMENTS) for _ in range(repeats))]
+        results[f"analyze_sentiment[{engine}]"] = summarize(_timed(sentiment.analyze_sentiment, texts))
+        results[f"analyze_sentiment[{engine}] cached"] = summarize(_timed(sentiment.analyze_sentiment, texts))
+
+    # New posts arrive in rounds; after each, the reviewer picks up the
+    # round's negatives, as the worker would on its next tick. The
+    # watermark starts at the seeded history so only new posts are read.
+    database.save_alerts([], watermark=(auto_review.WATERMARK, database.latest_post_id()))
+    saves, reviews, reviewed = [], [], 0
+    for r in range(max(1, repeats // round_size)):
+        posts = []
+        for i in range(round_size):
+            label = rng.choice(seed_data.SENTIMENTS)
+            posts.append((seed_data.identity(rng.randrange(users), seed)[1],
+                          f"{rng.choice(seed_data.LINES[label])} (run {r}.{i})", label, rng.uniform(0.3, 1.0)))
+        saves += _timed(database.save_user_post, posts)
+        start = time.perf_counter()
+        reviewed += auto_review.auto_process_flagged()
+        reviews.append(time.perf_counter() - start)
+    results["save_user_post"] = summarize(saves)
+    results["auto_process_flagged"] = summarize(reviews, items=reviewed, unit="posts")
+
+    # Authors of seeded posts, so every call has counters to read.
+    conn, last = database.get_db_connection(), database.latest_post_id()
+    authors = [conn.execute("SELECT username FROM user_posts WHERE id = ?", (rng.randint(1, last),)).fetchone()
+               for _ in range(repeats)]
+    results["get_user_analysis"] = summarize(_timed(database.get_user_analysis, authors))
+    empty = [email for (email,) in authors if not (database.get_user_analysis(email) or {}).get("total")]
+    assert not empty, f"get_user_analysis found no posts for {len(empty)} authors, e.g. {empty[0]}"
+    results["fetch_user_posts"] = summarize(_timed(analysis.get_user_posts, emails(repeats)))
+    results["get_system_stats"] = summarize(_timed(database.get_system_stats, [()] * repeats))
+
+    today = datetime.date.today()
+    dashboard = [(DASHBOARD_DAYS, today)] * repeats
+    results["load_dashboard"] = summarize(_timed(admin_panel.load_dashboard.__wrapped__, dashboard))
+    results["load_dashboard cached"] = summarize(_timed(admin_panel.load_dashboard, dashboard))
+    return results
+
+
+# ------------------------
+# Parent: seed, copy, run, compare
+# ------------------------
+
+def _checkpoint(path):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+
+def prepare(posts, users, directory, seed, workers):
+    """ Seed (or resume seeding) the pair of databases for one scale; return their paths. """
+    from data import seed_data
+
+    app_db = os.path.join(directory, f"app_{posts}.db")
+    users_db = os.path.join(directory, f"users_{posts}.db")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):   # keep stdout for the JSON report
+        made = seed_data.seed(users, posts, app_db=app_db, users_db=users_db, seed=seed, workers=workers)
+    if any(made):
+        print(f"  seeded {made[0]:,} users and {made[1]:,} posts in {time.perf_counter() - start:.0f}s",
+              file=sys.stderr)
+    for path in (app_db, users_db):
+        _checkpoint(path)
+    return app_db, users_db
+
+
+def run_child(app_db, users_db, directory, users, repeats, round_size, seed):
+    """ Copy the seeded pair to scratch files and time them in a fresh interpreter. """
+    work = {}
+    for name, source in (("app", app_db), ("users", users_db)):
+        work[name] = os.path.join(directory, f"run_{name}.db")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(work[name] + suffix):
+                os.remove(work[name] + suffix)
+        shutil.copyfile(source, work[name])
+    cache_db = os.path.join(directory, "run_sentiment_cache.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(cache_db + suffix):
+            os.remove(cache_db + suffix)
+    env = {**os.environ, "APP_DB_PATH": work["app"], "USERS_DB_PATH": work["users"],
+           "SENTIMENT_CACHE_DB": cache_db}
+    code = (f"import json; from benchmarks.bench_e2e import run_scale; "
+            f"print(json.dumps(run_scale({users}, {repeats}, {round_size}, {seed})))")
+    proc = subprocess.run([sys.executable, "-c", code], cwd=BASE_DIR, env=env,
+                          capture_output=True, text=True, check=False)
+    if proc.returncode:
+        raise RuntimeError(f"benchmark run failed\n{proc.stderr[-3000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(current, baseline, max_regression, min_delta_ms):
+    """ Return one message per benchmark whose p50 regressed past max_regression.
+
+    Slowdowns under min_delta_ms are ignored: calls that take microseconds
+    swing by more than any sensible ratio from run to run.
+    """
+    failures = []
+    for scale, run in current["scales"].items():
+        before = baseline.get("scales", {}).get(scale, {}).get("results", {})
+        for name, result in run["results"].items():
+            if name not in before or not before[name]["p50_ms"]:
+                continue
+            ratio = result["p50_ms"] / before[name]["p50_ms"]
+            if ratio > 1 + max_regression and result["p50_ms"] - before[name]["p50_ms"] > min_delta_ms:
+                failures.append(f"{scale} {name}: p50 {before[name]['p50_ms']:.3f} -> "
+                                f"{result['p50_ms']:.3f} ms ({ratio:.2f}x)")
+    return failures
+
+
+def _commit():
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                          capture_output=True, text=True, check=False)
+    return proc.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="10k,1m,10m", help="comma-separated post counts (k/m suffixes)")
+    parser.add_argument("--posts-per-user", type=int, default=10)
+    parser.add_argument("--dir", default=os.path.join(tempfile.gettempdir(), "sentiment_bench"),
+                        help="where seeded databases are kept between runs")
+    parser.add_argument("--repeats", type=int, default=1000, help="calls per benchmark")
+    parser.add_argument("--round", type=int, default=50, help="posts saved between auto-review runs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="seed_data generator processes")
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier --out file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="allowed p50 slowdown against --baseline (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="p50 slowdowns smaller than this never count as regressions")
+    args = parser.parse_args()
+    os.makedirs(args.dir, exist_ok=True)
+
+    report = {
+        "commit": _commit(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.machine()} x{os.cpu_count()}",
+        "repeats": args.repeats,
+        "scales": {},
+    }
+    for label in args.scales.split(","):
+        posts = parse_scale(label)
+        users = max(1, posts // args.posts_per_user)
+        print(f"{label}: {posts:,} posts, {users:,} users", file=sys.stderr)
+        app_db, users_db = prepare(posts, users, args.dir, args.seed, args.workers)
+        results = run_child(app_db, users_db, args.dir, users, args.repeats, args.round, args.seed)
+        report["scales"][label.strip()] = {"posts": posts, "users": users, "results": results}
+        for name, r in results.items():
+            print(f"  {name:<34} p50 {r['p50_ms']:>8.3f}  p95 {r['p95_ms']:>8.3f}  p99 {r['p99_ms']:>8.3f} ms"
+                  f"  {r['throughput']:>10,.0f} {r['unit']}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = compare(report, json.load(f), args.max_regression, args.min_delta_ms)
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
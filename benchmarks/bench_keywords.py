@@ -0,0 +1,73 @@
+"""
+Posts/sec for keyword detection: a naive loop of `phrase in text` over
+every phrase versus the Aho-Corasick matcher, as the phrase list grows.
+
+The list is data/mental_health_keywords.txt padded with synthetic phrases
+up to each size. The naive loop does plain substring tests (no word
+boundaries), so it is the cheapest possible baseline.
+
+Run from the project root:
+    python -m benchmarks.bench_keywords --posts 5000 --sizes 60,500,2000
+"""
+import argparse
+import random
+import time
+
+from backend import keywords
+
+SAMPLE_POSTS = [
+    "I love this community, everyone has been so kind to me!",
+    "Feeling really down today, nothing seems to be going right and I feel hopeless.",
+    "Just had lunch. Back to work now.",
+    "I can't sleep and I feel so anxious about tomorrow, another panic attack coming.",
+    "Great news: I passed my exam!!! :)",
+    "Honestly I feel worthless, like a burden to everyone around me, I can't go on like this.",
+]
+
+
+def _phrases(size, seed=0):
+    with open(keywords.KEYWORDS_PATH, encoding="utf-8") as f:
+        phrases = list(keywords.parse_keywords(f))
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    while len(phrases) < size:
+        words = ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9)))
+                 for _ in range(rng.randint(1, 3))]
+        phrases.append(" ".join(words))
+    return phrases[:size]
+
+
+def naive(phrases, texts):
+    for text in texts:
+        text = keywords.normalize(text)
+        {phrase: text.count(phrase) for phrase in phrases if phrase in text}
+
+
+def automaton(phrases, texts):
+    compiled = keywords.Automaton(phrases)
+    for text in texts:
+        list(compiled.find(keywords.normalize(text)))
+
+
+def _run(label, fn, phrases, texts):
+    start = time.perf_counter()
+    fn(phrases, texts)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14} {len(phrases):>6} phrases  {len(texts):>8} posts  {len(texts) / elapsed:>12,.0f} posts/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--sizes", default="60,500,2000", help="comma-separated phrase-list sizes")
+    args = parser.parse_args()
+
+    texts = [SAMPLE_POSTS[i % len(SAMPLE_POSTS)] for i in range(args.posts)]
+    for size in (int(s) for s in args.sizes.split(",")):
+        phrases = _phrases(size)
+        _run("naive loop", naive, phrases, texts)
+        _run("aho-corasick", automaton, phrases, texts)
+
+
+if __name__ == "__main__":
+    main()
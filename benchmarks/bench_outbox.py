@@ -0,0 +1,97 @@
+"""
+Messages/sec through the outbox against a local SMTP stand-in: one
+connection + login per message (the old behaviour) versus the Sender's
+pooled sessions. Needs aiosmtpd (pip install -r requirements-dev.txt);
+nothing is delivered anywhere, the stand-in just accepts and counts.
+
+Run from the project root:
+    python -m benchmarks.bench_outbox --messages 500 --latency-ms 5
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import socket
+import tempfile
+import time
+from email.mime.text import MIMEText
+
+from backend import migrations, outbox
+
+
+class CountingHandler:
+    """ aiosmtpd handler that accepts every message after `latency` seconds. """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        self.received += 1
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def per_message_connection(host, port, count):
+    """ Baseline: a fresh SMTP connection for every message. """
+    for i in range(count):
+        msg = MIMEText(f"<p>message {i}</p>", "html")
+        with smtplib.SMTP(host, port) as server:
+            server.sendmail("bench@localhost", [f"user{i}@example.com"], msg.as_string())
+
+
+def outbox_sender(host, port, count, concurrency):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "outbox.db")
+        migrations.migrate_app_db(db_path)
+        for i in range(count):
+            outbox.enqueue(f"user{i}@example.com", "bench", f"<p>message {i}</p>", db_path=db_path)
+        sender = outbox.Sender(db_path, host, port, user="", starttls=False, concurrency=concurrency)
+        while sender.run_once() != (0, 0, 0):
+            pass
+        return outbox.stats(db_path)
+
+
+def _run(label, fn, count):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<30} {count:>6} msgs  {count / elapsed:>10,.0f} msgs/sec")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=outbox.CONCURRENCY)
+    parser.add_argument("--latency-ms", type=float, default=5.0,
+                        help="simulated server time per message")
+    args = parser.parse_args()
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise SystemExit("bench_outbox needs aiosmtpd: pip install -r requirements-dev.txt")
+
+    handler = CountingHandler(args.latency_ms / 1000)
+    host, port = "127.0.0.1", _free_port()
+    controller = Controller(handler, hostname=host, port=port)
+    controller.start()
+    try:
+        _run("connection per message", lambda: per_message_connection(host, port, args.messages),
+             args.messages)
+        stats = _run(f"outbox sender (x{args.concurrency})",
+                     lambda: outbox_sender(host, port, args.messages, args.concurrency), args.messages)
+        print(f"outbox: {stats}  stand-in received: {handler.received}")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
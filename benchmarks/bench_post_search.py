@@ -0,0 +1,100 @@
+"""
+Latency of backend/post_search.search() on a large synthetic user_posts.
+
+Builds (or reuses) a scratch app database with --posts synthetic posts,
+indexed through the normal triggers, then times a mix of rare, common,
+phrase and prefix queries with and without filters, in both orders.
+
+Run from the project root:
+    python -m benchmarks.bench_post_search --posts 1000000 --db /tmp/search_bench.db
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import time
+
+from backend import migrations, post_search
+from backend.connection import get_connection
+
+COMMON = ("i", "the", "to", "and", "feel", "day", "today", "so", "just", "really", "good", "work", "friends")
+MEDIUM = ("tired", "happy", "anxious", "sleep", "exam", "family", "lonely", "weekend", "coffee", "stressed")
+RARE = ("hopeless", "worthless", "overdose", "insomnia", "panic", "burden", "numb", "trapped")
+SENTIMENTS = ("positive", "negative", "neutral")
+START = datetime.datetime(2024, 1, 1)   # post i is timestamped START + i minutes
+
+
+def _post(rng):
+    words = [rng.choice(COMMON) for _ in range(rng.randint(4, 12))]
+    words += [rng.choice(MEDIUM) for _ in range(rng.randint(0, 3))]
+    if rng.random() < 0.02:
+        words.append(rng.choice(RARE))
+    rng.shuffle(words)
+    return " ".join(words)
+
+
+def build(db_path, posts, users=20000, batch=50000, seed=0):
+    migrations.migrate_app_db(db_path)
+    conn = get_connection(db_path)
+    have = conn.execute("SELECT COUNT(*) FROM user_posts").fetchone()[0]
+    if have >= posts:
+        return have
+    rng = random.Random(seed + have)
+    began = time.perf_counter()
+    for offset in range(have, posts, batch):
+        rows = [(f"user{rng.randrange(users)}@example.com", _post(rng), rng.choice(SENTIMENTS), rng.random(),
+                 (START + datetime.timedelta(minutes=i)).isoformat())
+                for i in range(offset, min(offset + batch, posts))]
+        with conn:
+            conn.executemany("INSERT INTO user_posts (username, post_content, sentiment, confidence, timestamp) "
+                             "VALUES (?, ?, ?, ?, ?)", rows)
+        print(f"  {offset + len(rows):>10,} posts", end="\r", flush=True)
+    elapsed = time.perf_counter() - began
+    print(f"inserted {posts - have:,} posts in {elapsed:.0f}s ({(posts - have) / elapsed:,.0f}/s, all triggers on)")
+    return posts
+
+
+def _time(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1 if len(samples) > 1 else 0], result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--db", default="search_bench.db")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    total = build(args.db, args.posts)
+    print(f"{total:,} posts in {args.db} ({os.path.getsize(args.db) / 2**20:,.0f} MiB)")
+    last_day = (START + datetime.timedelta(minutes=total - 1)).date()
+    week = (last_day - datetime.timedelta(days=6), last_day)
+    cases = [
+        ("rare word", "hopeless", {}),
+        ("medium word", "lonely", {}),
+        ("common word", "feel", {}),
+        ("common word, newest", "feel", {"order": "newest"}),
+        ("phrase", '"feel tired"', {}),
+        ("prefix", "anx*", {}),
+        ("two words", "panic sleep", {}),
+        ("rare + negative", "hopeless", {"sentiment": "negative"}),
+        ("rare + user", "hopeless", {"username": "user42@example.com"}),
+        ("common + last week", "feel", {"since": week[0], "until": week[1]}),
+        ("common + user, newest", "feel", {"username": "user42@example.com", "order": "newest"}),
+    ]
+    print(f"{'query':<26} {'p50 ms':>9} {'p95 ms':>9} {'matches':>9}")
+    for label, query, filters in cases:
+        p50, p95, (_, count) = _time(lambda: post_search.search(query, db_path=args.db, **filters), args.repeats)
+        capped = "+" if count >= post_search.MAX_COUNT else ""
+        print(f"{label:<26} {p50:>9.1f} {p95:>9.1f} {count:>8,}{capped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Posts/sec for VADER scoring: a fresh analyzer per call (the old behaviour)
+versus the shared engine, and the cached analyze_sentiment()/analyze_many().
+
+Run from the project root:
+    python -m benchmarks.bench_sentiment --posts 2000
+"""
+import argparse
+import time
+
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from backend import engines, sentiment
+from backend.cache import get_cache
+
+SAMPLE_POSTS = [
+    "I love this community, everyone has been so kind to me!",
+    "I'm fine.",
+    "Feeling really down today, nothing seems to be going right.",
+    "Just had lunch. Back to work now.",
+    "I can't sleep and I feel so anxious about tomorrow.",
+    "Great news: I passed my exam!!! :)",
+]
+
+
+def _posts(n):
+    return [SAMPLE_POSTS[i % len(SAMPLE_POSTS)] for i in range(n)]
+
+
+def per_call_analyzer(texts):
+    """ Baseline: build a new analyzer for every post. """
+    for text in texts:
+        SentimentIntensityAnalyzer().polarity_scores(text)
+
+
+def shared_score(texts):
+    score = engines.get_engine("vader").score
+    for text in texts:
+        score(text)
+
+
+def shared_score_batch(texts):
+    engines.get_engine("vader").score_batch(texts)
+
+
+def cached_analyze_sentiment(texts):
+    for text in texts:
+        sentiment.analyze_sentiment(text, engine="vader")
+
+
+def cached_analyze_many(texts):
+    sentiment.analyze_many(texts, engine="vader")
+
+
+def _run(label, fn, texts):
+    start = time.perf_counter()
+    fn(texts)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(texts):>8} posts  {len(texts) / elapsed:>12,.0f} posts/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--baseline-posts", type=int, default=200,
+                        help="the per-call baseline is slow, so it scores fewer posts")
+    args = parser.parse_args()
+
+    sentiment.warm_up("vader")
+    _run("new analyzer per call", per_call_analyzer, _posts(args.baseline_posts))
+    _run("shared engine score", shared_score, _posts(args.posts))
+    _run("shared engine score_batch", shared_score_batch, _posts(args.posts))
+    _run("cached analyze_sentiment", cached_analyze_sentiment, _posts(args.posts))
+    _run("cached analyze_many", cached_analyze_many, _posts(args.posts))
+    print(f"cache: {get_cache().stats()}")
+
+
+if __name__ == "__main__":
+    main()
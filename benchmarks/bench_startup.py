@@ -0,0 +1,129 @@
+"""
+Cold-start profile of app.py: what each route imports and how long the
+login page takes to first paint.
+
+Every measurement runs in a fresh interpreter, so nothing is warm:
+
+- imports: `python -X importtime` of app.py plus the route's page module.
+  Reports the total import time, the slowest packages and any heavy
+  library (pandas, matplotlib, ...) pulled in just by loading the page;
+  the widgets that need those import them when they first draw.
+- first paint: streamlit's AppTest runs app.py once (the login page a
+  new visitor sees) and once more (a rerun in the same process).
+
+It exits non-zero if the login page imports a heavy library or its first
+paint takes longer than --max-first-paint-ms, so it doubles as a
+regression check:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --top 15 --max-first-paint-ms 1500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))   # project root
+HEAVY = ("pandas", "numpy", "matplotlib", "pyarrow", "textblob", "nltk", "torch", "transformers", "xlsxwriter",
+         "smtplib", "email.mime", "schedule")
+ROUTES = ("login", "home", "dashboard", "analysis", "alerts", "admin_panel")
+
+_IMPORT = '''
+import app
+if {module!r}:
+    app.load_page({module!r})
+'''
+
+_PAINT = '''
+import json, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120)
+start = time.perf_counter()
+at.run()
+first = time.perf_counter() - start
+start = time.perf_counter()
+at.run()
+rerun = time.perf_counter() - start
+print(json.dumps({"first": first, "rerun": rerun, "errors": [str(e.value) for e in at.exception]}))
+'''
+
+
+def _python(code, *flags):
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=BASE_DIR,
+                          capture_output=True, text=True, check=False)
+
+
+def import_profile(route):
+    """ Return (total_ms, {package: ms}, modules) for one route.
+
+    Packages are the ones imported directly by app.py or by the page
+    (depth <= 1 in the importtime tree), with their cumulative time;
+    modules is every module imported at any depth.
+    """
+    proc = _python(_IMPORT.format(module="" if route == "login" else route), "-X", "importtime")
+    if proc.returncode:
+        raise RuntimeError(f"{route}: import failed\n{proc.stderr[-2000:]}")
+    total, packages, modules = 0, {}, set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue   # the header row
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        modules.add(name)
+        ms = int(cumulative) / 1000
+        if depth == 0:
+            total += ms
+        if depth == 1 or (depth == 0 and name not in ("app", "site", "encodings")):
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0) + ms
+    return total, packages, modules
+
+
+def first_paint():
+    proc = _python(_PAINT)
+    if proc.returncode:
+        raise RuntimeError(f"AppTest failed\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result["first"] * 1000, result["rerun"] * 1000, result["errors"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=8, help="slowest packages listed per route")
+    parser.add_argument("--max-first-paint-ms", type=float, default=3000)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'route':<13} {'imports ms':>10}  heavy libraries")
+    profiles = {}
+    for route in ROUTES:
+        total, packages, modules = import_profile(route)
+        profiles[route] = packages
+        heavy = [name for name in HEAVY if name in modules]
+        print(f"{route:<13} {total:>10.0f}  {', '.join(heavy) or '-'}")
+        if route == "login" and heavy:
+            failures.append(f"the login page imports {', '.join(heavy)}")
+
+    for route in ("login", "admin_panel"):
+        slowest = sorted(profiles[route].items(), key=lambda item: -item[1])[:args.top]
+        print(f"\nslowest imports, {route}:")
+        for name, ms in slowest:
+            print(f"  {name:<28} {ms:>8.1f} ms")
+
+    first, rerun, errors = first_paint()
+    print(f"\nlogin page: first paint {first:.0f} ms, rerun {rerun:.0f} ms")
+    if errors:
+        failures.append(f"app.py raised: {errors}")
+    if first > args.max_first_paint_ms:
+        failures.append(f"first paint {first:.0f} ms (limit {args.max_first_paint_ms:.0f})")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Micro-batching throughput of the transformer engine, using a tiny randomly
+initialized BERT model written to a temporary directory (no downloads).
+
+Run from the project root:
+    python -m benchmarks.bench_transformer --posts 512 --threads 16
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_sentiment import SAMPLE_POSTS
+
+
+def build_tiny_model(model_dir):
+    """ Save a small random sequence-classification model and word-level tokenizer. """
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizer
+
+    words = sorted({w.strip(".,!?:)").lower() for post in SAMPLE_POSTS for w in post.split()})
+    with open(os.path.join(model_dir, "vocab.txt"), "w") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words))
+    BertTokenizer(os.path.join(model_dir, "vocab.txt")).save_pretrained(model_dir)
+    config = BertConfig(vocab_size=len(words) + 5, hidden_size=32, num_hidden_layers=2,
+                        num_attention_heads=2, intermediate_size=64, num_labels=3,
+                        id2label={0: "negative", 1: "neutral", 2: "positive"},
+                        label2id={"negative": 0, "neutral": 1, "positive": 2})
+    BertForSequenceClassification(config).save_pretrained(model_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    from backend.transformer import TransformerEngine
+
+    texts = [SAMPLE_POSTS[i % len(SAMPLE_POSTS)] for i in range(args.posts)]
+    with tempfile.TemporaryDirectory() as model_dir:
+        build_tiny_model(model_dir)
+        engine = TransformerEngine(model_dir=model_dir, max_batch_size=args.max_batch_size,
+                                   max_wait_ms=args.max_wait_ms)
+        engine.load()
+        engine.warm_up()
+
+        start = time.perf_counter()
+        for text in texts[:64]:
+            engine._polarity_batch([text])
+        unbatched = 64 / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        engine.score("How long does one post take when the system is idle?")
+        idle_latency_ms = (time.perf_counter() - start) * 1000
+
+        batches_before = engine.batcher.batches
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(engine.score, texts))
+        batched = len(texts) / (time.perf_counter() - start)
+        batches = engine.batcher.batches - batches_before
+
+    print(f"one post per forward pass      {unbatched:>10,.0f} posts/sec")
+    print(f"micro-batched ({args.threads} threads)     {batched:>10,.0f} posts/sec"
+          f"  avg batch {len(texts) / max(batches, 1):.1f}")
+    print(f"idle single-post latency       {idle_latency_ms:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Registration and login against a large users table.
+
+Bulk-loads --users accounts through database.create_users() (every users
+trigger on: search index, signup rollup, data version), then times
+single signups, duplicate signups, logins and a re-import that skips
+existing accounts. It also races --racers threads registering the same
+username and fails unless exactly one of them wins.
+
+Run from the project root:
+    python -m benchmarks.bench_users --users 1000000 --db /tmp/users_bench.db
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+from backend import database, migrations
+from backend.connection import get_connection
+
+PASSWORD = "correct horse"
+
+
+def _accounts(start, stop, prefix="user"):
+    for i in range(start, stop):
+        yield f"{prefix}{i}", f"{prefix}{i}@example.com", PASSWORD
+
+
+def _latency(label, fn, repeats):
+    samples = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    print(f"{label:<30} p50 {statistics.median(samples):>7.3f} ms   p95 {p95:>7.3f} ms")
+
+
+def _race(db_path, racers):
+    """ Start racers threads signing up the same username at once; return the winners. """
+    barrier = threading.Barrier(racers)
+    results = []
+
+    def signup(n):
+        barrier.wait()
+        try:
+            results.append(database.create_user("race", f"race{n}@example.com", PASSWORD, db_path=db_path))
+        except database.UserExistsError:
+            results.append(False)
+
+    threads = [threading.Thread(target=signup, args=(n,)) for n in range(racers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--db", default="users_bench.db")
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--racers", type=int, default=16)
+    args = parser.parse_args()
+
+    migrations.migrate_users_db(args.db)
+    conn = get_connection(args.db)
+    have = conn.execute("SELECT COUNT(*) FROM users WHERE username LIKE 'user%'").fetchone()[0]
+    if have < args.users:
+        start = time.perf_counter()
+        created = database.create_users(_accounts(have, args.users), db_path=args.db)
+        elapsed = time.perf_counter() - start
+        print(f"create_users: {created:,} accounts in {elapsed:.1f}s ({created / elapsed:,.0f}/s)")
+    total = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    print(f"{total:,} users in {args.db} ({os.path.getsize(args.db) / 2**20:,.0f} MiB)")
+
+    sample = min(100000, args.users)
+    start = time.perf_counter()
+    created = database.create_users(_accounts(0, sample), db_path=args.db)
+    elapsed = time.perf_counter() - start
+    print(f"re-import {sample:,} existing: {created} created, {sample / elapsed:,.0f} rows/s skipped")
+
+    rng = random.Random(0)
+    run = f"s{time.time_ns()}"   # fresh names on every run over a reused database
+    _latency("create_user", lambda i: database.create_user(
+        f"{run}_{i}", f"{run}_{i}@example.com", PASSWORD, db_path=args.db), args.repeats)
+
+    def duplicate(i):
+        try:
+            database.create_user(f"user{rng.randrange(args.users)}", "new@example.com", PASSWORD, db_path=args.db)
+        except database.UserExistsError:
+            return
+        raise AssertionError("duplicate username was accepted")
+    _latency("create_user (taken)", duplicate, args.repeats)
+    _latency("login_user", lambda i: database.login_user(
+        f"user{rng.randrange(args.users)}@example.com", PASSWORD, db_path=args.db), args.repeats)
+    _latency("login_user (wrong password)", lambda i: database.login_user(
+        f"user{rng.randrange(args.users)}@example.com", "nope", db_path=args.db), args.repeats)
+
+    with conn:
+        conn.execute("DELETE FROM users WHERE username = 'race'")
+    winners = _race(args.db, args.racers)
+    print(f"{args.racers} concurrent signups for one username: {winners} succeeded")
+    if winners != 1:
+        print("FAIL: expected exactly one")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,336 @@
-from faker import Faker
+"""
+Deterministic synthetic users and posts for load testing.
+
+Generates --users accounts and --posts posts straight into the users and
+app databases, with every trigger on, so counters, rollups, search
+indexes and keyword hits look exactly like production data:
+
+    python -m data.seed_data --users 100000 --posts 1000000
+    python -m data.seed_data --users 1000000 --posts 10000000 --workers 8 \\
+        --app /tmp/app.db --users-db /tmp/users.db \\
+        --mix positive=0.4,negative=0.3,neutral=0.3 --shape growth --days 730
+
+Rows are produced in fixed-size chunks by a process pool and written in
+order by this process, one transaction per chunk. Every chunk draws from
+its own generator seeded by (--seed, kind, chunk number), so the output
+is identical whatever the worker count. Post timestamps follow --shape
+(uniform, diurnal or growth) over --days and increase with the post id,
+like live traffic. Progress is checkpointed, so re-running the same
+command after an interruption continues where the last commit ended.
+
+Every account's password is "password". Posts are written under the
+author's email, like the Analyze page does.
+"""
+import argparse
+import bisect
+import datetime
+import hashlib
+import math
+import os
 import random
-import json
-
-fake = Faker()
-
-# Function to generate a single fake user
-def generate_fake_user():
-    return {
-        "userid": fake.uuid4(),
-        "name": fake.name(),
-        "email": fake.email(),
-        "password": fake.password(),
-        "role": random.choice(["user", "admin"]),  # Randomly assign user or admin role
-    }
-
-# Function to generate a list of fake users
-def generate_fake_users(n=1000):
-    return [generate_fake_user() for _ in range(n)]
-
-# Function to save the generated fake users to a JSON file
-def save_fake_users_to_file(file_name="data/fake_users.json"):
-    users = generate_fake_users()
-    with open(file_name, "w") as file:
-        json.dump(users, file)
-
-# Run this file to seed data
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from faker.providers.internet.en_US import Provider as InternetProvider
+from faker.providers.person.en_US import Provider as PersonProvider
+
+from backend import keywords, migrations
+from backend.connection import APP_DB, USERS_DB, get_connection
+
+SENTIMENTS = ("positive", "negative", "neutral")
+DEFAULT_MIX = {"positive": 0.45, "negative": 0.2, "neutral": 0.35}
+SHAPES = ("uniform", "diurnal", "growth")
+PASSWORD_HASH = hashlib.sha256(b"password").hexdigest()
+CHUNK_ROWS = 20000
+ALERT_RATE = 0.3        # share of negative posts that already have an alert
+KEYWORD_RATE = 0.15     # share of negative posts that mention a keyword phrase
+
+# Posting activity per hour of the day for --shape diurnal (evening peak).
+HOURLY = (2, 1, 1, 1, 1, 2, 4, 6, 7, 7, 6, 6, 7, 6, 6, 6, 7, 8, 10, 11, 12, 11, 8, 4)
+
+FIRST_NAMES = [name.lower() for name in PersonProvider.first_names]
+LAST_NAMES = [name.lower() for name in PersonProvider.last_names]
+DOMAINS = list(InternetProvider.free_email_domains) + ["example.com", "outlook.com", "proton.me"]
+
+LINES = {
+    "positive": (
+        "Had a really good day today", "Feeling grateful for my friends",
+        "Finally finished my project and I'm proud of it", "The hike this weekend was amazing",
+        "Loving the new coffee place downtown", "Got great feedback at work",
+        "My sister's wedding was beautiful", "Slept well for once and feel great",
+        "Passed my exam!", "Such a fun night with the team",
+    ),
+    "negative": (
+        "I can't sleep again", "Feeling so tired and alone lately",
+        "Work is overwhelming and I'm stressed out", "Nothing seems to go right",
+        "Another terrible day", "I hate how anxious I get before exams",
+        "Everyone is busy and I feel ignored", "My head hurts and I'm exhausted",
+        "Missed the deadline again, awful", "Can't stop crying tonight",
+    ),
+    "neutral": (
+        "Going to the store later", "Watching a documentary tonight",
+        "The bus was late this morning", "Meeting at 3pm tomorrow",
+        "Reading a book about history", "Cooking pasta for dinner",
+        "It's raining in the city", "Moving my desk to the other room",
+        "Trying a new running route", "Back at the office on Monday",
+    ),
+}
+TAILS = ("", "", "", " today", " this week", " again", " honestly", " lol", " #mondays", " 🙃")
+CONFIDENCE = {"positive": (0.3, 1.0), "negative": (0.3, 1.0), "neutral": (0.0, 0.2)}
+
+
+# ------------------------
+# Deterministic identities
+# ------------------------
+
+def identity(index, seed=0):
+    """ Return (username, email) of synthetic user number index.
+
+    A pure function of (index, seed), so posts can name their author
+    without a lookup; the index suffix keeps both unique.
+    """
+    h = (index * 2654435761 + seed * 40503) & 0xFFFFFFFF
+    username = f"{FIRST_NAMES[h % len(FIRST_NAMES)]}.{LAST_NAMES[(h >> 10) % len(LAST_NAMES)]}{index}"
+    return username, f"{username}@{DOMAINS[(h >> 20) % len(DOMAINS)]}"
+
+
+def _rng(seed, kind, chunk):
+    return random.Random(f"{seed}:{kind}:{chunk}")
+
+
+# ------------------------
+# Timestamps
+# ------------------------
+
+_HOURLY_CDF = [sum(HOURLY[:h + 1]) / sum(HOURLY) for h in range(24)]
+
+
+def _time_of_day(fraction):
+    """ Map a uniform fraction of a day to seconds, following HOURLY (monotonic). """
+    hour = min(bisect.bisect_left(_HOURLY_CDF, fraction), 23)
+    low = _HOURLY_CDF[hour - 1] if hour else 0.0
+    within = (fraction - low) / ((_HOURLY_CDF[hour] - low) or 1)
+    return (hour + min(max(within, 0.0), 1.0)) * 3600
+
+
+def timestamp_at(quantile, start, days, shape):
+    """ Timestamp of the post at quantile (0..1) of the run, for a distribution shape. """
+    if shape == "growth":
+        quantile = math.sqrt(quantile)   # activity grows linearly over the range
+    position = quantile * days
+    day = min(int(position), days - 1)
+    fraction = position - day
+    seconds = _time_of_day(fraction) if shape == "diurnal" else fraction * 86400
+    return start + datetime.timedelta(days=day, seconds=seconds)
+
+
+# ------------------------
+# Chunk generators (run in worker processes)
+# ------------------------
+
+def user_chunk(chunk, first, last, total, seed, start, days):
+    """ Users first..last-1 as users rows, signed up in index order over the first half of the range. """
+    span = days * 86400 / 2
+    rows = []
+    for index in range(first, last):
+        username, email = identity(index, seed)
+        created = start + datetime.timedelta(seconds=span * index / total)
+        rows.append((username, email, PASSWORD_HASH, created.isoformat()))
+    return rows
+
+
+def _post_text(rng, sentiment, phrases):
+    lines = LINES[sentiment]
+    parts = [rng.choice(lines) for _ in range(rng.choice((1, 1, 2, 3)))]
+    if rng.random() < 0.3:
+        parts.append(rng.choice(LINES["neutral"]))
+    if sentiment == "negative" and phrases and rng.random() < KEYWORD_RATE:
+        parts.append(f"I {rng.choice(('feel', 'keep thinking', 'just'))} {rng.choice(phrases)}")
+    return ". ".join(parts) + rng.choice(TAILS)
+
+
+def post_chunk(chunk, first, last, total, users, seed, mix, start, days, shape):
+    """ Posts first..last-1 as (rows, keyword hits per row, alert flags). """
+    rng = _rng(seed, "posts", chunk)
+    labels, weights = zip(*mix.items())
+    phrases = list(keywords.get_matcher().weights)
+    rows, hits, alerts = [], [], []
+    for index in range(first, last):
+        sentiment = rng.choices(labels, weights)[0]
+        # A few users write most posts (quadratic skew towards low indexes).
+        _, email = identity(int(users * rng.random() ** 2), seed)
+        text = _post_text(rng, sentiment, phrases)
+        low, high = CONFIDENCE[sentiment]
+        quantile = (index + rng.random()) / total
+        rows.append((email, text, sentiment, round(rng.uniform(low, high), 4),
+                     timestamp_at(quantile, start, days, shape).isoformat()))
+        hits.append(keywords.match(text) if sentiment == "negative" else {})
+        alerts.append(sentiment == "negative" and rng.random() < ALERT_RATE)
+    return rows, hits, alerts
+
+
+# ------------------------
+# Writing
+# ------------------------
+
+def _checkpoint(conn, source):
+    """ Number of chunks of this run already written. """
+    row = conn.execute("SELECT chunks FROM seed_checkpoints WHERE run = ?", (source,)).fetchone()
+    return row[0] if row else 0
+
+
+def _save_checkpoint(conn, source, chunks, rows):
+    conn.execute(
+        '''INSERT OR REPLACE INTO seed_checkpoints (run, chunks, rows, updated_at)
+           VALUES (?, ?, ?, ?)''', (source, chunks, rows, datetime.datetime.now().isoformat()))
+
+
+def write_users(conn, rows, source, chunk, done, progress_conn):
+    # The checkpoint lives in the app database, so it commits separately;
+    # INSERT OR IGNORE makes replaying a chunk after a crash harmless.
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (username, email, password, created_at) VALUES (?, ?, ?, ?)", rows)
+    with progress_conn:
+        _save_checkpoint(progress_conn, source, chunk, done)
+
+
+def write_posts(conn, result, source, chunk, done):
+    rows, hits, alerts = result
+    with conn:
+        conn.executemany(
+            '''INSERT INTO user_posts (username, post_content, sentiment, confidence, timestamp)
+               VALUES (?, ?, ?, ?, ?)''', rows)
+        # One writer inside one transaction, so the chunk got consecutive ids.
+        first_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0] - len(rows) + 1
+        for offset, post_hits in enumerate(hits):
+            keywords.record_hits(conn, first_id + offset, post_hits)
+        conn.executemany(
+            '''INSERT INTO analysis (data_type, sentiment, confidence, timestamp)
+               VALUES ('post', ?, ?, ?)''', [(s, c, ts) for _, _, s, c, ts in rows])
+        conn.executemany(
+            "INSERT INTO alerts (post_id, admin_username, comment, timestamp) VALUES (?, 'system', ?, ?)",
+            [(first_id + offset, "Seeded review comment.", rows[offset][4])
+             for offset, flagged in enumerate(alerts) if flagged])
+        _save_checkpoint(conn, source, chunk, done)
+
+
+def _run(kind, total, generate, write, conn, source, pool, workers, chunk_rows):
+    chunks = math.ceil(total / chunk_rows)
+    done_chunks = _checkpoint(conn, source)
+    if done_chunks >= chunks:
+        print(f"{kind}: all {total:,} already written")
+        return 0
+    written = min(done_chunks * chunk_rows, total)
+    started, new = time.perf_counter(), 0
+    in_flight = deque()
+
+    def drain_one():
+        nonlocal written, new
+        chunk, future = in_flight.popleft()
+        result = future.result()
+        count = len(result if kind == "users" else result[0])
+        written += count
+        new += count
+        write(result, source, chunk + 1, written)
+        elapsed = time.perf_counter() - started
+        print(f"  {kind}: {written:>12,} / {total:,}  ({new / elapsed:,.0f}/s)", end="\r", flush=True)
+
+    for chunk in range(done_chunks, chunks):
+        first = chunk * chunk_rows
+        # A bounded window of chunks in flight keeps memory flat and commits in order.
+        in_flight.append((chunk, pool.submit(generate, chunk, first, min(first + chunk_rows, total))))
+        if len(in_flight) >= workers * 2:
+            drain_one()
+    while in_flight:
+        drain_one()
+    elapsed = time.perf_counter() - started
+    print(f"{kind}: wrote {new:,} in {elapsed:.1f}s ({new / (elapsed or 1):,.0f}/s)" + " " * 20)
+    return new
+
+
+class _Bound:
+    """ A picklable generator function with the run's settings bound. """
+
+    def __init__(self, fn, **settings):
+        self.fn, self.settings = fn, settings
+
+    def __call__(self, chunk, first, last):
+        return self.fn(chunk, first, last, **self.settings)
+
+
+def seed(users, posts, app_db=APP_DB, users_db=USERS_DB, seed=0, mix=None, start=None, days=365,
+         shape="uniform", workers=None, chunk_rows=CHUNK_ROWS):
+    """ Generate users and posts into users_db and app_db; return (users, posts) written now. """
+    mix = mix or DEFAULT_MIX
+    if shape not in SHAPES:
+        raise ValueError(f"shape must be one of {', '.join(SHAPES)}, not {shape!r}")
+    if users < 1 and posts:
+        raise ValueError("posts need at least one user")
+    start = start or datetime.datetime(2024, 1, 1)
+    workers = workers or os.cpu_count() or 1
+    migrations.migrate_users_db(users_db)
+    migrations.migrate_app_db(app_db)
+    users_conn, app_conn = get_connection(users_db), get_connection(app_db)
+    for conn in (users_conn, app_conn):
+        # Load data: a crash can only lose work since the last checkpoint anyway.
+        conn.execute("PRAGMA synchronous=OFF")
+
+    # Checkpoints name the run's parameters, so a different run starts over.
+    run = f"seed_data:{seed}:{users}:{posts}:{sorted(mix.items())}:{start.isoformat()}:{days}:{shape}:{chunk_rows}"
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            made_users = _run(
+                "users", users, _Bound(user_chunk, total=users, seed=seed, start=start, days=days),
+                lambda rows, source, chunk, done: write_users(users_conn, rows, source, chunk, done, app_conn),
+                app_conn, run + ":users", pool, workers, chunk_rows)
+            made_posts = _run(
+                "posts", posts, _Bound(post_chunk, total=posts, users=users, seed=seed, mix=mix,
+                                       start=start, days=days, shape=shape),
+                lambda result, source, chunk, done: write_posts(app_conn, result, source, chunk, done),
+                app_conn, run + ":posts", pool, workers, chunk_rows)
+    finally:
+        for conn in (users_conn, app_conn):
+            conn.execute("PRAGMA synchronous=NORMAL")
+    return made_users, made_posts
+
+
+def parse_mix(text):
+    """ Parse "positive=0.4,negative=0.3,neutral=0.3" into normalised weights. """
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SENTIMENTS:
+            raise ValueError(f"Unknown sentiment in --mix: {name!r}")
+        mix[name] = float(weight)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("--mix weights must add up to more than 0")
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic users and posts.")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--app", default=APP_DB, help="app database to fill")
+    parser.add_argument("--users-db", default=USERS_DB, help="users database to fill")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="sentiment weights, e.g. positive=0.4,negative=0.3,neutral=0.3")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=datetime.date(2024, 1, 1),
+                        help="first day of the timestamp range (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=365, help="length of the timestamp range")
+    parser.add_argument("--shape", choices=SHAPES, default="uniform", help="how posts spread over time")
+    parser.add_argument("--workers", type=int, help="generator processes (default: CPU count)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows per chunk and transaction")
+    args = parser.parse_args(argv)
+    seed(args.users, args.posts, app_db=args.app, users_db=args.users_db, seed=args.seed, mix=args.mix,
+         start=datetime.datetime.combine(args.start, datetime.time()), days=args.days, shape=args.shape,
+         workers=args.workers, chunk_rows=args.chunk_rows)
+
+
 if __name__ == "__main__":
-    save_fake_users_to_file()  # Generates and saves 1000 fake users by default
-    print("Fake users generated.")
+    main()
@@ -1,46 +1,33 @@
-import sqlite3
+import datetime
 
-# Function to create the 'analysis' table if it doesn't exist
-def create_analysis_table():
-    conn = sqlite3.connect("data/users.db")  # Adjust path as necessary
-    cursor = conn.cursor()
+from backend import migrations
+from backend.connection import APP_DB, USERS_DB, get_connection
 
-    # Create the analysis table if it doesn't exist
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS analysis (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        sentiment TEXT NOT NULL,
-        content TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
-    conn.commit()
-    conn.close()
-    print("Analysis table created successfully!")
+# Run from the project root: python -m data.setup_database
+# (databases are resolved by backend/connection.py)
+
+# Function to bring the schema (including the 'analysis' table) up to date
+def create_analysis_table():
+    migrations.migrate_app_db(APP_DB)
+    migrations.migrate_users_db(USERS_DB)
+    print("Schema is up to date!")
 
 # Function to insert sample data into the 'analysis' table
 def insert_sample_data():
-    conn = sqlite3.connect("data/users.db")  # Adjust path as necessary
-    cursor = conn.cursor()
-
-    # Insert some sample data
-    cursor.execute("""
-    INSERT INTO analysis (sentiment, content)
-    VALUES ('positive', 'This is a positive post about well-being.')
-    """)
-    cursor.execute("""
-    INSERT INTO analysis (sentiment, content)
-    VALUES ('negative', 'This post expresses sadness and despair.')
-    """)
-    cursor.execute("""
-    INSERT INTO analysis (sentiment, content)
-    VALUES ('neutral', 'This post is neutral and without emotion.')
-    """)
-
+    conn = get_connection(APP_DB)
+    now = datetime.datetime.now().isoformat()
+    conn.executemany(
+        "INSERT INTO analysis (data_type, sentiment, confidence, timestamp) VALUES (?, ?, ?, ?)",
+        [
+            ("sample", "positive", 0.8, now),
+            ("sample", "negative", 0.7, now),
+            ("sample", "neutral", 0.0, now),
+        ]
+    )
     conn.commit()
-    conn.close()
     print("Sample data inserted successfully!")
 
-# Call the functions to create the table and insert data
-create_analysis_table()
-insert_sample_data()
+# Call the functions to create the schema and insert data
+if __name__ == "__main__":
+    create_analysis_table()
+    insert_sample_data()
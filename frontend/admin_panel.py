@@ -1,186 +1,62 @@
 import streamlit as st
-import pandas as pd
-from backend import database
-import os
+from backend import (alert_handler, counters, database, leader, metrics, migrations, outbox, page_cache,
+                     post_search, rollups, worker)
+import html
 import sqlite3
-import matplotlib.pyplot as plt
-import numpy as np
+from backend.connection import APP_DB, USERS_DB, get_connection
+from frontend import charts
+from frontend.pagination import paged
 from datetime import datetime
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-import schedule
-import threading
 import time
-from textblob import TextBlob
+from backend import engines
 
 # --- Constants ---
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin123"
 USERS_PER_PAGE = 5
 
-# Hardcoded SMTP credentials
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
-SMTP_USER = "kimanikanyoro4@gmail.com"        # <-- enter  your email
-SMTP_PASS = "qenw vyus yhyr bpah"      # <-- enter your password
-
 # --- Database setup ---
 def create_alerts_table():
-    BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-    DB_PATH = os.path.join(BASE_DIR, "data", "app_database.db")
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS alerts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            post_id INTEGER UNIQUE,
-            admin_username TEXT,
-            comment TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(post_id) REFERENCES user_posts(id) ON DELETE CASCADE
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-create_alerts_table()
-
-# --- Dynamic comment generator ---
-def generate_dynamic_comment(post_text: str) -> str:
-    blob = TextBlob(post_text)
-    sentences = blob.sentences
-    if sentences:
-        scored = [(s.sentiment.polarity, str(s)) for s in sentences]
-        min_score, worst = min(scored, key=lambda x: x[0])
-        if min_score <= -0.5:
-            return (f"I noticed this part of your post was quite negative: \"{worst}\". "
-                    "I understand this might come from frustration—would you consider reframing it with specific examples or a constructive solution? "
-                    "This will help others understand your perspective and foster a more positive dialogue.")
-        elif min_score <= -0.2:
-            return (f"Your post segment \"{worst}\" carries a somewhat negative tone. "
-                    "You might enhance it by adding supportive comments or actionable suggestions. "
-                    "For instance, sharing a small positive outcome or an improvement idea can balance the message.")
-        else:
-            return ("Thanks for sharing your thoughts! To make your post even more engaging, "
-                    "consider elaborating with examples or helpful resources. "
-                    "This context will make your feedback more impactful for readers.")
-    return ("Thanks for posting! If you’d like feedback, try adding more details or clarifying your main points. "
-            "The more context you provide, the better we (and other readers) can understand your perspective.")
-
-# --- Auto-review scheduler routine ---
-def auto_process_flagged():
-    """
-    Find every negative post that hasn’t been reviewed yet,
-    generate a dynamic comment, mark it reviewed, and email the user.
-    """
-    BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-    DB_PATH  = os.path.join(BASE_DIR, "data", "app_database.db")
-    conn     = sqlite3.connect(DB_PATH)
-    cur      = conn.cursor()
-
-    # 1) get all new negatives
-    cur.execute("""
-        SELECT p.id, p.username, p.post_content, p.sentiment, p.confidence
-          FROM user_posts p
-     LEFT JOIN alerts a ON p.id = a.post_id
-         WHERE p.sentiment = 'negative'
-           AND a.post_id IS NULL
-    """)
-    posts = cur.fetchall()
-
-    # get all users once
-    users = {u['username']: u['email'] for u in database.get_all_users()}
-
-    for post_id, user, text, senti, conf in posts:
-        email = users.get(user)
-        if not email:
-            continue
-
-        # 2) dynamic comment
-        comment = generate_dynamic_comment(text)
-        now     = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        # 3) mark reviewed in DB
-        try:
-            cur.execute(
-                "INSERT INTO alerts(post_id,admin_username,comment,timestamp) VALUES(?,?,?,?)",
-                (post_id, "system", comment, now)
-            )
-            conn.commit()
-        except sqlite3.IntegrityError:
-            continue
-
-        # 4) send email
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = "[Action Required] Please Review Your Post"
-        msg["From"]    = SMTP_USER
-        msg["To"]      = email
-
-        html = f"""
-        <html><body style="font-family:Arial,sans-serif;padding:20px;">
-          <h2 style="color:#4a90e2;">Your Post Needs Review</h2>
-          <p>Hi <strong>{user}</strong>,</p>
-          <p>We detected a negative tone (confidence {conf:.2f}) in your post:</p>
-          <blockquote style="background:#eee;padding:10px;border-left:4px solid #4a90e2;">
-            {text}
-          </blockquote>
-          <p><strong>Feedback:</strong><br>{comment}</p>
-          <p><a href="https://your-app-url.com/posts/{post_id}/edit"
-                style="color:#4a90e2;">Edit your post</a> and we’ll re-check.</p>
-          <p style="font-size:12px;color:#555;">— Support Team</p>
-        </body></html>
-        """
-        msg.attach(MIMEText(html, "html"))
-        try:
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as s:
-                s.starttls()
-                s.login(SMTP_USER, SMTP_PASS)
-                s.sendmail(SMTP_USER, email, msg.as_string())
-        except Exception as e:
-            print(f"Email failed for post {post_id}: {e}")
-
-    conn.close()
-
-# --- Scheduler setup ---
-def _scheduler_loop():
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
-
-def start_scheduler():
-    if not st.session_state.get("scheduler_running", False):
-        schedule.every(3).minutes.do(auto_process_flagged)
-        auto_process_flagged()  # run once on startup
-        threading.Thread(target=_scheduler_loop, daemon=True).start()
-        st.session_state["scheduler_running"] = True
+    migrations.migrate_app_db(APP_DB)
+
+
+@page_cache.cached((APP_DB, "user_posts"), (APP_DB, "alerts"), (USERS_DB, "users"))
+def load_dashboard(days_range, today):
+    """ Everything show_dashboard() reads, cached until posts, alerts or users change. """
+    # Counts come from the counters table and the time series from the
+    # rollups table, so nothing here groups over user_posts.
+    conn = get_connection(APP_DB)
+    users_conn = database.get_db_connection(USERS_DB)
+    global_counts = counters.read_scope(conn, "global")
+    return {
+        "total_users": database.count_users(),
+        "flagged_count": global_counts.get("negative", (0, 0))[0],
+        "sentiment_data": [(s, global_counts[s][0]) for s in counters.SENTIMENTS
+                           if global_counts.get(s, (0, 0))[0]],
+        "avg_posts": rollups.average_per_bucket(conn, "posts"),
+        "helped": rollups.daily_counts(conn, "alerts", 10, today=today),
+        "posts": rollups.daily_counts(conn, "posts", days_range, today=today),
+        "signups": rollups.daily_counts(users_conn, "signups", days_range, today=today),
+    }
 
 
+search_users = page_cache.cached((USERS_DB, "users"))(database.search_users)
 
 
 # --- Page Sections ---
 def show_dashboard():
+    import pandas as pd   # only the pages that build tables pay for pandas
     st.markdown("## 📝 Summary & Analytics Dashboard")
-    users = database.get_all_users()
-    total_users = len(users)
-
-    BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-    DB_PATH = os.path.join(BASE_DIR, "data", "app_database.db")
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(*) FROM user_posts WHERE sentiment='negative'")
-    flagged_count = cur.fetchone()[0]
-    cur.execute("SELECT sentiment, COUNT(*) FROM user_posts GROUP BY sentiment")
-    sentiment_data = cur.fetchall()
-    cur.execute("SELECT DATE(timestamp) AS date, COUNT(*) FROM user_posts GROUP BY DATE(timestamp)")
-    timeseries_data = cur.fetchall()
-    conn.close()
+
+    with st.expander("🔍 Filter Options"):
+        days_range = st.slider("Select number of past days", min_value=5, max_value=30, value=10)
+    data = load_dashboard(days_range, datetime.now().date())
+    sentiment_data = data["sentiment_data"]
 
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Users", total_users)
-    col2.metric("Flagged Posts", flagged_count)
-    avg_posts = sum(c for _, c in timeseries_data) / (len(timeseries_data) or 1)
-    col3.metric("Avg Posts/Day", f"{avg_posts:.1f}")
+    col1.metric("Total Users", data["total_users"])
+    col2.metric("Flagged Posts", data["flagged_count"])
+    col3.metric("Avg Posts/Day", f"{data['avg_posts']:.1f}")
 
     st.markdown("---")
     st.markdown("### Analytics Snapshots")
@@ -189,24 +65,15 @@ def show_dashboard():
     with left:
         st.markdown("**📊 Sentiment Distribution**")
         df_sent = pd.DataFrame(sentiment_data, columns=["Sentiment", "Count"]).set_index("Sentiment")
-        fig1, ax1 = plt.subplots(figsize=(4.2, 2.6))
-        ax1.pie(df_sent['Count'], labels=df_sent.index, autopct='%1.1f%%', startangle=140)
-        ax1.axis('equal')
-        st.pyplot(fig1)
+        charts.show("pie", df_sent.index, df_sent['Count'], figsize=(4.2, 2.6), startangle=140)
 
     with right:
         st.markdown("**💡 Users Helped Over Time**")
-        today = pd.to_datetime("today")
-        dates_helped = pd.date_range(today - pd.Timedelta(days=10), today)
-        helped_counts = np.cumsum(np.random.randint(0, 5, size=len(dates_helped)))
-        df_helped = pd.DataFrame({'Date': dates_helped, 'UsersHelped': helped_counts}).set_index('Date')
-        fig4, ax4 = plt.subplots(figsize=(4.2, 2.6))
-        ax4.plot(df_helped.index, df_helped['UsersHelped'], marker='s')
-        ax4.set_xlabel('Date')
-        ax4.set_ylabel('Users Helped')
-        ax4.set_title('Users Helped')
-        ax4.tick_params(axis='x', rotation=45)
-        st.pyplot(fig4)
+        helped = data["helped"]
+        df_helped = pd.DataFrame(helped, columns=['Date', 'UsersHelped']).set_index('Date')
+        df_helped['UsersHelped'] = df_helped['UsersHelped'].cumsum()
+        charts.show("line", df_helped.index, df_helped['UsersHelped'], figsize=(4.2, 2.6), marker='s',
+                    xlabel='Date', ylabel='Users Helped', title='Users Helped', rotate_xticks=45)
         st.download_button("📥 Download Helped Users CSV",
                            df_helped.reset_index().to_csv(index=False),
                            "users_helped.csv", "text/csv")
@@ -214,69 +81,63 @@ def show_dashboard():
     st.markdown("---")
     st.markdown("### Engagement Over Time")
 
-    with st.expander("🔍 Filter Options"):
-        days_range = st.slider("Select number of past days", min_value=5, max_value=30, value=10)
-
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("**📈 Posts Over Time**")
-        today = pd.to_datetime("today")
-        dates = pd.date_range(today - pd.Timedelta(days=days_range), today)
-        counts = np.random.poisson(lam=10, size=len(dates))
-        df_time = pd.DataFrame({'Date': dates, 'Count': counts}).set_index('Date')
-        fig2, ax2 = plt.subplots(figsize=(4.2, 2.5))
-        ax2.plot(df_time.index, df_time['Count'], marker='o')
-        ax2.set_xlabel('Date')
-        ax2.set_ylabel('Posts')
-        ax2.set_title('Posts Over Time')
-        ax2.tick_params(axis='x', rotation=45)
-        st.pyplot(fig2)
+        posts = data["posts"]
+        df_time = pd.DataFrame(posts, columns=['Date', 'Count']).set_index('Date')
+        charts.show("line", df_time.index, df_time['Count'], figsize=(4.2, 2.5), marker='o',
+                    xlabel='Date', ylabel='Posts', title='Posts Over Time', rotate_xticks=45)
         st.download_button("📥 Download Posts CSV",
                            df_time.reset_index().to_csv(index=False),
                            "posts_over_time.csv", "text/csv")
 
     with col2:
         st.markdown("**👥 User Growth Over Time**")
-        dates_users = pd.date_range(today - pd.Timedelta(days=days_range), today)
-        user_counts = np.cumsum(np.random.randint(0, 3, size=len(dates_users)))
-        df_users = pd.DataFrame({"SignupDate": dates_users, "TotalUsers": user_counts}).set_index('SignupDate')
-        fig3, ax3 = plt.subplots(figsize=(4.2, 2.5))
-        ax3.bar(df_users.index, df_users['TotalUsers'])
-        ax3.set_xlabel('Date')
-        ax3.set_ylabel('Users')
-        ax3.set_title('User Growth')
-        ax3.tick_params(axis='x', rotation=45)
-        st.pyplot(fig3)
+        signups = data["signups"]
+        df_users = pd.DataFrame(signups, columns=["SignupDate", "NewUsers"]).set_index('SignupDate')
+        charts.show("bar", df_users.index, df_users['NewUsers'], figsize=(4.2, 2.5),
+                    xlabel='Date', ylabel='Users', title='User Growth', rotate_xticks=45)
         st.download_button("📥 Download User Growth CSV",
                            df_users.reset_index().to_csv(index=False),
                            "user_growth.csv", "text/csv")
 
+    with st.expander("⚡ Page data cache"):
+        cache_stats = page_cache.stats()
+        st.caption(f"Hit rate {cache_stats['total']['hit_rate']:.0%} over "
+                   f"{cache_stats['total']['hits'] + cache_stats['total']['misses']} loads in this process")
+        st.dataframe(pd.DataFrame.from_dict(cache_stats, orient="index"))
+        chart_info = charts.cache_info()
+        st.caption(f"Charts: {chart_info['hits']} reused, {chart_info['renders']} rendered, "
+                   f"{chart_info['entries']} cached ({chart_info['bytes'] / 1024:.0f} KiB)")
+
 
 def show_users():
+    import pandas as pd
     st.markdown("### 👥 All Registered Users")
     # Initialize deleted users list
     if "deleted_users" not in st.session_state:
         st.session_state["deleted_users"] = []
 
-    search_term = st.text_input("🔍 Search by username or email").lower()
-    users = database.get_all_users()
-    if not users:
-        st.info("No users found.")
-        return
+    search_term = st.text_input("🔍 Search by username or email").strip()
 
-    # Filter by search term
-    filtered = [u for u in users if search_term in u["username"].lower() or search_term in u["email"].lower()]
-    total = len(filtered)
-    st.markdown(f"**Total Users Found: {total}**")
+    # Search and paging run in SQLite, one page per rerun
+    found = {}
 
-    # Pagination
-    pages = (total - 1) // USERS_PER_PAGE + 1
-    page = st.number_input("Page", 1, pages, 1)
-    start = (page - 1) * USERS_PER_PAGE
-    end = start + USERS_PER_PAGE
+    def fetch_page(cursor):
+        rows, next_cursor, found["total"] = search_users(search_term, USERS_PER_PAGE, cursor)
+        return rows, next_cursor
 
-    for u in filtered[start:end]:
+    page_users = paged(f"users_{search_term.lower()}", fetch_page)
+    total = found["total"]
+    if not total:
+        st.info("No users found.")
+        return
+    capped = "+" if total >= database.USER_SEARCH_MAX_COUNT else ""
+    st.markdown(f"**Total Users Found: {total:,}{capped}**")
+
+    for u in page_users:
         uid = u['id']
         username = u['username']
         email = u['email']
@@ -287,9 +148,13 @@ def show_users():
                 new_email = st.text_input("Email", value=email)
                 if st.form_submit_button("💾 Save Changes"):
                     if new_email != email:
-                        database.update_user(uid, username, new_email)
-                        st.success("✅ Email updated successfully.")
-                        st.rerun()
+                        try:
+                            database.update_user(uid, username, new_email)
+                        except database.UserExistsError as e:
+                            st.error(f"❌ {e}")
+                        else:
+                            st.success("✅ Email updated successfully.")
+                            st.rerun()
                     else:
                         st.info("No changes detected.")
 
@@ -331,48 +196,36 @@ def show_users():
 
 
 
-import os
 import sqlite3
+from backend.connection import get_connection
 from datetime import datetime
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-import smtplib
-import pandas as pd
 import streamlit as st
-from textblob import TextBlob
+from backend import engines
 
-# Ensure SMTP_USER, SMTP_PASS, SMTP_SERVER, SMTP_PORT are defined in session state or config
+# Mail is queued in the outbox and sent by the worker (python -m backend.worker)
 
 def show_flagged():
+    import pandas as pd
     st.markdown("### 🚨 Flagged Content for Review")
 
-    BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-    DB_PATH = os.path.join(BASE_DIR, "data", "app_database.db")
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    cur.execute('''
-        SELECT id, username, timestamp, post_content, image_name, sentiment, confidence
-        FROM user_posts
-        WHERE sentiment = 'negative'
-        ORDER BY timestamp DESC
-    ''')
-    flagged = cur.fetchall()
-
-    cur.execute('SELECT post_id, admin_username, comment, timestamp FROM alerts')
-    alerts = cur.fetchall()
-    conn.close()
-
-    alert_map = {
-        post_id: {
-            "admin": admin if admin else "admin",
-            "comment": comment.strip() if comment else "",
-            "timestamp": alert_time
-        }
-        for post_id, admin, comment, alert_time in alerts
-    }
-
-    if not flagged:
+    DB_PATH = APP_DB
+    conn = get_connection(DB_PATH)
+    alert_store = alert_handler.get_store(DB_PATH)
+
+    # Highest keyword risk first, whatever the sentiment model said
+    risky = database.list_high_risk_posts(10, db_path=DB_PATH)
+    if risky:
+        risky_hits = database.get_keyword_hits((p["id"] for p in risky), db_path=DB_PATH)
+        with st.expander(f"🔥 Highest keyword risk ({len(risky)} unreviewed)", expanded=True):
+            for p in risky:
+                matched = ", ".join(k for k, _ in risky_hits.get(p["id"], []))
+                st.markdown(f"**{p['risk_score']:.0f}** · {p['timestamp']} | {p['username']} — "
+                            f"{p['post_content'] or '🖼️ Image post'}  \n🔑 *{matched}*")
+
+    # Totals come from the counters table and the partial review-queue index;
+    # posts are listed a page at a time, unreviewed and reviewed separately.
+    total_flagged = counters.read_scope(conn, "global").get("negative", (0, 0))[0]
+    if not total_flagged:
         st.info("No flagged content to review.")
         return
 
@@ -384,24 +237,42 @@ def show_flagged():
     with col3:
         auto_review_all = st.button("🤖 Auto Review All")
 
-    reviewed_posts = [f for f in flagged if f[0] in alert_map]
-    unreviewed_posts = [f for f in flagged if f[0] not in alert_map]
-    total_reviewed = len(reviewed_posts)
-    total_pending = len(unreviewed_posts)
+    total_pending = database.count_posts(sentiment="negative", reviewed=0, db_path=DB_PATH)
+    total_reviewed = total_flagged - total_pending
     st.markdown(f"🟢 Reviewed: **{total_reviewed}** | 🕒 Pending: **{total_pending}**")
+    mail = outbox.stats(DB_PATH)
+    st.caption(f"📬 Outbox: {mail['pending'] + mail['sending']} queued | {mail['sent']} sent | {mail['failed']} failed")
+    lease = leader.current(worker.LEASE_NAME, DB_PATH)
+    if lease:
+        st.caption(f"🤖 Worker {lease['holder']} is running (heartbeat {time.time() - lease['heartbeat_at']:.0f}s ago)")
+    else:
+        st.warning("🤖 No background worker is running, so auto-review and mail are paused. "
+                   "Start one with `python -m backend.worker`.")
 
-    ordered = reviewed_posts + unreviewed_posts if sort_order == "Reviewed First" else unreviewed_posts + reviewed_posts
+    def flagged_page(reviewed):
+        return paged(f"flagged_{reviewed}", lambda cursor: database.list_posts(
+            sentiment="negative", reviewed=reviewed,
+            columns=("username", "timestamp", "post_content", "image_name", "sentiment", "confidence"),
+            cursor=cursor, db_path=DB_PATH))
+
+    groups = [0] if hide_reviewed else [1, 0] if sort_order == "Reviewed First" else [0, 1]
+    ordered = [post for reviewed in groups for post in flagged_page(reviewed)]
+
+    # Alerts only for the posts on screen
+    post_ids = [post["id"] for post in ordered]
+    alert_map = {
+        post_id: {
+            "admin": alert["admin_username"] or "admin",
+            "comment": alert["comment"].strip() if alert["comment"] else "",
+            "timestamp": alert["timestamp"]
+        }
+        for post_id, alert in alert_store.for_posts(post_ids).items()
+    }
+    keyword_hits = database.get_keyword_hits(post_ids, db_path=DB_PATH)
 
     def send_email(to_addr: str, subject: str, html_body: str):
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"] = SMTP_USER
-        msg["To"] = to_addr
-        msg.attach(MIMEText(html_body, "html"))
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASS)
-            server.sendmail(SMTP_USER, to_addr, msg.as_string())
+        # Queued for the outbox sender; the page doesn't wait on SMTP.
+        outbox.enqueue(to_addr, subject, html_body, db_path=DB_PATH)
 
     def build_email_template(title: str, recipient: str, body_html: str) -> str:
         return f"""
@@ -422,11 +293,11 @@ def show_flagged():
 
     def auto_review(post_id, username, content, recipient=None):
         # Generate dynamic, descriptive comment
-        blob = TextBlob(content)
-        polarity, subjectivity = blob.sentiment
-        tone = "positive" if polarity > 0 else "negative" if polarity < 0 else "neutral"
+        engine = engines.get_engine()
+        result = engine.score(content)
         comment = (
-            f"Your post appears {tone} (polarity={polarity:.2f}, subjectivity={subjectivity:.2f}). "
+            f"Your post appears {result['sentiment']} "
+            f"(polarity={result['polarity']:.2f}, engine={engine.name}). "
             f"Please reflect on the tone and consider rephrasing if needed.<br/><br/>"
             f"<em>Extracted content insight:</em> \"{content}\""
         )
@@ -434,16 +305,7 @@ def show_flagged():
         timestamp_now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         # Save alert
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute(
-            '''
-            INSERT INTO alerts (post_id, admin_username, comment, timestamp)
-            VALUES (?, ?, ?, ?)
-            ''', (post_id, admin_username, comment, timestamp_now)
-        )
-        conn.commit()
-        conn.close()
+        alert_store.add(post_id, comment, admin_username, timestamp_now)
 
         default_email = username if "@" in username else f"{username}@gmail.com"
         email_to = recipient or st.text_input(
@@ -461,20 +323,19 @@ def show_flagged():
                     """
                 )
                 send_email(email_to, "Auto Review Notification", html_body)
-                st.success(f"✅ Auto reviewed and emailed {email_to}")
+                st.success(f"✅ Auto reviewed; email to {email_to} queued")
             except Exception as e:
-                st.error(f"❌ Failed to auto email {email_to}: {e}")
+                st.error(f"❌ Failed to queue email to {email_to}: {e}")
 
     if auto_review_all:
-        for post_id, username, timestamp, content, *_ in unreviewed_posts:
-            auto_review(post_id, username, content or "Image Post")
-        st.success(f"✅ All {total_pending} posts auto-reviewed and emailed.")
+        for post in database.iter_posts(sentiment="negative", reviewed=0,
+                                        columns=("username", "post_content"), db_path=DB_PATH):
+            auto_review(post["id"], post["username"], post["post_content"] or "Image Post")
+        st.success(f"✅ All {total_pending} posts auto-reviewed and emails queued.")
         st.rerun()
 
     reviewed_data = []
-    for post_id, username, timestamp, content, image_name, sentiment, confidence in ordered:
-        if hide_reviewed and post_id in alert_map:
-            continue
+    for post_id, timestamp, username, content, image_name, sentiment, confidence in ordered:
 
         reviewed = post_id in alert_map
         icon = "✅" if reviewed else "⚠️"
@@ -491,6 +352,8 @@ def show_flagged():
                 </div>
                 """, unsafe_allow_html=True
             )
+            if post_id in keyword_hits:
+                st.markdown("🔑 **Keywords:** " + ", ".join(f"{k} ×{n}" for k, n in keyword_hits[post_id]))
 
             if reviewed:
                 alert = alert_map[post_id]
@@ -502,13 +365,7 @@ def show_flagged():
                 if st.session_state.get(f"edit_mode_{post_id}"):
                     new_comment = st.text_area("Edit Comment", value=alert['comment'], key=f"edit_txt_{post_id}")
                     if st.button("💾 Update Comment", key=f"save_edit_{post_id}"):
-                        new_ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        conn = sqlite3.connect(DB_PATH)
-                        cur = conn.cursor()
-                        cur.execute('''
-                            UPDATE alerts SET comment=?, timestamp=? WHERE post_id=?
-                        ''', (new_comment, new_ts, post_id))
-                        conn.commit(); conn.close()
+                        alert_store.update_comment(post_id, new_comment)
                         st.success("✅ Comment updated successfully.")
                         st.rerun()
 
@@ -528,9 +385,9 @@ def show_flagged():
                             body_html=body_html
                         )
                         send_email(email_to, "Review Notification", html_body)
-                        st.success(f"✅ Email sent to {email_to}")
+                        st.success(f"✅ Email to {email_to} queued")
                     except Exception as e:
-                        st.error(f"❌ Failed to send email: {e}")
+                        st.error(f"❌ Failed to queue email: {e}")
 
             else:
                 st.markdown("---")
@@ -539,13 +396,7 @@ def show_flagged():
                     comment = st.text_area(f"Add Comment for ID {post_id}", key=f"comment_{post_id}")
                 with colx2:
                     if st.button(f"✅ Review (Manual)", key=f"review_{post_id}"):
-                        conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-                        cur.execute(
-                            '''INSERT INTO alerts (post_id, admin_username, comment, timestamp)
-                               VALUES (?, ?, ?, ?)''',
-                            (post_id, st.session_state.get("username", "admin"), comment, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-                        )
-                        conn.commit(); conn.close()
+                        alert_store.add(post_id, comment, st.session_state.get("username", "admin"))
                         st.success(f"Marked ID {post_id} as reviewed.")
                         st.rerun()
                     if st.button(f"🤖 Auto Review (ID {post_id})", key=f"auto_review_{post_id}"):
@@ -560,7 +411,56 @@ def show_flagged():
             data=df.to_csv(index=False), file_name="reviewed_flagged_posts.csv", mime="text/csv"
         )
 
+def show_search():
+    st.markdown("### 🔎 Search Posts")
+    DB_PATH = APP_DB
+
+    query = st.text_input("Words or \"a phrase\" (word* matches a prefix)")
+    col1, col2, col3, col4 = st.columns([1, 2, 2, 1])
+    with col1:
+        sentiment = st.selectbox("Sentiment", ["Any", "negative", "neutral", "positive"])
+    with col2:
+        username = st.text_input("User").strip()
+    with col3:
+        dates = st.date_input("Date range", value=())
+    with col4:
+        order = st.radio("Order", ["rank", "newest"], horizontal=True)
+    if not query.strip():
+        st.info("Type something to search post content.")
+        return
+
+    since, until = (tuple(dates) + (None, None))[:2]
+    if since and not until:
+        until = since
+    found = {}
+
+    def fetch_page(offset):
+        offset = offset or 0
+        start = time.perf_counter()
+        rows, found["total"] = post_search.search(
+            query, sentiment=None if sentiment == "Any" else sentiment, username=username or None,
+            since=since, until=until, order=order, offset=offset, db_path=DB_PATH)
+        found["ms"] = (time.perf_counter() - start) * 1000
+        # The offset is the cursor; a capped total means there may be more.
+        more = len(rows) == post_search.PAGE_SIZE and (
+            offset + len(rows) < found["total"] or found["total"] >= post_search.MAX_COUNT)
+        return rows, offset + len(rows) if more else None
+
+    key = f"search_{query}_{sentiment}_{username}_{since}_{until}_{order}"
+    rows = paged(key, fetch_page)
+    capped = "+" if found["total"] >= post_search.MAX_COUNT else ""
+    st.caption(f"{found['total']:,}{capped} matching posts ({found['ms']:.0f} ms)")
+    for row in rows:
+        st.markdown(
+            f"**#{row['id']}** · {html.escape(row['timestamp'] or '')} · {html.escape(row['username'])} · "
+            f"{html.escape(row['sentiment'] or '')} ({row['confidence'] or 0:.2f})<br>"
+            f"{post_search.snippet_html(row['snippet'])}",
+            unsafe_allow_html=True
+        )
+
+
 def show_export():
+    import pandas as pd
     st.title("📤 Export Data")
     st.write("Here you can export sentiment analysis data as a CSV or Excel file.")
     
@@ -585,9 +485,48 @@ def show_export():
                 df.to_excel(writer, index=False, sheet_name="SentimentData")
                 writer.save()
             st.download_button("Download Excel", buffer.getvalue(), "sentiment_data.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+def show_performance():
+    import pandas as pd
+    st.markdown("## ⏱️ Performance")
+    st.caption("Calls, errors and latency of every database function, sentiment engine call, "
+               "worker job, mail send and chart draw. Each process counts its own; other "
+               f"processes appear once they have written their file in `{metrics.METRICS_DIR}`.")
+
+    recording = st.checkbox("⏺️ Record in this process", value=metrics.enabled())
+    if recording != metrics.enabled():
+        metrics.enable(recording)
+    if not recording:
+        st.info("Recording is off (start the app with METRICS_ENABLED=1 to record from the first request).")
+
+    sources = {"app": (time.time(), metrics.snapshot())}
+    for process, found in metrics.read_textfiles().items():
+        sources.setdefault(process, found)
+    process = st.selectbox("🖥️ Process", list(sources),
+                           format_func=lambda p: "app (this process)" if p == "app" else p)
+    modified, snap = sources[process]
+    if process != "app":
+        st.caption(f"Written {time.time() - modified:.0f}s ago to {metrics.textfile_path(process)}")
+
+    rows = metrics.summary(snap)
+    if not rows:
+        st.info("Nothing recorded yet.")
+    else:
+        df = pd.DataFrame(rows)
+        df.insert(0, "area", df["name"].str.split(".").str[0])
+        areas = st.multiselect("Areas", sorted(df["area"].unique()), default=sorted(df["area"].unique()))
+        st.dataframe(df[df["area"].isin(areas)], hide_index=True, width="stretch")
+
+    col1, col2 = st.columns(2)
+    if col1.button("💾 Write Prometheus file"):
+        st.success(f"Wrote {metrics.write_textfile('app')}")
+    if col2.button("🧹 Reset counters"):
+        metrics.reset()
+        st.rerun()
+
+
 # --- Main App ---
 def app():
-    start_scheduler()
+    create_alerts_table()   # no-op once this process has migrated
     st.markdown("""
         <style>
             .css-1v3fvcr { padding-top: 0px !important; margin-top: 0px !important; }
@@ -632,7 +571,8 @@ def app():
             st.rerun()
         page = st.selectbox(
             "🌐 Navigate",
-            ["📊 Dashboard", "👥 Manage Users", "🚨 Flagged Content", "📥 Export Data"],
+            ["📊 Dashboard", "👥 Manage Users", "🚨 Flagged Content", "🔎 Search Posts", "📥 Export Data",
+             "⏱️ Performance"],
             index=0
         )
 
@@ -642,6 +582,10 @@ def app():
         show_users()
     elif page.startswith("🚨"):
         show_flagged()
+    elif page.startswith("🔎"):
+        show_search()
+    elif page.startswith("⏱️"):
+        show_performance()
     else:
         show_export()
 
@@ -1,42 +1,21 @@
 import streamlit as st
-import sqlite3
-import os
+from backend import alert_handler, database, migrations, page_cache
+from backend.connection import APP_DB
+from frontend.pagination import paged
 from datetime import datetime
 
 # ─── Paths ─────────────────────────────────────────────────────────────────────
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
-DB_PATH  = os.path.join(BASE_DIR, "data", "app_database.db")  # Database path
+DB_PATH = APP_DB
 
-# --- Helper: fetch from user_posts ---
-def fetch_user_posts(user_email: str):
-    """
-    Return all rows for this user as a list of dicts, including the post ID.
-    """
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT id, timestamp, post_content, image_name, sentiment, confidence
-          FROM user_posts
-         WHERE username = ?
-         ORDER BY timestamp DESC
-    """, (user_email,))
-    rows = cur.fetchall()
-    conn.close()
-
-    return [
-        {
-            "id":          row[0],
-            "timestamp":   row[1],
-            "content":     row[2],
-            "image":       row[3],
-            "sentiment":   row[4],
-            "confidence":  row[5]
-        }
-        for row in rows
-    ]
+# Cached until the tables they read change (backend/page_cache.py)
+POSTS, ALERTS = (DB_PATH, "user_posts"), (DB_PATH, "alerts")
+count_posts = page_cache.cached(POSTS)(database.count_posts)
+list_posts = page_cache.cached(POSTS)(database.list_posts)
+list_reviewed_posts = page_cache.cached(POSTS, ALERTS)(database.list_reviewed_posts)
 
 # --- Alerts & Flagged Posts Page ---
 def app():
+    migrations.migrate_app_db(DB_PATH)
     st.title("🚨 **Alerts & Flagged Posts**")
     st.markdown("<hr>", unsafe_allow_html=True)
 
@@ -47,74 +26,47 @@ def app():
         return
     user_email = str(user_email)
 
-    # Fetch all posts for the logged-in user
-    user_stats = fetch_user_posts(user_email)
-
-    # Pull reviewed post_ids from alerts table
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT post_id
-          FROM alerts
-         WHERE post_id IN (
-             SELECT id FROM user_posts WHERE username = ?
-         )
-    """, (user_email,))
-    reviewed_ids = {row[0] for row in cur.fetchall()}
-    conn.close()
-
-    # Filter for unreviewed negative posts
-    negative = [
-        p for p in user_stats
-        if p["sentiment"] == "negative" and p["id"] not in reviewed_ids
-    ]
+    # --- New admin feedback since this session last looked ---
+    # The subscription keeps a cursor, so reruns only read alerts written since.
+    sub_key = f"alerts_sub_{user_email}"
+    if sub_key not in st.session_state:
+        st.session_state[sub_key] = alert_handler.get_store(DB_PATH).subscribe(username=user_email)
+    for alert in st.session_state[sub_key].poll():
+        st.info(f"🔔 New feedback from {alert['admin_username'] or 'admin'} ({alert['timestamp']}): "
+                f"{alert['comment'] or ''}")
 
     # --- Display Unreviewed Negative Posts ---
     st.subheader("⚠️ **Flagged Posts Awaiting Admin Review**")
-    if negative:
-        st.error(f"⚠️ You have **{len(negative)}** flagged post(s) awaiting review.")
+    # user_posts.reviewed is set by a trigger when an alert is written
+    pending = count_posts(username=user_email, sentiment="negative", reviewed=0, db_path=DB_PATH)
+    if pending:
+        st.error(f"⚠️ You have **{pending}** flagged post(s) awaiting review.")
         with st.expander("🔍 View Flagged Posts"):
+            negative = paged(f"alerts_pending_{user_email}", lambda cursor: list_posts(
+                username=user_email, sentiment="negative", reviewed=0,
+                columns=("post_content", "confidence"), cursor=cursor, db_path=DB_PATH))
             for p in negative:
                 try:
                     ts = datetime.fromisoformat(p["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
                 except ValueError:
                     ts = p["timestamp"]
-                text = p["content"] or "🖼️ Image post"
+                text = p["post_content"] or "🖼️ Image post"
                 conf = p["confidence"] or 0.0
                 st.markdown(f"🔴 **{ts}** — {text} (Confidence: {conf:.2f})")
     else:
         st.success("✅ No flagged posts. Great job!")
 
-    # Fetch admin-reviewed posts with feedback
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT 
-            up.id AS post_id,
-            up.timestamp AS flagged_at,
-            up.post_content,
-            up.image_name,
-            up.sentiment,
-            up.confidence,
-            a.admin_username,
-            a.comment AS admin_comment,
-            a.timestamp AS reviewed_on
-        FROM user_posts AS up
-        JOIN alerts   AS a  ON up.id = a.post_id
-       WHERE up.username = ?
-       ORDER BY a.timestamp DESC
-    """, (user_email,))
-    reviewed = cur.fetchall()
-    conn.close()
-
     # --- Display Reviewed Flagged Posts with Admin Feedback ---
     st.subheader("📝 **Reviewed Flagged Posts with Admin Feedback**")
-    if reviewed:
+    reviewed_count = count_posts(username=user_email, reviewed=1, db_path=DB_PATH)
+    if reviewed_count:
         # New count line with smiley
-        st.success(f"😊 You have **{len(reviewed)}** reviewed post(s) with admin feedback.")
+        st.success(f"😊 You have **{reviewed_count}** reviewed post(s) with admin feedback.")
+        reviewed = paged(f"alerts_reviewed_{user_email}", lambda cursor: list_reviewed_posts(
+            user_email, cursor=cursor, db_path=DB_PATH))
         for (
             post_id, flagged_at, content, image_name,
-            sentiment, confidence, admin_user, admin_comment, reviewed_on
+            sentiment, confidence, admin_user, admin_comment, reviewed_on, _alert_id
         ) in reviewed:
             # Format timestamps
             try:
@@ -1,14 +1,16 @@
 import random
-import sqlite3
+from backend import database, keywords, migrations
+from backend.connection import APP_DB, get_connection, retry_on_busy
+from frontend.pagination import paged
 import os
 import streamlit as st
 from datetime import datetime
-from textblob import TextBlob
+from backend import sentiment as sentiment_engine
 
 # =========================
 # Configurations
 # =========================
-DB_PATH = os.path.join("data", "app_database.db")
+DB_PATH = APP_DB
 UPLOAD_DIR = os.path.join("data", "uploads")
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -27,38 +29,13 @@ EMOJI_MAP = {
 # Database Initialization
 # =========================
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_posts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL,
-            post_content TEXT,
-            image_name TEXT,
-            sentiment TEXT,
-            confidence REAL,
-            timestamp TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    migrations.migrate_app_db(DB_PATH)
 
 # =========================
-# Sentiment Analysis (Real)
+# Sentiment Analysis (shared engine)
 # =========================
 def analyze_sentiment(text: str) -> dict:
-    blob = TextBlob(text)
-    polarity = blob.sentiment.polarity  # range: -1 to 1
-
-    if polarity > 0.1:
-        sentiment = "positive"
-    elif polarity < -0.1:
-        sentiment = "negative"
-    else:
-        sentiment = "neutral"
-
-    confidence = round(abs(polarity), 2)
-    return {"sentiment": sentiment, "confidence": confidence}
+    return sentiment_engine.analyze_sentiment(text)
 
 # =========================
 # Image Analysis (Fake)
@@ -72,6 +49,18 @@ def analyze_image_sentiment(image) -> tuple:
 # =========================
 # Core Database Operations
 # =========================
+@retry_on_busy
+def _insert_post(user_email, text, img_name, sentiment, confidence):
+    # The post and its keyword hits commit together, or not at all.
+    hits = keywords.match(text)
+    conn = get_connection(DB_PATH)
+    with conn:
+        post_id = conn.execute(
+            "INSERT INTO user_posts (username, post_content, image_name, sentiment, confidence, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_email, text, img_name, sentiment, confidence, datetime.now().isoformat())
+        ).lastrowid
+        keywords.record_hits(conn, post_id, hits)
+
 def save_user_post(user_email: str, text: str = None, image=None, sentiment: str = None, confidence: float = None) -> bool:
     try:
         img_name = None
@@ -81,14 +70,7 @@ def save_user_post(user_email: str, text: str = None, image=None, sentiment: str
             with open(img_path, "wb") as f:
                 f.write(image.getbuffer())
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO user_posts (username, post_content, image_name, sentiment, confidence, timestamp) VALUES (?, ?, ?, ?, ?, ?)",
-            (user_email, text or "", img_name, sentiment, confidence, datetime.now().isoformat())
-        )
-        conn.commit()
-        conn.close()
+        _insert_post(user_email, text or "", img_name, sentiment, confidence)
 
         if sentiment == "negative":
             st.error("⚠️ Admin has been notified of the negative sentiment!")
@@ -97,23 +79,16 @@ def save_user_post(user_email: str, text: str = None, image=None, sentiment: str
         st.error(f"Error saving post: {e}")
         return False
 
-def get_user_posts(user_email: str) -> list:
+def get_user_posts(user_email: str, cursor=None):
+    """ One page of the user's posts, newest first, as (rows, next_cursor). """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT timestamp, post_content, image_name, sentiment, confidence FROM user_posts WHERE username = ? ORDER BY timestamp DESC",
-            (user_email,)
+        return database.list_posts(
+            username=user_email, columns=("post_content", "image_name", "sentiment", "confidence"),
+            cursor=cursor, db_path=DB_PATH
         )
-        records = cursor.fetchall()
-        conn.close()
-        return [
-            {"timestamp": ts, "content": txt, "image": img, "sentiment": s, "confidence": c}
-            for ts, txt, img, s, c in records
-        ]
     except Exception as e:
         st.error(f"Error fetching posts: {e}")
-        return []
+        return [], None
 
 # =========================
 # Streamlit App Page
@@ -158,7 +133,7 @@ def app():
             st.error("⚠️ Wait for reveiw, Check on alerts for updates.")
 
     st.subheader(f"📜 Previous Analysis for: `{user_email}`")
-    posts = get_user_posts(user_email)
+    posts = paged(f"analysis_posts_{user_email}", lambda cursor: get_user_posts(user_email, cursor))
     if not posts:
         st.info("No sentiment analysis data found.")
         return
@@ -171,10 +146,10 @@ def app():
         emoji = EMOJI_MAP.get(post['sentiment'], '❓')
         exp_label = f"{ts} — {emoji} {post['sentiment'].capitalize()}"
         with st.expander(exp_label, expanded=False):
-            if post['content']:
-                st.write(f"**Text:** {post['content']}")
-            if post['image']:
-                img_path = os.path.join(UPLOAD_DIR, post['image'])
+            if post['post_content']:
+                st.write(f"**Text:** {post['post_content']}")
+            if post['image_name']:
+                img_path = os.path.join(UPLOAD_DIR, post['image_name'])
                 if os.path.exists(img_path):
                     st.image(img_path, caption="Uploaded Image", use_column_width=True)
             st.write(f"**Confidence:** {post['confidence']:.2f}")
@@ -0,0 +1,92 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from backend import metrics
+
+
+# ─── Chart rendering cache ─────────────────────────────────────────────────────
+# Charts are drawn from their aggregated data on a bare matplotlib Figure
+# (never registered with pyplot, so nothing outlives the call), rasterised
+# to PNG once and cached by (kind, data, options). A rerun with the same
+# numbers reuses the PNG bytes instead of building and rasterising a new
+# figure, and the cache is bounded so memory stays flat however many
+# sessions and reruns there are. matplotlib itself is only imported when
+# a chart is first drawn.
+
+CHART_CACHE_SIZE = int(os.environ.get("CHART_CACHE_SIZE", 256))
+DPI = 200   # what st.pyplot() used
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+counters = {"hits": 0, "renders": 0}
+
+
+def _pie(ax, labels, values, autopct="%1.1f%%", startangle=90):
+    ax.pie(values, labels=labels, autopct=autopct, startangle=startangle)
+    ax.axis("equal")
+
+
+def _bar(ax, labels, values):
+    ax.bar(labels, values)
+
+
+def _line(ax, labels, values, marker="o"):
+    ax.plot(labels, values, marker=marker)
+
+
+_DRAW = {"pie": _pie, "bar": _bar, "line": _line}
+
+
+def render(kind, labels, values, figsize=(6.4, 4.8), title=None, xlabel=None, ylabel=None,
+           rotate_xticks=0, **draw_options):
+    """ Return PNG bytes of a pie/bar/line chart, from the cache when the data is unchanged. """
+    key = (kind, tuple(labels), tuple(values), tuple(figsize), title, xlabel, ylabel,
+           rotate_xticks, tuple(sorted(draw_options.items())))
+    with _lock:
+        png = _cache.get(key)
+        if png is not None:
+            _cache.move_to_end(key)
+            counters["hits"] += 1
+            return png
+
+    from matplotlib.figure import Figure   # imported on the first cache miss
+
+    fig = Figure(figsize=figsize)
+    try:
+        with metrics.timer(f"charts.draw.{kind}"):
+            ax = fig.subplots()
+            _DRAW[kind](ax, list(labels), list(values), **draw_options)
+            if title:
+                ax.set_title(title)
+            if xlabel:
+                ax.set_xlabel(xlabel)
+            if ylabel:
+                ax.set_ylabel(ylabel)
+            if rotate_xticks:
+                ax.tick_params(axis="x", rotation=rotate_xticks)
+            buf = io.BytesIO()
+            fig.savefig(buf, format="png", dpi=DPI, bbox_inches="tight")
+            png = buf.getvalue()
+    finally:
+        fig.clear()
+
+    with _lock:
+        counters["renders"] += 1
+        _cache[key] = png
+        while len(_cache) > CHART_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return png
+
+
+def show(kind, labels, values, **options):
+    """ Render (or reuse) a chart and put it on the page like st.pyplot() would. """
+    st.image(render(kind, labels, values, **options), width="stretch")
+
+
+def cache_info():
+    with _lock:
+        return {"entries": len(_cache), "bytes": sum(len(png) for png in _cache.values()), **counters}
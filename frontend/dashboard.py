@@ -1,43 +1,30 @@
 import streamlit as st
-import sqlite3
-import os
-import matplotlib.pyplot as plt
+from backend import counters, database, migrations, page_cache
+from backend.connection import APP_DB, get_connection
+from frontend import charts
+from frontend.pagination import paged
 from datetime import datetime
 
 # ─── Paths ─────────────────────────────────────────────────────────────────────
 # Ensure we point at the same DB your main app created:
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))   # project root
-DB_PATH  = os.path.join(BASE_DIR, "data", "app_database.db")
-
-
-# ─── Helper: fetch from user_posts ─────────────────────────────────────────────
-def fetch_user_posts(user_email: str):
-    """Return all rows for this user as a list of dicts."""
-    conn = sqlite3.connect(DB_PATH)
-    cur  = conn.cursor()
-    cur.execute("""
-        SELECT timestamp, post_content, image_name, sentiment, confidence
-          FROM user_posts
-         WHERE username = ?
-         ORDER BY timestamp DESC
-    """, (user_email,))
-    rows = cur.fetchall()
-    conn.close()
-
-    return [
-        {
-            "timestamp":   ts,
-            "content":     content,
-            "image":       image_name,
-            "sentiment":   sentiment,
-            "confidence":  confidence
-        }
-        for ts, content, image_name, sentiment, confidence in rows
-    ]
+DB_PATH = APP_DB
+SENTIMENTS = ["positive", "negative", "neutral"]
+
+
+# ─── Loaders, cached until user_posts changes ─────────────────────────────────
+@page_cache.cached((DB_PATH, "user_posts"))
+def load_counts(user_email):
+    """ Per-user totals from the counters table: ({sentiment: posts}, total). """
+    scope = counters.read_scope(get_connection(DB_PATH), counters.user_scope(user_email))
+    return {s: scope.get(s, (0, 0))[0] for s in SENTIMENTS}, scope.get(counters.ALL, (0, 0))[0]
+
+
+list_posts = page_cache.cached((DB_PATH, "user_posts"))(database.list_posts)
 
 
 # ─── Streamlit Dashboard Page ─────────────────────────────────────────────────
 def app():
+    migrations.migrate_app_db(DB_PATH)
     st.title("📊 Dashboard")
 
     # 1) Read the same key your main app uses:
@@ -47,16 +34,18 @@ def app():
         return
     user_email = str(user_email)
 
-    # 2) Load all posts from the shared user_posts table
-    user_stats = fetch_user_posts(user_email)
+    # 2) Per-user totals come from the counters table; posts are read a page at a time
+    counts, total = load_counts(user_email)
 
     # ─── Alerts & Notifications ────────────────────────────────────────────────
     st.subheader("🚨 Alerts & Notifications")
-    negative = [p for p in user_stats if p["sentiment"] == "negative"]
 
-    if negative:
-        st.error(f"⚠️ You have {len(negative)} unreviewed flagged post(s)")
+    if counts["negative"]:
+        st.error(f"⚠️ You have {counts['negative']} unreviewed flagged post(s)")
         with st.expander("View Unreviewed Posts"):
+            negative = paged(f"dashboard_negative_{user_email}", lambda cursor: list_posts(
+                username=user_email, sentiment="negative", columns=("post_content", "confidence"),
+                cursor=cursor, db_path=DB_PATH))
             for p in negative:
                 # format timestamp cleanly
                 try:
@@ -64,7 +53,7 @@ def app():
                                  .strftime("%Y-%m-%d %H:%M:%S")
                 except:
                     ts = p["timestamp"]
-                text = p["content"] or "🖼️ Image post"
+                text = p["post_content"] or "🖼️ Image post"
                 conf = p["confidence"] or 0.0
                 st.write(f"- **{ts}** — {text} (Confidence: {conf:.2f})")
     else:
@@ -73,16 +62,10 @@ def app():
 
     # ─── Sentiment Analysis Overview ───────────────────────────────────────────
     st.subheader("📈 Sentiment Analysis Overview for You")
-    if not user_stats:
+    if not total:
         st.warning("You have no posts to analyze yet.")
         return
 
-    # tally counts
-    sentiments = ["positive", "negative", "neutral"]
-    counts = {s: sum(1 for p in user_stats if p["sentiment"] == s)
-              for s in sentiments}
-    total = len(user_stats)
-
     # metric cards
     c1, c2, c3 = st.columns(3)
     c1.metric("Positive", counts["positive"])
@@ -92,26 +75,13 @@ def app():
     # side-by-side charts
     chart1, chart2 = st.columns(2)
 
+    labels = [s.capitalize() for s in SENTIMENTS]
+    values = [counts[s] for s in SENTIMENTS]
     with chart1:
-        fig1, ax1 = plt.subplots()
-        ax1.pie(
-            [counts[s] for s in sentiments],
-            labels=[s.capitalize() for s in sentiments],
-            autopct="%1.1f%%",
-            startangle=90
-        )
-        ax1.axis("equal")
-        st.pyplot(fig1)
+        charts.show("pie", labels, values)
 
     with chart2:
-        fig2, ax2 = plt.subplots()
-        ax2.bar(
-            [s.capitalize() for s in sentiments],
-            [counts[s] for s in sentiments]
-        )
-        ax2.set_ylabel("Count")
-        ax2.set_title("Sentiment Counts")
-        st.pyplot(fig2)
+        charts.show("bar", labels, values, ylabel="Count", title="Sentiment Counts")
 
     st.markdown(f"**🧾 Total Analyzed Posts:** {total}")
 
@@ -123,15 +123,14 @@ def app():
                     st.warning("Please fill in all fields.")
                 elif email != confirm_email:
                     st.error("Emails do not match.")
-                elif database.user_exists(username):
-                    st.warning("Username already exists.")
                 else:
-                    success = database.create_user(username, email, password)
-                    if success:
+                    try:
+                        database.create_user(username, email, password)
+                    except database.UserExistsError as e:
+                        st.warning(f"🚫 {e}")
+                    else:
                         st.success("✅ Registration successful!")
                         st.session_state.show_login = True
-                    else:
-                        st.error("🚫 Email already exists or an error occurred.")
 
             st.button("Go to Login", on_click=switch_form)
 
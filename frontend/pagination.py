@@ -0,0 +1,25 @@
+import streamlit as st
+
+
+# ─── Prev/Next paging over backend.database keyset listings ────────────────────
+def paged(key: str, fetch_page):
+    """
+    Return the current page of rows from fetch_page(cursor) -> (rows, next_cursor)
+    and draw Prev/Next buttons for it.
+
+    The cursors of the pages visited so far are kept in st.session_state[key],
+    so going back is the same single indexed query as going forward. Include
+    anything the listing is filtered by in `key` so a new filter starts at page 1.
+    """
+    stack = st.session_state.setdefault(key, [None])
+    rows, next_cursor = fetch_page(stack[-1])
+
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("◀ Prev", key=f"{key}_prev", disabled=len(stack) == 1):
+        stack.pop()
+        st.rerun()
+    page_col.caption(f"Page {len(stack)}")
+    if next_col.button("Next ▶", key=f"{key}_next", disabled=next_cursor is None):
+        stack.append(next_cursor)
+        st.rerun()
+    return rows
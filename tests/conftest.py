@@ -0,0 +1,17 @@
+"""
+Every test session gets its own databases: backend.connection resolves
+APP_DB / USERS_DB from the environment at import (and backend.database
+migrates them on import), so the paths are set before anything imports
+the backend.
+"""
+import os
+import sys
+import tempfile
+
+_root = tempfile.mkdtemp(prefix="sentiment_tests_")
+os.environ["APP_DB_PATH"] = os.path.join(_root, "app.db")
+os.environ["USERS_DB_PATH"] = os.path.join(_root, "users.db")
+os.environ["SENTIMENT_CACHE_DB"] = os.path.join(_root, "sentiment_cache.db")
+os.environ["METRICS_DIR"] = os.path.join(_root, "metrics")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))   # project root
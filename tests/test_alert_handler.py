@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+from backend import migrations
+from backend.alert_handler import AlertStore
+from backend.connection import get_connection
+
+
+@pytest.fixture
+def app_db(tmp_path):
+    path = str(tmp_path / "app.db")
+    migrations.migrate_app_db(path)
+    conn = get_connection(path)
+    with conn:
+        conn.executemany("INSERT INTO user_posts (username, post_content) VALUES (?, 'x')",
+                         [("ann",), ("bob",), ("ann",)])
+    return path
+
+
+def _poll_all(store, cursor, limit, **filters):
+    seen = []
+    while True:
+        page, next_cursor = store.poll(cursor, limit=limit, **filters)
+        assert next_cursor >= cursor and len(page) <= limit
+        seen += page
+        if not page:
+            return seen, next_cursor
+        cursor = next_cursor
+
+
+def test_subscription_returns_only_new_alerts(app_db):
+    store = AlertStore(app_db)
+    store.add(1, "old")
+    everyone, ann, post2 = store.subscribe(), store.subscribe(username="ann"), store.subscribe(post_id=2)
+    assert everyone.poll() == ann.poll() == post2.poll() == []
+
+    ids = [store.add(post_id, f"alert {i}") for i, post_id in enumerate((1, 2, 3, 2))]
+    assert [a["id"] for a in everyone.poll()] == ids
+    assert [a["id"] for a in ann.poll()] == [ids[0], ids[2]]
+    assert [(a["post_id"], a["username"]) for a in post2.poll()] == [(2, "bob"), (2, "bob")]
+    assert everyone.poll() == ann.poll() == post2.poll() == []
+
+    # Another store (another process) writing to the same database.
+    other = AlertStore(app_db).add(3, "from elsewhere")
+    assert [a["id"] for a in ann.poll()] == [other] and post2.poll() == []
+
+
+def test_ring_buffer_is_bounded_and_old_cursors_read_the_table(app_db):
+    store = AlertStore(app_db, ring_size=5)
+    ids = [store.add(1 + i % 3, f"alert {i}") for i in range(12)]
+    assert [a["id"] for a in store._ring] == ids[-5:]
+    assert [a["id"] for a in store.recent(20)] == ids[::-1][:5]
+
+    store.counters.update(ring_hits=0, db_reads=0)
+    alerts, cursor = store.poll(ids[-5] - 1)           # the ring covers every id after this one
+    assert [a["id"] for a in alerts] == ids[-5:] and cursor == ids[-1]
+    assert store.counters == {"ring_hits": 1, "db_reads": 0}
+
+    alerts, cursor = store.poll(ids[-5] - 2)           # one alert older than the ring
+    assert [a["id"] for a in alerts] == ids[-6:] and cursor == ids[-1]
+    assert store.counters == {"ring_hits": 1, "db_reads": 1}
+
+
+def test_new_store_seeds_the_ring_from_existing_alerts(app_db):
+    ids = [AlertStore(app_db).add(1, f"alert {i}") for i in range(8)]
+    store = AlertStore(app_db, ring_size=3)
+    assert store.latest_id() == ids[-1]
+    assert [a["id"] for a in store._ring] == ids[-3:]
+    alerts, cursor = store.poll(ids[-4])
+    assert [a["id"] for a in alerts] == ids[-3:] and cursor == ids[-1]
+    assert store.counters["ring_hits"] == 1
+    assert [a["id"] for a in store.poll(0)[0]] == ids
+    assert store.counters["db_reads"] == 1
+
+
+def test_polling_matches_the_table_for_any_cursor_and_filter(app_db):
+    rng = random.Random(15)
+    store = AlertStore(app_db, ring_size=7)
+    for i in range(40):
+        store.add(rng.randint(1, 3), f"alert {i}")
+    rows = [dict(r) for r in get_connection(app_db).execute(
+        "SELECT id, post_id, username, admin_username, comment, timestamp FROM alerts ORDER BY id")]
+    for _ in range(200):
+        cursor = rng.randint(0, rows[-1]["id"] + 1)
+        filters = rng.choice(({}, {"username": "ann"}, {"username": "carl"}, {"post_id": 2}))
+        expected = [r for r in rows if r["id"] > cursor and all(r[k] == v for k, v in filters.items())]
+        seen, final = _poll_all(store, cursor, rng.choice((1, 2, 5, 100)), **filters)
+        assert seen == expected, (cursor, filters)
+        assert final == max(cursor, rows[-1]["id"])
+    assert store.counters["ring_hits"] and store.counters["db_reads"]
+    assert len(store._ring) == 7
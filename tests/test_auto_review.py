@@ -0,0 +1,55 @@
+import pytest
+
+from backend import auto_review, database, engines, migrations
+from backend.connection import get_connection
+
+SEVERE = "I noticed this part of your post was quite negative"
+MILD = "carries a somewhat negative tone"
+
+
+@pytest.fixture
+def textblob(monkeypatch):
+    # TextBlob's sentence splitter needs the NLTK corpora; score single sentences.
+    engine = engines.get_engine("textblob")
+    monkeypatch.setattr(engine, "sentences", lambda text: [(engine.polarity(text), text)])
+    return "textblob"
+
+
+@pytest.mark.parametrize("engine", ["vader", "textblob"])
+def test_comment_uses_the_active_engines_thresholds(engine, request, monkeypatch):
+    if engine == "textblob":
+        request.getfixturevalue("textblob")
+    monkeypatch.setattr(engines, "DEFAULT_ENGINE", engine)
+    assert SEVERE in auto_review.generate_dynamic_comment("This is terrible and I hate it.")
+    assert MILD in auto_review.generate_dynamic_comment("Not great.")
+
+
+def test_mild_vader_sentence_is_not_called_quite_negative(monkeypatch):
+    # VADER scores this about -0.5, past TextBlob's "quite negative" cut-off.
+    monkeypatch.setattr(engines, "DEFAULT_ENGINE", "vader")
+    comment = auto_review.generate_dynamic_comment("It was a bit disappointing.")
+    assert MILD in comment and SEVERE not in comment
+
+
+def test_comment_thresholds_stay_out_of_the_cache_tag():
+    engine = engines.get_engine("vader")
+    assert "comment_threshold" not in engine.version
+
+
+def test_post_without_content_does_not_stall_the_watermark(tmp_path):
+    app_db, users_db = str(tmp_path / "app.db"), str(tmp_path / "users.db")
+    migrations.migrate_app_db(app_db)
+    migrations.migrate_users_db(users_db)
+    database.create_user("gus", "gus@example.com", "secret", db_path=users_db)
+    conn = get_connection(app_db)
+    with conn:
+        conn.executemany(
+            "INSERT INTO user_posts (username, post_content, sentiment, confidence) VALUES (?, ?, 'negative', 0.9)",
+            [("gus@example.com", None), ("gus@example.com", "This is terrible and I hate it.")])
+
+    assert auto_review.generate_dynamic_comment(None)
+    assert auto_review.auto_process_flagged(app_db, users_db) == 1
+
+    assert database.get_watermark(auto_review.WATERMARK, app_db) == database.latest_post_id(app_db)
+    reviewed = dict(conn.execute("SELECT post_content, reviewed FROM user_posts").fetchall())
+    assert reviewed == {None: 0, "This is terrible and I hate it.": 1}
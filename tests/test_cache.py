@@ -0,0 +1,145 @@
+import threading
+import time
+
+import pytest
+
+from backend import cache
+from backend.cache import SentimentCache
+
+
+class CountingEngine:
+    """ Engine stand-in that records every text it scores; score_batch can be held at a gate. """
+    name, version = "counting", "1"
+
+    def __init__(self, gate=None):
+        self.scored = []
+        self.gate = gate
+        self.entered = threading.Event()
+
+    def score(self, text):
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts):
+        self.entered.set()
+        if self.gate is not None:
+            assert self.gate.wait(10)
+        self.scored.extend(texts)
+        return [{"sentiment": "neutral", "confidence": len(text) / 100, "polarity": 0.0} for text in texts]
+
+
+def _wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def disk(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+def test_memory_tier_evicts_least_recently_used():
+    c, engine = SentimentCache(max_entries=2, db_path=None), CountingEngine()
+    c.get_or_score(engine, "a")
+    c.get_or_score(engine, "b")
+    c.get_or_score(engine, "a")          # a is now the most recently used
+    c.get_or_score(engine, "c")          # evicts b
+    c.get_or_score_many(engine, ["a", "c"])
+    c.get_or_score(engine, "b")
+
+    assert engine.scored == ["a", "b", "c", "b"]
+    stats = c.stats()
+    assert stats["memory_evictions"] == 2 and stats["memory_entries"] == 2
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (3, 0, 4)
+    assert stats["hit_rate"] == pytest.approx(3 / 7)
+
+
+def test_normalized_text_shares_one_entry():
+    c, engine = SentimentCache(db_path=None), CountingEngine()
+    c.get_or_score(engine, "Good  day\n")
+    c.get_or_score(engine, " Good day")
+    assert len(engine.scored) == 1
+
+
+def test_disk_tier_survives_a_new_process(disk):
+    engine = CountingEngine()
+    first = SentimentCache(db_path=disk).get_or_score_many(engine, ["x", "y"])
+
+    fresh = SentimentCache(db_path=disk)
+    assert fresh.get_or_score_many(engine, ["x", "y", "z"])[:2] == first
+    assert engine.scored == ["x", "y", "z"]
+    stats = fresh.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (0, 2, 1)
+
+
+def test_trim_disk_keeps_the_most_recently_used_rows(disk, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(cache.time, "time", lambda: next(clock))
+    engine = CountingEngine()
+    c = SentimentCache(max_entries=1, db_path=disk, max_rows=3)
+    for text in ("a", "b", "c", "d", "e"):
+        c.get_or_score(engine, text)
+    c._disk_get([cache.cache_key(engine, "a")])     # touch a on disk
+
+    c.trim_disk()
+
+    kept = {row[0] for row in c._conn().execute("SELECT key FROM sentiment_cache")}
+    assert kept == {cache.cache_key(engine, t) for t in ("a", "d", "e")}
+    assert c.stats()["disk_evictions"] == 2
+
+
+def test_concurrent_batches_score_each_text_once():
+    gate = threading.Event()
+    engine = CountingEngine(gate)
+    c = SentimentCache(db_path=None)
+    results = {}
+
+    def run(name, fn):
+        results[name] = fn()
+
+    threads = [threading.Thread(target=run, args=("first", lambda: c.get_or_score_many(engine, ["a", "b"])))]
+    threads[0].start()
+    assert engine.entered.wait(10)       # the first batch is scoring a and b
+    threads += [threading.Thread(target=run, args=("second", lambda: c.get_or_score_many(engine, ["b", "c", "b"]))),
+                threading.Thread(target=run, args=("single", lambda: c.get_or_score(engine, "a")))]
+    for t in threads[1:]:
+        t.start()
+    _wait_for(lambda: c.stats()["collapsed"] >= 2)
+    gate.set()
+    for t in threads:
+        t.join(10)
+
+    assert sorted(engine.scored) == ["a", "b", "c"]
+    assert c.stats()["collapsed"] == 2
+    assert [r["confidence"] for r in results["second"]] == [0.01, 0.01, 0.01]
+    assert results["single"] == results["first"][0]
+
+
+def test_batch_failure_reaches_collapsed_callers():
+    gate = threading.Event()
+
+    class Failing(CountingEngine):
+        def score_batch(self, texts):
+            super().score_batch(texts)
+            raise RuntimeError("model crashed")
+
+    engine, c, errors = Failing(gate), SentimentCache(db_path=None), []
+
+    def call(fn):
+        try:
+            fn()
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    first = threading.Thread(target=call, args=(lambda: c.get_or_score_many(engine, ["a"]),))
+    first.start()
+    assert engine.entered.wait(10)
+    waiter = threading.Thread(target=call, args=(lambda: c.get_or_score(engine, "a"),))
+    waiter.start()
+    _wait_for(lambda: c.stats()["collapsed"] >= 1)
+    gate.set()
+    first.join(10)
+    waiter.join(10)
+
+    assert errors == ["model crashed", "model crashed"]
+    assert not c._inflight
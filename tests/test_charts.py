@@ -0,0 +1,40 @@
+import gc
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("matplotlib")
+from benchmarks.bench_charts import _dashboard_data, new_rerun  # noqa: E402  (selects Agg)
+from frontend import charts  # noqa: E402
+
+CACHE_SIZE = 8
+WARMUP = 20     # fills the chart cache and matplotlib's own caches, untraced
+RERUNS = 10     # 40 charts drawn while tracing
+# Still allocated after RERUNS traced reruns. Replacing the cached PNGs
+# accounts for ~2.3 MiB whatever RERUNS is; keeping each drawn Figure
+# alive adds ~19 MiB.
+MAX_GROWTH = 6 * 1024 * 1024
+
+
+def test_rendering_charts_does_not_leak(monkeypatch):
+    import matplotlib.pyplot as plt
+
+    monkeypatch.setattr(charts, "CHART_CACHE_SIZE", CACHE_SIZE)
+    charts._cache.clear()
+    distinct = WARMUP + RERUNS   # new numbers every rerun: every chart is drawn, none reused
+
+    for i in range(WARMUP):
+        new_rerun(_dashboard_data(i, distinct))
+    gc.collect()
+    tracemalloc.start()
+    try:
+        for i in range(WARMUP, WARMUP + RERUNS):
+            new_rerun(_dashboard_data(i, distinct))
+        gc.collect()
+        growth = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert plt.get_fignums() == []
+    assert len(charts._cache) == CACHE_SIZE
+    assert growth < MAX_GROWTH, f"{RERUNS} reruns left {growth / 1024:,.0f} KiB allocated"
@@ -0,0 +1,94 @@
+"""
+The trigger-maintained counters must always equal a GROUP BY over the base
+tables, however the rows change.
+"""
+import random
+
+import pytest
+
+from backend import counters, migrations
+from backend.connection import get_connection
+
+USERS = ("ann", "bob", "cid@example.com", "dee")
+SENTIMENTS = ("positive", "negative", "neutral", "Negative", None)
+
+
+def _from_triggers(conn):
+    return {(scope, sentiment): (posts, round(confidence_sum, 6))
+            for scope, sentiment, posts, confidence_sum in conn.execute("SELECT * FROM counters")
+            if posts}
+
+
+def _recomputed(conn):
+    """ The counters, recomputed in Python from user_posts and analysis. """
+    expected = {}
+
+    def add(scope, sentiment, confidence):
+        for key in ((scope, sentiment or ""), (scope, counters.ALL)):
+            posts, total = expected.get(key, (0, 0.0))
+            expected[key] = (posts + 1, total + (confidence or 0))
+
+    users = set()
+    for username, sentiment, confidence in conn.execute(
+            "SELECT username, sentiment, confidence FROM user_posts"):
+        add("global", sentiment, confidence)
+        add(counters.user_scope(username), sentiment, confidence)
+        users.add(username)
+    for sentiment, confidence in conn.execute("SELECT sentiment, confidence FROM analysis"):
+        add("analysis", sentiment, confidence)
+    if users:
+        expected[("global", counters.USERS)] = (len(users), 0.0)
+    return {key: (posts, round(total, 6)) for key, (posts, total) in expected.items()}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    path = str(tmp_path / "app.db")
+    migrations.migrate_app_db(path)
+    return get_connection(path)
+
+
+def test_counters_follow_inserts_updates_and_deletes(conn):
+    rng = random.Random(8)
+    with conn:
+        conn.executemany(
+            "INSERT INTO user_posts (username, post_content, sentiment, confidence) VALUES (?, 'x', ?, ?)",
+            [(rng.choice(USERS), rng.choice(SENTIMENTS), rng.choice((None, round(rng.random(), 3))))
+             for _ in range(200)])
+        conn.executemany("INSERT INTO analysis (data_type, sentiment, confidence) VALUES ('post', ?, ?)",
+                         [(rng.choice(SENTIMENTS), round(rng.random(), 3)) for _ in range(50)])
+    assert _from_triggers(conn) == _recomputed(conn)
+
+    ids = [row[0] for row in conn.execute("SELECT id FROM user_posts")]
+    with conn:
+        for post_id in rng.sample(ids, 40):
+            conn.execute("UPDATE user_posts SET sentiment = ? WHERE id = ?", (rng.choice(SENTIMENTS), post_id))
+        for post_id in rng.sample(ids, 40):
+            conn.execute("UPDATE user_posts SET username = ? WHERE id = ?", (rng.choice(USERS + ("eve",)), post_id))
+        for post_id in rng.sample(ids, 40):
+            conn.execute("UPDATE user_posts SET confidence = ? WHERE id = ?", (rng.choice((None, 0.5)), post_id))
+        conn.execute("UPDATE user_posts SET sentiment = 'positive', confidence = 0.25, username = 'fay' "
+                     "WHERE id IN (?, ?)", ids[:2])
+        conn.execute("UPDATE user_posts SET post_content = 'edited' WHERE id = ?", (ids[2],))
+    assert _from_triggers(conn) == _recomputed(conn)
+
+    with conn:
+        conn.executemany("DELETE FROM user_posts WHERE id = ?", [(i,) for i in rng.sample(ids, 60)])
+        conn.execute("DELETE FROM user_posts WHERE username = 'bob'")   # a user's last post goes
+        conn.execute("DELETE FROM analysis WHERE id IN (SELECT id FROM analysis LIMIT 20)")
+    assert _from_triggers(conn) == _recomputed(conn)
+    assert ("user:bob", counters.ALL) not in _from_triggers(conn)
+
+
+def test_rebuild_recomputes_drifted_counters(conn, capsys):
+    with conn:
+        conn.executemany("INSERT INTO user_posts (username, sentiment, confidence) VALUES (?, ?, ?)",
+                         [("ann", "positive", 0.5), ("bob", "negative", 0.75), ("bob", None, None)])
+        conn.execute("UPDATE counters SET posts = posts + 7")   # drift, e.g. from a restored backup
+        conn.execute("INSERT INTO counters VALUES ('user:ghost', '*', 3, 1.5)")
+    assert _from_triggers(conn) != _recomputed(conn)
+
+    counters.main(["--db", conn.execute("PRAGMA database_list").fetchone()[2], "--rebuild"])
+
+    assert "Counters rebuilt." in capsys.readouterr().out
+    assert _from_triggers(conn) == _recomputed(conn)
@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from backend import database, migrations
+from backend.connection import get_connection
+
+
+def test_update_user_writes_the_users_database():
+    database.create_user("dana", "dana@example.com", "secret")
+    user = database.login_user("dana@example.com", "secret")
+
+    database.update_user(user["id"], "dana2", "dana2@example.com")
+
+    assert database.login_user("dana2@example.com", "secret")["username"] == "dana2"
+    assert database.login_user("dana@example.com", "secret") is None
+
+
+def test_get_flagged_analyses_lists_negative_posts():
+    database.save_user_post("flagged-erin", "everything is awful", "negative", 0.9)
+    flagged = list(database.get_flagged_analyses())
+    assert any(row["username"] == "flagged-erin" for row in flagged)
+
+
+def test_get_user_analysis_counts_posts_under_email_and_username():
+    database.create_user("fay", "fay@example.com", "secret")
+    database.save_user_post("fay@example.com", "a great day", "positive", 0.8)
+    database.save_user_post("fay@example.com", "a bad day", "negative", 0.6)
+    database.save_user_post("fay", "an ordinary day", "neutral", 0.4)
+
+    stats = database.get_user_analysis("fay@example.com")
+
+    assert stats["total"] == 3
+    assert (stats["positive"], stats["negative"], stats["neutral"]) == (1, 1, 1)
+    assert stats["negative_confidence"] == 0.6
+
+
+def test_keyset_pages_return_every_row_once_in_order(tmp_path):
+    db = str(tmp_path / "app.db")
+    migrations.migrate_app_db(db)
+    rng = random.Random(10)
+    stamps = ["2024-01-01T10:00:00", "2024-01-02T10:00:00", "2024-01-03T10:00:00", None]
+    conn = get_connection(db)
+    with conn:
+        conn.executemany("INSERT INTO user_posts (username, post_content, sentiment, timestamp) VALUES (?, 'x', ?, ?)",
+                         [(rng.choice(("ann", "bob")), rng.choice(("negative", "positive")), rng.choice(stamps))
+                          for _ in range(47)])
+    rows = conn.execute("SELECT id, username, sentiment, timestamp FROM user_posts").fetchall()
+
+    def expected(keep):
+        dated = sorted((r for r in rows if keep(r) and r["timestamp"]),
+                       key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+        return [r["id"] for r in dated] + sorted((r["id"] for r in rows if keep(r) and not r["timestamp"]),
+                                                 reverse=True)
+
+    for filters, keep in (({}, lambda r: True),
+                          ({"username": "ann"}, lambda r: r["username"] == "ann"),
+                          ({"sentiment": "negative", "reviewed": 0}, lambda r: r["sentiment"] == "negative")):
+        for page_size in (1, 3, 10, 100):
+            seen, cursor = [], None
+            while True:
+                page, cursor = database.list_posts(page_size=page_size, cursor=cursor, db_path=db, **filters)
+                assert len(page) <= page_size
+                seen += [row["id"] for row in page]
+                if cursor is None:
+                    break
+                assert database.decode_cursor(cursor) == (page[-1]["timestamp"], page[-1]["id"])
+            assert seen == expected(keep), (filters, page_size)
+        assert [r["id"] for r in database.iter_posts(page_size=4, db_path=db, **filters)] == expected(keep)
+
+    with pytest.raises(ValueError):
+        database.decode_cursor("not a cursor")
+
+
+def test_reviewed_posts_page_by_alert_time_with_ties(tmp_path):
+    db = str(tmp_path / "app.db")
+    migrations.migrate_app_db(db)
+    conn = get_connection(db)
+    with conn:
+        conn.executemany("INSERT INTO user_posts (username, post_content) VALUES ('ann', ?)",
+                         [(f"post {i}",) for i in range(7)])
+        conn.executemany("INSERT INTO alerts (post_id, comment, timestamp) VALUES (?, 'x', ?)",
+                         [(i, "2024-01-01 10:00:00" if i % 2 else "2024-01-02 10:00:00") for i in range(1, 8)])
+    seen, cursor = [], None
+    while True:
+        page, cursor = database.list_reviewed_posts("ann", page_size=2, cursor=cursor, db_path=db)
+        seen += [row["id"] for row in page]
+        if cursor is None:
+            break
+    assert seen == [6, 4, 2, 7, 5, 3, 1]
+
+
+def test_search_users_trigram_and_short_prefix_branches(tmp_path):
+    db = str(tmp_path / "users.db")
+    migrations.migrate_users_db(db)
+    names = ["Alice", "alan", "Malachi", "al_bo", "al%x", "bob", "Bobby", "carol", 'quo"te', "zal"]
+    database.create_users(((name, f"{name.lower()}@{'ex' if i % 2 else 'mail'}.org", "pw")
+                           for i, name in enumerate(names)), db_path=db)
+    users = get_connection(db).execute("SELECT id, username, email FROM users").fetchall()
+
+    def search(query, limit=3):
+        seen, cursor = [], None
+        while True:
+            page, cursor, total = database.search_users(query, limit=limit, cursor=cursor, db_path=db)
+            assert len(page) <= limit
+            seen += [row["username"] for row in page]
+            if cursor is None:
+                assert total == len(seen)
+                return seen
+
+    def anywhere(query):
+        return [u["username"] for u in users if query.lower() in (u["username"] + "\0" + u["email"]).lower()]
+
+    def prefix(query):
+        return [u["username"] for u in users
+                if u["username"].lower().startswith(query.lower()) or u["email"].lower().startswith(query.lower())]
+
+    for query in ("ali", "ALI", "bob", "ex.org", "@mail", 'o"t', "al_", "al%", "nobody"):
+        assert search(query) == anywhere(query), query           # trigram: substring anywhere
+    for query in ("a", "AL", "b", "al", "la", "_", "%", "q"):
+        assert search(query) == prefix(query), query             # LIKE: prefix only, wildcards literal
+    assert search("la") == []
+    assert search("") == search("  ") == [u["username"] for u in users]
+
+    with get_connection(db) as conn:                               # users_fts follows edits
+        conn.execute("UPDATE users SET username = 'Alfred', email = 'alfred@ex.org' WHERE id = ?",
+                     (users[0]["id"],))
+        conn.execute("DELETE FROM users WHERE id = ?", (users[1]["id"],))
+    assert search("ali") == [] and search("ala") == ["Malachi"]
+    assert search("lfr") == ["Alfred"] and search("al", limit=2) == ["Alfred", "al_bo", "al%x"]
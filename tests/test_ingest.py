@@ -0,0 +1,29 @@
+import json
+
+from backend import ingest
+from backend.connection import get_connection
+
+
+def test_bad_jsonl_records_are_skipped_and_counted(tmp_path, capsys):
+    path = tmp_path / "posts.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"username": "ann", "text": "a lovely day"}),
+        '{"username": "bob", "text": ',            # truncated
+        json.dumps(["not", "an", "object"]),
+        json.dumps("just a string"),
+        json.dumps({"username": "cid"}),             # no content
+        "",
+        json.dumps({"user": "dee", "content": "what a mess"}),
+    ]) + "\n", encoding="utf-8")
+    db = str(tmp_path / "ingest.db")
+
+    rows, _ = ingest.ingest(str(path), db_path=db, workers=1, chunk_lines=3)
+
+    assert rows == 2
+    out = capsys.readouterr().out
+    assert "Skipped 2 unusable records in the chunk ending at byte" in out
+    assert "Skipped 4 records" in out
+    conn = get_connection(db)
+    assert [r[0] for r in conn.execute("SELECT username FROM user_posts ORDER BY id")] == ["ann", "dee"]
+    # The checkpoint moved past the bad lines, so a rerun has nothing left to do.
+    assert ingest.ingest(str(path), db_path=db, workers=1)[0] == 0
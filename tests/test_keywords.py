@@ -0,0 +1,77 @@
+import random
+
+from backend import keywords
+from backend.keywords import Automaton, KeywordMatcher
+
+
+def _naive(phrases, text):
+    """ Every whole-word occurrence of each phrase, found by plain substring search. """
+    found = set()
+    for index, phrase in enumerate(phrases):
+        start = text.find(phrase)
+        while start != -1:
+            end = start + len(phrase)
+            before_ok = not (keywords._is_word_char(phrase[0]) and start and keywords._is_word_char(text[start - 1]))
+            after_ok = not (keywords._is_word_char(phrase[-1]) and end < len(text)
+                            and keywords._is_word_char(text[end]))
+            if before_ok and after_ok:
+                found.add((start, index))
+            start = text.find(phrase, start + 1)
+    return found
+
+
+def test_overlapping_and_nested_phrases():
+    phrases = ["want to die", "to die", "die", "self harm", "harm", "self-harm"]
+    found = sorted(Automaton(phrases).find("i want to die, self harm and self-harm. diet, harmless"))
+    assert [(start, phrases[i]) for start, i in found] == [
+        (2, "want to die"), (7, "to die"), (10, "die"),
+        (15, "self harm"), (20, "harm"), (29, "self-harm"), (34, "harm")]
+
+
+def test_automaton_agrees_with_substring_search():
+    rng = random.Random(14)
+    for _ in range(200):
+        phrases = list({"".join(rng.choice("ab -") for _ in range(rng.randint(1, 4))).strip() or "a"
+                        for _ in range(rng.randint(1, 8))})
+        text = "".join(rng.choice("ab -") for _ in range(rng.randint(0, 40)))
+        assert set(Automaton(phrases).find(text)) == _naive(phrases, text), (phrases, text)
+
+
+def test_parse_keywords():
+    assert keywords.parse_keywords([
+        "# comment\n", "Hopeless | 3\n", "  can’t   go on  \n", "alone # trailing\n", "|2\n", "\n"]) == {
+        "hopeless": 3.0, "can't go on": 1.0, "alone": 1.0}
+
+
+def test_matcher_counts_and_scores(tmp_path):
+    path = tmp_path / "keywords.txt"
+    path.write_text("hopeless | 3\nalone\n", encoding="utf-8")
+    matcher = KeywordMatcher(path=str(path))
+    hits = matcher.match("Hopeless, HOPELESS and   alone")
+    assert hits == {"hopeless": 2, "alone": 1}
+    assert matcher.score(hits) == 7.0
+
+
+def test_matcher_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "keywords.txt"
+    path.write_text("hopeless | 2\n", encoding="utf-8")
+    matcher = KeywordMatcher(path=str(path), check_interval=0)
+    assert matcher.match("feeling hopeless and alone") == {"hopeless": 1}
+
+    path.write_text("hopeless | 2\nalone | 1.5\n", encoding="utf-8")
+    assert matcher.match("feeling hopeless and alone") == {"hopeless": 1, "alone": 1}
+    assert matcher.weights == {"hopeless": 2.0, "alone": 1.5}
+    assert not matcher.reload_if_changed()          # unchanged since the last load
+
+    path.unlink()
+    assert matcher.match("feeling hopeless") == {}
+
+
+def test_reload_waits_for_the_check_interval(tmp_path):
+    path = tmp_path / "keywords.txt"
+    path.write_text("hopeless\n", encoding="utf-8")
+    matcher = KeywordMatcher(path=str(path), check_interval=3600)
+    path.write_text("alone\n", encoding="utf-8")
+    assert matcher.match("hopeless and alone") == {"hopeless": 1}
+    assert matcher.reload_if_changed(force=True)
+    assert matcher.match("hopeless and alone") == {"alone": 1}
@@ -0,0 +1,104 @@
+import pytest
+
+from backend import auto_review, database, leader, migrations, worker
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(leader.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def app_db(tmp_path):
+    path = str(tmp_path / "app.db")
+    migrations.migrate_app_db(path)
+    return path
+
+
+def test_one_holder_at_a_time_and_renewal(app_db, clock):
+    a = leader.LeaderLock("jobs", app_db, ttl=30, holder="a")
+    b = leader.LeaderLock("jobs", app_db, ttl=30, holder="b")
+
+    assert a.acquire() and not b.acquire()
+    acquired = leader.current("jobs", app_db)["acquired_at"]
+    clock.advance(20)
+    assert a.acquire()                      # heartbeat before expiry keeps the lease
+    lease = leader.current("jobs", app_db)
+    assert lease["holder"] == "a" and lease["acquired_at"] == acquired
+    assert lease["expires_at"] == clock.now + 30
+    clock.advance(20)                       # 40s after acquiring, but only 20 after the heartbeat
+    assert not b.acquire() and a.held
+
+
+def test_expired_lease_is_taken_over_and_the_old_holder_demoted(app_db, clock):
+    a = leader.LeaderLock("jobs", app_db, ttl=30, holder="a")
+    b = leader.LeaderLock("jobs", app_db, ttl=30, holder="b")
+    assert a.acquire()
+
+    clock.advance(30)
+    assert not b.acquire()                  # expires_at is inclusive
+    clock.advance(0.001)
+    assert b.acquire()
+    assert not a.acquire() and not a.held
+    assert leader.current("jobs", app_db)["holder"] == "b"
+    assert leader.current("jobs", app_db)["acquired_at"] == clock.now
+
+    clock.advance(31)
+    assert leader.current("jobs", app_db) is None
+
+
+def test_release_hands_over_at_once(app_db, clock):
+    a = leader.LeaderLock("jobs", app_db, ttl=30, holder="a")
+    b = leader.LeaderLock("jobs", app_db, ttl=30, holder="b")
+    assert a.acquire()
+    b.release()                             # not ours: a keeps it
+    assert not b.acquire()
+    a.release()
+    assert b.acquire() and not a.held
+
+
+def test_demoted_worker_stops_between_batches(app_db, tmp_path, clock, monkeypatch):
+    users_db = str(tmp_path / "users.db")
+    migrations.migrate_users_db(users_db)
+    database.create_user("ann", "ann@example.com", "secret", db_path=users_db)
+    conn = database.get_db_connection(app_db)
+    with conn:
+        conn.executemany("INSERT INTO user_posts (username, post_content, sentiment, confidence) "
+                         "VALUES ('ann@example.com', ?, 'negative', 0.9)",
+                         [(f"This is terrible and I hate it, day {i}.",) for i in range(250)])
+    monkeypatch.setattr(auto_review, "BATCH_SIZE", 100)
+
+    w = worker.Worker(app_db, users_db, ttl=30, holder="a")
+    rival = leader.LeaderLock(worker.LEASE_NAME, app_db, ttl=30, holder="b")
+    w._beat()
+    assert w._leading()
+
+    save_alerts = database.save_alerts
+
+    def save_then_lose_the_lease(*args, **kwargs):
+        save_alerts(*args, **kwargs)
+        clock.advance(31)                   # the heartbeat stalled; b takes over
+        assert rival.acquire()
+        w._beat()
+
+    monkeypatch.setattr(database, "save_alerts", save_then_lose_the_lease)
+    written = auto_review.auto_process_flagged(app_db, users_db, keep_going=w._leading)
+
+    assert written == 100
+    assert not w._leading()
+    ran = []
+    w._job("noop", lambda: ran.append(1))
+    assert ran == []
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from backend import database, metrics
+
+
+@pytest.fixture
+def recording():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.enable(False)
+    metrics.reset()
+
+
+def test_generator_is_timed_over_its_iteration(recording):
+    @metrics.timed("test.stream")
+    def stream():
+        for i in range(3):
+            time.sleep(0.01)
+            yield i
+
+    rows = stream()
+    assert "test.stream" not in metrics.snapshot()   # nothing recorded before iterating
+    assert list(rows) == [0, 1, 2]
+    s = metrics.snapshot()["test.stream"]
+    assert s["calls"] == 1 and s["errors"] == 0
+    assert s["seconds"] >= 0.03
+
+
+def test_generator_time_excludes_the_consumer(recording):
+    @metrics.timed("test.stream")
+    def stream():
+        yield from range(3)
+
+    for _ in stream():
+        time.sleep(0.02)
+    assert metrics.snapshot()["test.stream"]["seconds"] < 0.02
+
+
+def test_generator_closed_early_and_failing_generator(recording):
+    @metrics.timed("test.stream")
+    def stream(fail):
+        yield 1
+        if fail:
+            raise ValueError("boom")
+        yield 2
+
+    rows = stream(False)
+    next(rows)
+    rows.close()
+    with pytest.raises(ValueError):
+        list(stream(True))
+    s = metrics.snapshot()["test.stream"]
+    assert s["calls"] == 2 and s["errors"] == 1
+
+
+def test_database_readers_record_their_queries(recording):
+    database.save_user_post("metrics@example.com", "a post to stream", "Neutral", 0.5)
+    posts = database.get_all_posts()
+    assert "database.get_all_posts" not in metrics.snapshot()
+    assert any(row["username"] == "metrics@example.com" for row in list(posts))
+    snap = metrics.snapshot()
+    assert snap["database.get_all_posts"]["calls"] == 1
+    assert "database.iter_posts" in snap
+
+
+def test_trivial_helpers_are_not_instrumented(recording):
+    for name in ("get_db_connection", "get_joined_connection", "encode_cursor", "decode_cursor"):
+        assert not hasattr(getattr(database, name), "metric_name")
+    database.get_system_stats()
+    assert not any(name.endswith("_connection") for name in metrics.snapshot())
+
+
+def test_nothing_recorded_while_disabled():
+    metrics.reset()
+    list(database.get_all_posts())
+    database.get_system_stats()
+    assert metrics.snapshot() == {}
+
+
+def test_prometheus_round_trip(recording):
+    with metrics.timer('test."quoted"'):
+        pass
+    with pytest.raises(KeyError):
+        with metrics.timer("test.error"):
+            raise KeyError
+    snap = metrics.snapshot()
+    assert metrics.from_prometheus(metrics.to_prometheus(snap, "test")) == snap
@@ -0,0 +1,44 @@
+import logging
+
+from backend import migrations, query_check
+from backend.connection import get_connection
+
+
+def test_duplicate_user_keys_are_reported_and_the_oldest_kept(tmp_path, caplog):
+    path = str(tmp_path / "users.db")
+    migrations.migrate(path, migrations.USERS_MIGRATIONS[:5])
+    conn = get_connection(path)
+    with conn:
+        conn.executemany("INSERT INTO users (id, username, email, password) VALUES (?, ?, ?, 'x')", [
+            (1, "ann", "ann@example.com"),
+            (2, "ann2", "ann@example.com"),
+            (3, "bob", "bob@example.com"),
+            (4, "ann", "ann@example.com"),
+        ])
+
+    with caplog.at_level(logging.WARNING, logger="backend.migrations"):
+        migrations.migrate_users_db(path)
+
+    emails = dict(conn.execute("SELECT id, email FROM users").fetchall())
+    assert emails[1] == "ann@example.com" and emails[3] == "bob@example.com"
+    assert emails[2] != "ann@example.com" and emails[4] != "ann@example.com"
+    report = conn.execute("SELECT user_id, field, original_value, kept_by FROM user_key_conflicts "
+                          "ORDER BY user_id, field").fetchall()
+    assert [tuple(r) for r in report] == [
+        (2, "email", "ann@example.com", 1),
+        (4, "email", "ann@example.com", 1),
+        (4, "username", "ann", 1),
+    ]
+    assert "3 duplicate usernames/emails" in caplog.text
+    assert conn.execute("SELECT id FROM users WHERE email = ?", ("ann@example.com",)).fetchall()[0][0] == 1
+
+
+def test_app_queries_use_indexes(capsys):
+    failures = query_check.check()
+    out = capsys.readouterr().out
+    assert failures == 0, "\n".join(line for line in out.splitlines() if line.startswith("SCAN"))
+    assert "count_posts(username='ann@example.com', reviewed=1)" in out   # frontend/alerts.py
+
+
+def test_query_check_catches_a_scan(capsys):
+    assert query_check.check([("app", "unindexed", "SELECT id FROM user_posts WHERE post_content = ?")]) == 1
@@ -0,0 +1,136 @@
+import datetime
+import socket
+import threading
+
+import pytest
+
+from backend import migrations, outbox
+from backend.connection import get_connection
+
+Controller = pytest.importorskip("aiosmtpd.controller").Controller
+
+
+class Handler:
+    """ SMTP stand-in: temp@ gets a 4xx, bad@ a 5xx, everyone else is accepted. """
+
+    def __init__(self):
+        self.received = []
+        self._lock = threading.Lock()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("temp@"):
+            return "451 4.3.0 Try again later"
+        if address.startswith("bad@"):
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.received.extend(envelope.rcpt_tos)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    migrations.migrate_app_db(path)
+    return path
+
+
+def _sender(db, port, **options):
+    return outbox.Sender(db, "127.0.0.1", port, user="", starttls=False, **options)
+
+
+def _row(db, message_id):
+    return get_connection(db).execute("SELECT * FROM outbox WHERE id = ?", (message_id,)).fetchone()
+
+
+def test_messages_are_sent(smtp, db):
+    handler, port = smtp
+    ids = [outbox.enqueue(f"user{i}@example.com", "hi", f"<p>{i}</p>", db_path=db) for i in range(6)]
+
+    assert _sender(db, port).run_once() == (6, 0, 0)
+
+    assert sorted(handler.received) == sorted(f"user{i}@example.com" for i in range(6))
+    assert outbox.stats(db)["sent"] == 6
+    assert all(_row(db, i)["status"] == outbox.SENT and _row(db, i)["attempts"] == 1 for i in ids)
+
+
+def test_temporary_failure_is_retried_with_backoff(smtp, db):
+    handler, port = smtp
+    message_id = outbox.enqueue("temp@example.com", "hi", "<p>later</p>", db_path=db)
+    sender = _sender(db, port)
+
+    before = datetime.datetime.now()
+    assert sender.run_once() == (0, 1, 0)
+
+    row = _row(db, message_id)
+    assert row["status"] == outbox.PENDING
+    assert row["attempts"] == 1
+    assert "451" in row["last_error"]
+    # backoff(1) waits between half and all of BACKOFF_BASE
+    wait = (datetime.datetime.fromisoformat(row["next_attempt_at"]) - before).total_seconds()
+    assert outbox.BACKOFF_BASE / 2 <= wait <= outbox.BACKOFF_BASE + 1
+    assert sender.run_once() == (0, 0, 0)   # not due yet
+    assert handler.received == []
+
+
+def test_permanent_failure_marks_the_row_failed(smtp, db):
+    handler, port = smtp
+    message_id = outbox.enqueue("bad@example.com", "hi", "<p>never</p>", db_path=db)
+
+    assert _sender(db, port).run_once() == (0, 0, 1)
+
+    row = _row(db, message_id)
+    assert row["status"] == outbox.FAILED
+    assert "550" in row["last_error"]
+    assert _sender(db, port).run_once() == (0, 0, 0)
+    assert handler.received == []
+
+
+def test_claimed_rows_are_not_sent_twice(smtp, db):
+    handler, port = smtp
+    for i in range(3):
+        outbox.enqueue(f"user{i}@example.com", "hi", "<p>once</p>", db_path=db)
+
+    first, second = _sender(db, port), _sender(db, port)
+    rows = first.claim()
+    assert len(rows) == 3
+    assert second.run_once() == (0, 0, 0)   # everything is leased to the first sender
+    first.record(first.send_share(rows))
+    assert second.run_once() == (0, 0, 0)
+    assert sorted(handler.received) == [f"user{i}@example.com" for i in range(3)]
+
+
+def test_concurrent_senders_deliver_each_message_once(smtp, db):
+    handler, port = smtp
+    for i in range(200):
+        outbox.enqueue(f"user{i}@example.com", "hi", "<p>once</p>", db_path=db)
+
+    def drain():
+        sender = _sender(db, port, batch_size=10)
+        while sender.run_once() != (0, 0, 0):
+            pass
+
+    threads = [threading.Thread(target=drain) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(handler.received) == 200
+    assert len(set(handler.received)) == 200
+    assert outbox.stats(db)["sent"] == 200
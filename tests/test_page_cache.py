@@ -0,0 +1,83 @@
+import sqlite3
+
+import pytest
+
+from backend import database, migrations, page_cache
+from backend.connection import get_connection
+
+
+@pytest.fixture
+def dbs(tmp_path):
+    app_db, users_db = str(tmp_path / "app.db"), str(tmp_path / "users.db")
+    migrations.migrate_app_db(app_db)
+    migrations.migrate_users_db(users_db)
+    page_cache.get_cache().clear()
+    return app_db, users_db
+
+
+def _counting_loader(sources, query_db):
+    calls = []
+
+    @page_cache.cached(*sources)
+    def load(sentiment=None):
+        calls.append(sentiment)
+        return database.count_posts(sentiment=sentiment, db_path=query_db)
+    return load, calls
+
+
+def test_writes_to_a_source_table_invalidate_the_loader(dbs):
+    app_db, users_db = dbs
+    load, calls = _counting_loader([(app_db, "user_posts"), (app_db, "alerts"), (users_db, "users")], app_db)
+    app, users = get_connection(app_db), get_connection(users_db)
+
+    def write(conn, sql, *params):
+        with conn:
+            conn.execute(sql, params)
+
+    assert load() == 0 and load() == 0
+    assert len(calls) == 1
+
+    write(app, "INSERT INTO user_posts (username, sentiment) VALUES ('ann', 'negative')")
+    assert load() == 1 and len(calls) == 2
+    write(app, "UPDATE user_posts SET sentiment = 'positive' WHERE id = 1")
+    assert load("negative") == 0 and load() == 1
+    assert len(calls) == 4
+    write(app, "INSERT INTO alerts (post_id, comment) VALUES (1, 'x')")
+    load()
+    write(app, "DELETE FROM alerts")
+    load()
+    write(users, "INSERT INTO users (username, email, password) VALUES ('ann', 'ann@example.com', 'x')")
+    load()
+    assert len(calls) == 7
+
+    # Another process writing through its own connection is seen too.
+    other = sqlite3.connect(app_db)
+    with other:
+        other.execute("DELETE FROM user_posts")
+    other.close()
+    assert load() == 0 and len(calls) == 8
+    assert page_cache.stats()[load.__module__ + "." + load.__qualname__]["hits"] == 1
+
+
+def test_writes_elsewhere_keep_the_cached_result(dbs):
+    app_db, users_db = dbs
+    load, calls = _counting_loader([(app_db, "user_posts")], app_db)
+    app = get_connection(app_db)
+    load()
+    with app:
+        app.execute("INSERT INTO alerts (post_id, comment) VALUES (1, 'x')")
+        app.execute("INSERT INTO watermarks (name, value) VALUES ('x', 1)")
+        app.execute("INSERT INTO outbox (to_addr, subject, html_body, next_attempt_at, created_at) "
+                    "VALUES ('a', 'b', 'c', 'd', 'e')")
+    with get_connection(users_db):
+        get_connection(users_db).execute("INSERT INTO users (username, email, password) VALUES ('b', 'b@x', 'x')")
+    assert load() == 0
+    assert len(calls) == 1
+
+
+def test_a_database_without_versions_is_never_cached(tmp_path, dbs):
+    bare = str(tmp_path / "bare.db")
+    get_connection(bare).execute("CREATE TABLE user_posts (id INTEGER PRIMARY KEY)")
+    load, calls = _counting_loader([(bare, "user_posts")], dbs[0])
+    load(), load()
+    assert len(calls) == 2
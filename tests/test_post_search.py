@@ -0,0 +1,103 @@
+import datetime
+
+import pytest
+
+from backend import migrations, post_search
+from backend.connection import get_connection
+
+
+@pytest.fixture
+def app_db(tmp_path):
+    path = str(tmp_path / "app.db")
+    migrations.migrate_app_db(path)
+    return path
+
+
+def _write(db, sql, *params):
+    conn = get_connection(db)
+    with conn:
+        return conn.execute(sql, params).lastrowid
+
+
+def _post(db, text, username="ann", timestamp="2024-03-01T12:00:00", sentiment="Negative"):
+    return _write(db, "INSERT INTO user_posts (username, post_content, timestamp, sentiment, confidence) "
+                      "VALUES (?, ?, ?, ?, 0.9)", username, text, timestamp, sentiment)
+
+
+def _ids(db, query, **filters):
+    rows, total = post_search.search(query, db_path=db, **filters)
+    assert total == len(rows)
+    return sorted(row["id"] for row in rows)
+
+
+def _index_is_consistent(db):
+    # With an external-content table, rank=1 compares the index against user_posts.
+    _write(db, "INSERT INTO posts_fts (posts_fts, rank) VALUES ('integrity-check', 1)")
+    return True
+
+
+def test_to_match_quotes_everything():
+    assert post_search.to_match('can\'t sleep "so tired" cut*') == '"can\'t" "sleep" "so tired" "cut"*'
+    assert post_search.to_match('say "hi""') == '"say" "hi" """"'
+    assert post_search.to_match("NOT this OR that") == '"NOT" "this" "OR" "that"'
+    assert post_search.to_match("  ** \"\" ") == ""
+
+
+@pytest.mark.parametrize("query", [
+    'AND', 'a OR', 'NOT', '"unterminated', 'post_content:cut', '(cut', 'NEAR(cut sleep)',
+    '^cut', '-cut', '+cut', 'cut*sleep', '*', 'c"u"t', "'; DROP TABLE user_posts; --", "ünïcödé"])
+def test_fts_syntax_in_queries_never_raises(app_db, query):
+    _post(app_db, "I cut myself and can't sleep")
+    post_search.search(query, db_path=app_db)
+
+
+def test_phrases_prefixes_and_stemming(app_db):
+    a = _post(app_db, "I keep cutting and can't sleep at night")
+    b = _post(app_db, "sleep is hard, I can't stop")
+    assert _ids(app_db, "cut") == [a]                 # porter: cutting -> cut
+    assert _ids(app_db, '"can\'t sleep"') == [a]
+    assert _ids(app_db, "can't sleep") == [a, b]
+    assert _ids(app_db, "slee*") == [a, b]
+    assert _ids(app_db, "slee") == []
+
+
+def test_triggers_keep_the_index_in_step(app_db):
+    a = _post(app_db, "feeling hopeless today")
+    b = _post(app_db, "a quiet walk")
+    assert _ids(app_db, "hopeless") == [a]
+
+    _write(app_db, "UPDATE user_posts SET post_content = 'a hopeless walk' WHERE id = ?", b)
+    _write(app_db, "UPDATE user_posts SET post_content = 'feeling better today' WHERE id = ?", a)
+    assert _ids(app_db, "hopeless") == [b]
+    assert _ids(app_db, "better") == [a]
+
+    _write(app_db, "UPDATE user_posts SET sentiment = 'Positive' WHERE id = ?", b)   # not post_content
+    assert _ids(app_db, "hopeless", sentiment="Positive") == [b]
+
+    _write(app_db, "DELETE FROM user_posts WHERE id = ?", b)
+    assert _ids(app_db, "hopeless") == []
+    _write(app_db, "UPDATE user_posts SET post_content = NULL WHERE id = ?", a)
+    assert _ids(app_db, "better") == []
+    assert _index_is_consistent(app_db)
+
+
+def test_rebuild_matches_the_triggers(app_db):
+    ids = [_post(app_db, f"post number {i} about sleep") for i in range(5)]
+    with get_connection(app_db) as conn:
+        post_search.rebuild(conn)
+    assert _ids(app_db, "sleep") == ids
+    assert _index_is_consistent(app_db)
+
+
+def test_filters_and_snippets(app_db):
+    a = _post(app_db, "cannot sleep", username="ann", timestamp="2024-03-01T23:59:00")
+    b = _post(app_db, "cannot sleep", username="bob", timestamp="2024-03-02T00:00:00", sentiment="Neutral")
+    assert _ids(app_db, "sleep", username="bob") == [b]
+    assert _ids(app_db, "sleep", sentiment="Negative") == [a]
+    assert _ids(app_db, "sleep", until=datetime.date(2024, 3, 1)) == [a]
+    assert _ids(app_db, "sleep", since=datetime.date(2024, 3, 2)) == [b]
+    assert _ids(app_db, "sleep", since=datetime.date(2024, 4, 1)) == []
+
+    _post(app_db, "<b>sleep</b> & more")
+    rows, _ = post_search.search("sleep", order="newest", db_path=app_db)
+    assert post_search.snippet_html(rows[0]["snippet"]) == "&lt;b&gt;<mark>sleep</mark>&lt;/b&gt; &amp; more"
@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+from backend import connection, database
+from backend.connection import get_connection, retry_on_busy
+
+
+class _BusyOnce:
+    """ Connection proxy whose first statement containing `sql` fails as if locked. """
+
+    def __init__(self, conn, sql):
+        self.conn, self.sql, self.failed = conn, sql, False
+
+    def execute(self, statement, *args):
+        if self.sql in statement and not self.failed:
+            self.failed = True
+            raise sqlite3.OperationalError("database is locked")
+        return self.conn.execute(statement, *args)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self.conn.__exit__(*exc)
+
+
+def test_save_user_post_retry_stores_the_post_once(monkeypatch):
+    before = database.count_posts(username="retry-bob")
+    total = database.get_system_stats()["total_posts"]
+    conn = _BusyOnce(get_connection(database.APP_DB), "INSERT INTO analysis")
+    monkeypatch.setattr(database, "get_db_connection", lambda db_name=database.APP_DB: conn)
+
+    database.save_user_post("retry-bob", "feeling hopeless today", "negative", 0.8)
+
+    assert conn.failed
+    assert database.count_posts(username="retry-bob") == before + 1
+    assert database.get_system_stats()["total_posts"] == total + 1
+
+
+def test_retry_refuses_to_rerun_committed_work(tmp_path):
+    path = str(tmp_path / "retry.db")
+    get_connection(path).execute("CREATE TABLE t (x)")
+    calls = []
+
+    @retry_on_busy
+    def two_commits():
+        calls.append(1)
+        conn = get_connection(path)
+        with conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+        raise sqlite3.OperationalError("database is locked")
+
+    with pytest.raises(RuntimeError, match="committed before SQLITE_BUSY"):
+        two_commits()
+    assert len(calls) == 1
+    assert get_connection(path).execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+
+
+def test_retry_reruns_a_single_transaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(connection, "BUSY_RETRIES", 2)
+    path = str(tmp_path / "retry.db")
+    get_connection(path).execute("CREATE TABLE t (x)")
+    calls = []
+
+    @retry_on_busy
+    def one_transaction():
+        calls.append(1)
+        conn = get_connection(path)
+        with conn:
+            conn.execute("INSERT INTO t VALUES (1)")
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+
+    one_transaction()
+    assert len(calls) == 2
+    assert get_connection(path).execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
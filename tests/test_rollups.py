@@ -0,0 +1,104 @@
+"""
+The trigger-maintained rollups must always equal a GROUP BY over the base
+tables per time bucket, however the rows change.
+"""
+import datetime
+import random
+
+import pytest
+
+from backend import migrations, rollups
+from backend.connection import get_connection
+
+SENTIMENTS = ("positive", "negative", "neutral", None)
+
+
+def _timestamp(rng):
+    if rng.random() < 0.1:
+        return rng.choice((None, "not a date"))
+    moment = datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=rng.randrange(5 * 24 * 60))
+    return moment.isoformat(sep=rng.choice("T "))
+
+
+def _from_triggers(conn, metric):
+    return {(grain, bucket, sentiment): count for grain, bucket, sentiment, count in conn.execute(
+        "SELECT grain, bucket, sentiment, count FROM rollups WHERE metric = ?", (metric,)) if count}
+
+
+def _recomputed(conn, metric):
+    """ One metric's rollups, recomputed in Python from its base table. """
+    table, column, _ = rollups.SOURCES[metric]
+    sentiment = "sentiment" if metric == "posts" else "''"
+    expected = {}
+    for timestamp, label in conn.execute(f"SELECT {column}, {sentiment} FROM {table}"):
+        try:
+            moment = datetime.datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            continue   # undated rows are not bucketed
+        for grain, fmt in rollups.GRAINS.items():
+            key = (grain, moment.strftime(fmt), label or "")
+            expected[key] = expected.get(key, 0) + 1
+    return expected
+
+
+@pytest.fixture
+def dbs(tmp_path):
+    app_db, users_db = str(tmp_path / "app.db"), str(tmp_path / "users.db")
+    migrations.migrate_app_db(app_db)
+    migrations.migrate_users_db(users_db)
+    return get_connection(app_db), get_connection(users_db)
+
+
+def _assert_consistent(app, users):
+    for conn, metric in ((app, "posts"), (app, "alerts"), (users, "signups")):
+        assert _from_triggers(conn, metric) == _recomputed(conn, metric), metric
+
+
+def test_rollups_follow_inserts_updates_and_deletes(dbs):
+    app, users = dbs
+    rng = random.Random(9)
+    with app:
+        app.executemany("INSERT INTO user_posts (username, sentiment, timestamp) VALUES ('ann', ?, ?)",
+                        [(rng.choice(SENTIMENTS), _timestamp(rng)) for _ in range(200)])
+        app.executemany("INSERT INTO alerts (post_id, comment, timestamp) VALUES (?, 'x', ?)",
+                        [(rng.randint(1, 200), _timestamp(rng)) for _ in range(60)])
+    with users:
+        users.executemany("INSERT INTO users (username, email, password, created_at) VALUES (?, ?, 'x', ?)",
+                          [(f"u{i}", f"u{i}@example.com", _timestamp(rng)) for i in range(50)])
+    _assert_consistent(app, users)
+
+    with app:
+        for post_id in rng.sample(range(1, 201), 50):
+            app.execute("UPDATE user_posts SET sentiment = ? WHERE id = ?", (rng.choice(SENTIMENTS), post_id))
+        for post_id in rng.sample(range(1, 201), 50):
+            app.execute("UPDATE user_posts SET timestamp = ? WHERE id = ?", (_timestamp(rng), post_id))
+        app.execute("UPDATE user_posts SET sentiment = 'neutral', timestamp = NULL WHERE id = 1")
+        app.execute("UPDATE user_posts SET timestamp = '2024-02-01T10:00:00' WHERE id = 1")
+        app.execute("UPDATE user_posts SET username = 'bob', reviewed = 1 WHERE id = 2")
+        for alert_id in rng.sample(range(1, 61), 20):
+            app.execute("UPDATE alerts SET timestamp = ? WHERE id = ?", (_timestamp(rng), alert_id))
+    _assert_consistent(app, users)
+
+    with app:
+        app.executemany("DELETE FROM user_posts WHERE id = ?", [(i,) for i in rng.sample(range(1, 201), 70)])
+        app.execute("DELETE FROM alerts WHERE id % 3 = 0")
+    with users:
+        users.execute("DELETE FROM users WHERE id % 4 = 0")
+    _assert_consistent(app, users)
+
+
+def test_rebuild_recomputes_drifted_rollups(dbs, capsys):
+    app, users = dbs
+    with app:
+        app.executemany("INSERT INTO user_posts (username, sentiment, timestamp) VALUES ('ann', ?, ?)",
+                        [("positive", "2024-01-01T09:30:00"), ("negative", "2024-01-02 18:00:00")])
+        app.execute("UPDATE rollups SET count = count + 5")
+        app.execute("INSERT INTO rollups VALUES ('day', 'alerts', '2023-12-31', '', 4)")
+    assert _from_triggers(app, "posts") != _recomputed(app, "posts")
+
+    paths = {name: conn.execute("PRAGMA database_list").fetchone()[2] for name, conn in (("app", app),
+                                                                                     ("users", users))}
+    rollups.main(["--app", paths["app"], "--users", paths["users"], "--rebuild"])
+
+    capsys.readouterr()
+    _assert_consistent(app, users)
@@ -0,0 +1,32 @@
+from backend import migrations
+from backend.connection import get_connection
+from data import seed_data
+
+
+def test_seed_checkpoints_count_chunks_and_resume(tmp_path):
+    app_db, users_db = str(tmp_path / "app.db"), str(tmp_path / "users.db")
+
+    assert seed_data.seed(5, 25, app_db=app_db, users_db=users_db, workers=1, chunk_rows=10) == (5, 25)
+
+    conn = get_connection(app_db)
+    runs = {row["run"].rsplit(":", 1)[1]: (row["chunks"], row["rows"])
+            for row in conn.execute("SELECT run, chunks, rows FROM seed_checkpoints")}
+    assert runs == {"users": (1, 5), "posts": (3, 25)}
+    assert conn.execute("SELECT COUNT(*) FROM ingest_checkpoints").fetchone()[0] == 0
+    assert seed_data.seed(5, 25, app_db=app_db, users_db=users_db, workers=1, chunk_rows=10) == (0, 0)
+
+
+def test_migration_moves_seed_runs_out_of_ingest_checkpoints(tmp_path):
+    path = str(tmp_path / "old.db")
+    migrations.migrate(path, migrations.APP_MIGRATIONS[:13])
+    conn = get_connection(path)
+    with conn:
+        conn.executemany("INSERT INTO ingest_checkpoints (source, byte_offset, rows) VALUES (?, ?, ?)",
+                         [("seed_data:0:5:25:posts", 3, 25), ("/data/posts.jsonl", 12345, 40)])
+
+    migrations.migrate_app_db(path)
+
+    assert [tuple(r) for r in conn.execute("SELECT run, chunks, rows FROM seed_checkpoints")] == [
+        ("seed_data:0:5:25:posts", 3, 25)]
+    assert [tuple(r) for r in conn.execute("SELECT source, byte_offset, rows FROM ingest_checkpoints")] == [
+        ("/data/posts.jsonl", 12345, 40)]
@@ -0,0 +1,93 @@
+import logging
+import threading
+
+import pytest
+
+from backend import engines
+from backend.transformer import MicroBatcher
+
+
+@pytest.fixture
+def transformer_config(monkeypatch):
+    """ Let a test point the "transformer" engine at a model dir; undo it afterwards. """
+    def use(model_dir):
+        monkeypatch.setitem(engines.ENGINE_CONFIG, "transformer",
+                            {**engines.ENGINE_CONFIG["transformer"], "model_dir": str(model_dir)})
+        engines.configure_engine("transformer")   # drop any built instance
+    yield use
+    engines.configure_engine("transformer")
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from benchmarks.bench_transformer import build_tiny_model
+
+    model_dir = tmp_path_factory.mktemp("tiny_model")
+    build_tiny_model(str(model_dir))
+    return model_dir
+
+
+def test_micro_batcher_answers_every_request_in_batches():
+    seen = []
+
+    def double(items):
+        seen.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=20)
+    results = {}
+
+    def submit(n):
+        results[n] = batcher.submit(n).result(timeout=10)
+
+    threads = [threading.Thread(target=submit, args=(n,)) for n in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {n: n * 2 for n in range(40)}
+    assert max(seen) <= 8
+    assert batcher.items == 40 and batcher.batches == len(seen) < 40
+
+
+def test_batched_scores_match_single_scores(tiny_model, transformer_config):
+    from benchmarks.bench_sentiment import SAMPLE_POSTS
+
+    transformer_config(tiny_model)
+    engine = engines.get_engine("transformer")
+    assert engine.name == "transformer"
+
+    batched = engine.score_batch(SAMPLE_POSTS)
+    single = [engine.score(text) for text in SAMPLE_POSTS]
+    assert [r["sentiment"] for r in batched] == [r["sentiment"] for r in single]
+    for b, s in zip(batched, single):
+        assert b["polarity"] == pytest.approx(s["polarity"], abs=1e-5)
+
+    # Concurrent single requests go through the micro-batcher together.
+    concurrent = [None] * len(SAMPLE_POSTS)
+
+    def score(i):
+        concurrent[i] = engine.score(SAMPLE_POSTS[i])
+
+    threads = [threading.Thread(target=score, args=(i,)) for i in range(len(SAMPLE_POSTS))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for b, c in zip(batched, concurrent):
+        assert b["polarity"] == pytest.approx(c["polarity"], abs=1e-5)
+
+
+def test_falls_back_to_the_shared_vader_engine(tmp_path, transformer_config, caplog):
+    transformer_config(tmp_path / "no_model_here")
+
+    with caplog.at_level(logging.WARNING, logger="backend.transformer"):
+        engine = engines.get_engine("transformer")
+
+    assert engine is engines.get_engine("vader")
+    assert "transformer" not in engines._instances
+    assert "falling back to VADER" in caplog.text
+    assert engine.score("I love this!")["sentiment"] == "positive"